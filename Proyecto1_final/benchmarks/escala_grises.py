@@ -0,0 +1,106 @@
+"""
+Compara el matching BGR con el de escala de grises sobre capturas fijas
+
+Uso (desde Proyecto1_final):
+    python -m benchmarks.escala_grises
+    python -m benchmarks.escala_grises --pantallas ../image.png ../image1.png --repeticiones 50
+
+Para cada pantalla se buscan las plantillas de img/ (ausentes: mide falsos
+positivos) y recortes de la propia pantalla (presentes: posición conocida).
+Se informa el tiempo medio de cada modo, la diferencia de confianza y si
+ambos modos coinciden con la posición esperada.
+"""
+import argparse
+import glob
+import time
+import cv2
+from utils.template_library import Template
+
+RECORTES_POR_PANTALLA = 3
+
+def medir(frame, plantilla, repeticiones):
+    """Tiempo medio (ms), confianza y posición de TM_CCOEFF_NORMED"""
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        result = cv2.matchTemplate(frame, plantilla, cv2.TM_CCOEFF_NORMED)
+        _, max_val, _, max_loc = cv2.minMaxLoc(result)
+    return (time.perf_counter() - inicio) * 1000 / repeticiones, max_val, max_loc
+
+def recortes(pantalla, cantidad):
+    """Recortes de la pantalla repartidos horizontalmente, con su posición real"""
+    alto, ancho = pantalla.shape[:2]
+    lado = max(8, min(alto, ancho) // 2)
+    y = (alto - lado) // 2
+    for i in range(cantidad):
+        x = (ancho - lado) * (i + 1) // (cantidad + 1)
+        yield f"recorte_{i + 1}", pantalla[y:y + lado, x:x + lado].copy(), (x, y)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de matching BGR frente a escala de grises")
+    parser.add_argument("--pantallas", nargs="+", default=["../image.png", "../image1.png"])
+    parser.add_argument("--plantillas", default="img/*.png")
+    parser.add_argument("--repeticiones", type=int, default=20)
+    args = parser.parse_args()
+
+    filas = []
+    for ruta_pantalla in args.pantallas:
+        pantalla = cv2.imread(ruta_pantalla, cv2.IMREAD_COLOR)
+        if pantalla is None:
+            print(f"No se pudo cargar la pantalla '{ruta_pantalla}'")
+            continue
+        pantalla_gris = cv2.cvtColor(pantalla, cv2.COLOR_BGR2GRAY)
+
+        casos = []
+        for ruta in sorted(glob.glob(args.plantillas)):
+            imagen = cv2.imread(ruta, cv2.IMREAD_COLOR)
+            if imagen is not None:
+                casos.append((ruta, imagen, None))
+        casos.extend(recortes(pantalla, RECORTES_POR_PANTALLA))
+
+        for nombre, imagen, esperado in casos:
+            alto, ancho = imagen.shape[:2]
+            if alto > pantalla.shape[0] or ancho > pantalla.shape[1]:
+                continue
+            template = Template(nombre, imagen, None)
+            ms_bgr, score_bgr, loc_bgr = medir(pantalla, template.imagen, args.repeticiones)
+            ms_gris, score_gris, loc_gris = medir(pantalla_gris, template.gris, args.repeticiones)
+            filas.append({
+                "pantalla": ruta_pantalla,
+                "plantilla": nombre,
+                "ms_bgr": ms_bgr,
+                "ms_gris": ms_gris,
+                "score_bgr": score_bgr,
+                "score_gris": score_gris,
+                "ok_bgr": None if esperado is None else tuple(loc_bgr) == esperado,
+                "ok_gris": None if esperado is None else tuple(loc_gris) == esperado
+            })
+
+    if not filas:
+        return
+
+    print(f"{'pantalla':<16}{'plantilla':<26}{'ms BGR':>9}{'ms gris':>9}{'x':>7}{'conf BGR':>10}{'conf gris':>10}{'Δ':>8}  posición")
+    for f in filas:
+        acelerado = f["ms_bgr"] / f["ms_gris"] if f["ms_gris"] else 0.0
+        if f["ok_bgr"] is None:
+            posicion = "-"
+        else:
+            posicion = f"BGR {'ok' if f['ok_bgr'] else 'FALLO'} / gris {'ok' if f['ok_gris'] else 'FALLO'}"
+        print(f"{f['pantalla'][-16:]:<16}{f['plantilla'][-26:]:<26}{f['ms_bgr']:>9.3f}{f['ms_gris']:>9.3f}"
+              f"{acelerado:>6.1f}x{f['score_bgr']:>10.3f}{f['score_gris']:>10.3f}"
+              f"{f['score_gris'] - f['score_bgr']:>+8.3f}  {posicion}")
+
+    total_bgr = sum(f["ms_bgr"] for f in filas)
+    total_gris = sum(f["ms_gris"] for f in filas)
+    conocidos = [f for f in filas if f["ok_bgr"] is not None]
+    ausentes = [f for f in filas if f["ok_bgr"] is None]
+    print()
+    print(f"Tiempo total: BGR {total_bgr:.2f} ms, gris {total_gris:.2f} ms ({total_bgr / total_gris:.1f}x)")
+    if conocidos:
+        print(f"Posición correcta: BGR {sum(f['ok_bgr'] for f in conocidos)}/{len(conocidos)}, "
+              f"gris {sum(f['ok_gris'] for f in conocidos)}/{len(conocidos)}")
+    if ausentes:
+        print(f"Confianza máxima sin la plantilla presente: BGR {max(f['score_bgr'] for f in ausentes):.3f}, "
+              f"gris {max(f['score_gris'] for f in ausentes):.3f}")
+
+if __name__ == "__main__":
+    main()
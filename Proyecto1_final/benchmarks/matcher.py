@@ -0,0 +1,299 @@
+"""
+Benchmark de las estrategias de búsqueda de TemplateMatcher
+
+Uso (desde Proyecto1_final):
+    python -m benchmarks.matcher
+    python -m benchmarks.matcher --repeticiones 50 --salida bench_matcher.json
+    python -m benchmarks.matcher --salida nuevo.json --comparar bench_matcher.json
+    python -m benchmarks.matcher --manifiesto sinteticas --max-pantallas 500 --estrategias gris roi
+
+Pantallas de prueba: las capturas ../image.png y ../image1.png (las plantillas
+de img/ no aparecen en ellas: mide falsos positivos; además se buscan recortes
+de la propia captura en su posición real) y composiciones sintéticas con todas
+las plantillas de img/ pegadas en posiciones conocidas sobre un fondo hecho con
+esas capturas. Con --manifiesto se usan en su lugar las pantallas generadas por
+simulacion.pantallas_sinteticas (ruido, escala, brillo y señuelos); una
+detección sobre un señuelo cuenta como falso positivo.
+
+Cada estrategia de ESTRATEGIAS configura un TemplateMatcher distinto: BGR a
+resolución completa (el TM_CCOEFF_NORMED original), escala de grises, pirámide
+y ROI con la posición ya aprendida. Por plantilla se informan los percentiles
+de latencia, si la posición coincide con la real y el pico de memoria
+(tracemalloc, en una pasada aparte para no distorsionar los tiempos; cuenta
+los arrays de numpy, no la memoria interna de OpenCV). El resultado se guarda
+en JSON para comparar versiones con --comparar.
+"""
+import argparse
+import glob
+import json
+import os
+import platform
+import random
+import subprocess
+import time
+import tracemalloc
+import cv2
+from utils.template_library import Template
+from models.template_matcher import TemplateMatcher
+from benchmarks.escala_grises import recortes
+from benchmarks.replay_sesion import percentil
+from simulacion.pantallas_sinteticas import crear_parser, generar_pantalla, leer_manifiesto
+
+RECORTES_POR_PANTALLA = 2
+
+def matcher_bgr(rutas, opciones):
+    return TemplateMatcher(hilos=1)
+
+def matcher_gris(rutas, opciones):
+    return TemplateMatcher(plantillas_gris=rutas, hilos=1)
+
+def matcher_piramide(rutas, opciones):
+    return TemplateMatcher(factores_piramide={ruta: opciones.factor for ruta in rutas}, hilos=1)
+
+def matcher_roi(rutas, opciones):
+    return TemplateMatcher(padding=opciones.padding, hilos=1)
+
+# Estrategia -> (constructor del matcher, ¿conserva la posición aprendida entre búsquedas?)
+# Para añadir una estrategia basta con registrarla aquí.
+ESTRATEGIAS = {
+    "bgr": (matcher_bgr, False),
+    "gris": (matcher_gris, False),
+    "piramide": (matcher_piramide, False),
+    "roi": (matcher_roi, True)
+}
+
+def casos_de_objetos(templates, objetos):
+    """Casos (Template, cajas reales o None, cajas de señuelos) a partir de los objetos de un manifiesto"""
+    casos = []
+    for template in templates:
+        cajas = [[o["x"], o["y"], o["ancho"], o["alto"]] for o in objetos if o["plantilla"] == template.ruta]
+        señuelos = [[o["x"], o["y"], o["ancho"], o["alto"]] for o in objetos
+                    if o["plantilla"] == template.ruta and o["señuelo"]]
+        reales = [caja for caja in cajas if caja not in señuelos]
+        casos.append((template, reales or None, señuelos))
+    return casos
+
+def pantallas_de_prueba(args, plantillas):
+    """Genera (nombre, frame, [(Template, cajas reales o None, cajas de señuelos)])"""
+    templates = [Template(r, imagen, None) for r, imagen in plantillas]
+    if args.manifiesto:
+        manifiesto = leer_manifiesto(args.manifiesto)
+        for pantalla in manifiesto["pantallas"][:args.max_pantallas]:
+            frame = cv2.imread(pantalla["ruta"], cv2.IMREAD_COLOR)
+            if frame is None:
+                print(f"No se pudo cargar la pantalla '{pantalla['ruta']}'")
+                continue
+            yield pantalla["archivo"], frame, casos_de_objetos(templates, pantalla["objetos"])
+        return
+
+    # Composiciones sin ruido: todas las plantillas de img/ (también b4no.png) sobre la captura repetida
+    opciones = crear_parser().parse_args(["--salida", "-", "--fondo", "captura", "--presencia", "1",
+                                          "--ancho", str(args.ancho), "--alto", str(args.alto)])
+    rng = random.Random(args.semilla)
+    for ruta in args.pantallas:
+        pantalla = cv2.imread(ruta, cv2.IMREAD_COLOR)
+        if pantalla is None:
+            print(f"No se pudo cargar la pantalla '{ruta}'")
+            continue
+        casos = [(template, None, []) for template in templates]
+        casos += [(Template(nombre, imagen, None), [[x, y, imagen.shape[1], imagen.shape[0]]], [])
+                  for nombre, imagen, (x, y) in recortes(pantalla, RECORTES_POR_PANTALLA)]
+        yield os.path.basename(ruta), pantalla, casos
+
+        for i in range(args.sinteticas):
+            frame, datos = generar_pantalla(plantillas, opciones, rng, capturas=[pantalla])
+            yield f"{os.path.basename(ruta)}-sintetica{i + 1}", frame, casos_de_objetos(templates, datos["objetos"])
+
+def medir(matcher, conserva, frame, frame_gris, template, esperado, args):
+    """Latencias (ms) y última coincidencia de varias búsquedas de la plantilla"""
+    if conserva and esperado is not None:
+        # La ROI parte de la posición aprendida, como en una ejecución ya en marcha
+        matcher.cargar_posiciones({template.ruta: esperado[0][:2]})
+    elif conserva:
+        matcher.buscar(frame, template, args.confianza, frame_gris)
+    tiempos = []
+    resultado = None
+    for _ in range(args.repeticiones):
+        if not conserva:
+            matcher.olvidar(template.ruta)
+        inicio = time.perf_counter()
+        resultado = matcher.buscar(frame, template, args.confianza, frame_gris)
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    return tiempos, resultado
+
+def memoria_pico(matcher, conserva, frame, frame_gris, template, esperado, args):
+    """Pico de memoria (KiB) de una búsqueda, medido con tracemalloc"""
+    matcher.olvidar(template.ruta)
+    if conserva and esperado is not None:
+        matcher.cargar_posiciones({template.ruta: esperado[0][:2]})
+    tracemalloc.start()
+    try:
+        matcher.buscar(frame, template, args.confianza, frame_gris)
+        return tracemalloc.get_traced_memory()[1] / 1024
+    finally:
+        tracemalloc.stop()
+
+def en_caja(resultado, caja, tolerancia):
+    """El centro de la detección coincide con el de la caja (± tolerancia, más la diferencia de escala)"""
+    x, y, ancho, alto = caja
+    margen = tolerancia + max(abs(ancho - resultado.ancho), abs(alto - resultado.alto)) / 2
+    centro_x, centro_y = resultado.loc[0] + resultado.ancho / 2, resultado.loc[1] + resultado.alto / 2
+    return abs(centro_x - (x + ancho / 2)) <= margen and abs(centro_y - (y + alto / 2)) <= margen
+
+def evaluar(resultado, esperado, señuelos, args):
+    """
+    Returns:
+        tuple: (correcto, en_señuelo). Presente: encontrada en una de sus cajas.
+               Ausente: sin detección. Una detección sobre un señuelo nunca es correcta
+    """
+    if resultado.score < args.confianza:
+        return esperado is None, False
+    if any(en_caja(resultado, caja, args.tolerancia) for caja in señuelos):
+        return False, True
+    return esperado is not None and any(en_caja(resultado, caja, args.tolerancia) for caja in esperado), False
+
+def version_git():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+def resumir(filas):
+    """Agrega por estrategia y plantilla, y por estrategia"""
+    por_plantilla = {}
+    for f in filas:
+        por_plantilla.setdefault((f["estrategia"], f["plantilla"]), []).append(f)
+
+    plantillas = []
+    for (estrategia, plantilla), grupo in sorted(por_plantilla.items()):
+        tiempos = [t for f in grupo for t in f["tiempos_ms"]]
+        plantillas.append({
+            "estrategia": estrategia,
+            "plantilla": plantilla,
+            "ms_p50": percentil(tiempos, 50),
+            "ms_p95": percentil(tiempos, 95),
+            "ms_max": max(tiempos),
+            "memoria_pico_kib": max(f["memoria_pico_kib"] for f in grupo),
+            "correctas": sum(f["correcto"] for f in grupo),
+            "casos": len(grupo)
+        })
+
+    estrategias = {}
+    for estrategia in dict.fromkeys(f["estrategia"] for f in filas):
+        grupo = [f for f in filas if f["estrategia"] == estrategia]
+        presentes = [f for f in grupo if f["esperado"] is not None]
+        ausentes = [f for f in grupo if f["esperado"] is None]
+        estrategias[estrategia] = {
+            "ms_p50_total": sum(percentil(f["tiempos_ms"], 50) for f in grupo),
+            "ms_p95_total": sum(percentil(f["tiempos_ms"], 95) for f in grupo),
+            "memoria_pico_kib": max(f["memoria_pico_kib"] for f in grupo),
+            "aciertos": sum(f["correcto"] for f in presentes),
+            "presentes": len(presentes),
+            "falsos_positivos": sum(not f["correcto"] for f in ausentes),
+            "ausentes": len(ausentes),
+            "en_señuelo": sum(f["en_señuelo"] for f in grupo)
+        }
+    return plantillas, estrategias
+
+def comparar(actual, ruta_anterior):
+    """Imprime la diferencia de tiempo y aciertos respecto a un resultado anterior"""
+    with open(ruta_anterior, "r", encoding="utf-8") as f:
+        anterior = json.load(f)
+    print()
+    print(f"Comparación con {ruta_anterior} ({anterior.get('version') or 'sin versión'}):")
+    for estrategia, stats in actual["estrategias"].items():
+        previo = anterior.get("estrategias", {}).get(estrategia)
+        if previo is None:
+            print(f"  {estrategia:<10} nueva")
+            continue
+        ratio = stats["ms_p50_total"] / previo["ms_p50_total"] if previo["ms_p50_total"] else 0.0
+        print(f"  {estrategia:<10} p50 {previo['ms_p50_total']:.2f} -> {stats['ms_p50_total']:.2f} ms ({ratio:.2f}x), "
+              f"aciertos {previo['aciertos']} -> {stats['aciertos']}, "
+              f"falsos positivos {previo['falsos_positivos']} -> {stats['falsos_positivos']}, "
+              f"en señuelo {previo.get('en_señuelo', 0)} -> {stats['en_señuelo']}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de las estrategias de TemplateMatcher")
+    parser.add_argument("--pantallas", nargs="+", default=["../image.png", "../image1.png"])
+    parser.add_argument("--plantillas", default="img/*.png")
+    parser.add_argument("--estrategias", nargs="+", default=list(ESTRATEGIAS), choices=list(ESTRATEGIAS))
+    parser.add_argument("--sinteticas", type=int, default=2, help="Composiciones sintéticas por captura")
+    parser.add_argument("--manifiesto", help="Directorio generado por simulacion.pantallas_sinteticas")
+    parser.add_argument("--max-pantallas", type=int, default=None, help="Pantallas máximas del manifiesto")
+    parser.add_argument("--ancho", type=int, default=1366, help="Ancho de las composiciones sintéticas")
+    parser.add_argument("--alto", type=int, default=768, help="Alto de las composiciones sintéticas")
+    parser.add_argument("--semilla", type=int, default=1)
+    parser.add_argument("--repeticiones", type=int, default=20)
+    parser.add_argument("--confianza", type=float, default=0.68)
+    parser.add_argument("--tolerancia", type=int, default=2, help="Píxeles de diferencia aceptados en la posición")
+    parser.add_argument("--factor", type=int, default=2, help="Factor de la estrategia piramide")
+    parser.add_argument("--padding", type=int, default=40, help="Margen de la estrategia roi")
+    parser.add_argument("--salida", default="bench_matcher.json")
+    parser.add_argument("--comparar", help="Resultado JSON anterior con el que comparar")
+    args = parser.parse_args()
+
+    plantillas = []
+    for ruta in sorted(glob.glob(args.plantillas)):
+        imagen = cv2.imread(ruta, cv2.IMREAD_COLOR)
+        if imagen is not None:
+            plantillas.append((ruta, imagen))
+
+    filas = []
+    for pantalla, frame, casos in pantallas_de_prueba(args, plantillas):
+        frame_gris = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        for estrategia in args.estrategias:
+            crear, conserva = ESTRATEGIAS[estrategia]
+            matcher = crear([template.ruta for template, *_ in casos], args)
+            for template, esperado, señuelos in casos:
+                if template.alto > frame.shape[0] or template.ancho > frame.shape[1]:
+                    continue
+                tiempos, resultado = medir(matcher, conserva, frame, frame_gris, template, esperado, args)
+                correcto, en_señuelo = evaluar(resultado, esperado, señuelos, args)
+                filas.append({
+                    "estrategia": estrategia,
+                    "pantalla": pantalla,
+                    "plantilla": template.ruta,
+                    "tiempos_ms": tiempos,
+                    "memoria_pico_kib": memoria_pico(matcher, conserva, frame, frame_gris, template, esperado, args),
+                    "score": float(resultado.score),
+                    "modo": resultado.modo,
+                    "loc": list(resultado.loc),
+                    "esperado": esperado,
+                    "correcto": correcto,
+                    "en_señuelo": en_señuelo
+                })
+            matcher.cerrar()
+
+    if not filas:
+        return
+
+    plantillas_resumen, estrategias = resumir(filas)
+    print(f"{'estrategia':<11}{'plantilla':<26}{'p50 ms':>9}{'p95 ms':>9}{'KiB':>9}  correctas")
+    for p in plantillas_resumen:
+        print(f"{p['estrategia']:<11}{p['plantilla'][-26:]:<26}{p['ms_p50']:>9.3f}{p['ms_p95']:>9.3f}"
+              f"{p['memoria_pico_kib']:>9.0f}  {p['correctas']}/{p['casos']}")
+    print()
+    for estrategia, stats in estrategias.items():
+        print(f"{estrategia:<11}p50 total {stats['ms_p50_total']:.2f} ms, aciertos {stats['aciertos']}/{stats['presentes']}, "
+              f"falsos positivos {stats['falsos_positivos']}/{stats['ausentes']}, en señuelo {stats['en_señuelo']}, "
+              f"pico {stats['memoria_pico_kib']:.0f} KiB")
+
+    resultado = {
+        "version": version_git(),
+        "fecha": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "entorno": {"python": platform.python_version(), "opencv": cv2.__version__, "plataforma": platform.platform()},
+        "parametros": {k: v for k, v in vars(args).items() if k not in ("salida", "comparar")},
+        "estrategias": estrategias,
+        "plantillas": plantillas_resumen,
+        "casos": filas
+    }
+    with open(args.salida, "w", encoding="utf-8") as f:
+        json.dump(resultado, f, indent=2)
+    print(f"\nResultado guardado en {args.salida}")
+
+    if args.comparar:
+        comparar(resultado, args.comparar)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Repite la detección sobre una sesión grabada y la compara con lo grabado
+
+Uso (desde Proyecto1_final):
+    python -m utils.session_recorder --salida sesiones/semilla ../image.png ../image1.png
+    python -m benchmarks.replay_sesion sesiones/semilla
+    python -m benchmarks.replay_sesion sesiones/20250101-120000 --config config.json --repeticiones 3
+
+Cada frame de la sesión se pasa por TemplateMatcher.detect_all con las
+plantillas que se buscaron en la grabación (o todas las de img/ si la sesión
+no tiene coincidencias grabadas). Se informa el tiempo por frame y cuántas
+detecciones cambian de posición o de confianza respecto a la grabación, para
+medir el efecto de un cambio en el matcher sobre pantallas reales.
+"""
+import argparse
+import glob
+import json
+import time
+from utils.config_manager import ConfigManager
+from utils.template_library import TemplateLibrary
+from utils.screen_capture import ReplayCapture
+from utils.session_recorder import leer_sesion
+from models.template_matcher import TemplateMatcher
+
+def percentil(valores, p):
+    ordenados = sorted(valores)
+    if not ordenados:
+        return 0.0
+    return ordenados[min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))]
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del matcher sobre una sesión grabada")
+    parser.add_argument("sesion", help="Directorio de la sesión")
+    parser.add_argument("--config", default="config.json", help="Configuración del matcher a probar")
+    parser.add_argument("--plantillas", default="img/*.png", help="Plantillas si la sesión no tiene coincidencias")
+    parser.add_argument("--repeticiones", type=int, default=1, help="Pasadas completas por la sesión")
+    parser.add_argument("--tolerancia", type=float, default=0.02, help="Diferencia de confianza tolerada")
+    args = parser.parse_args()
+
+    config = ConfigManager(args.config)
+    config.load()
+    confianza = config.get("confianza_minima", 0.68)
+
+    registros = leer_sesion(args.sesion)
+    grabados = {r["frame_id"]: r["resultados"] for r in registros if r.get("tipo") == "matches"}
+    todas = sorted(glob.glob(args.plantillas))
+
+    captura = ReplayCapture(args.sesion, modo="secuencial")
+    libreria = TemplateLibrary()
+    tiempos = []
+    comparadas = 0
+    distinta_posicion = 0
+    distinta_confianza = 0
+
+    for _ in range(args.repeticiones):
+        # Cada pasada empieza con un matcher nuevo (sin posiciones aprendidas)
+        matcher = TemplateMatcher(
+            padding=config.get("roi_padding", 40),
+            factores_piramide=config.get("pyramid_factors", {}),
+            plantillas_gris=config.get("grayscale_templates", []),
+            verificar_color=config.get("color_verify_templates", []),
+            tolerancia_color=config.get("color_tolerance", 30),
+            hilos=config.get("match_threads", 4)
+        )
+        captura.indice = -1
+        for registro in captura.frames:
+            frame = captura.grab()
+            esperado = grabados.get(registro["frame_id"], {})
+            rutas = list(esperado) or todas
+            templates = [t for t in (libreria.get(ruta) for ruta in rutas) if t is not None]
+
+            gris = captura.gray() if any(matcher.usa_gris(t.ruta) for t in templates) else None
+            inicio = time.perf_counter()
+            resultados = matcher.detect_all(frame, templates, confianza, gris)
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+
+            for ruta, previo in esperado.items():
+                actual = resultados.get(ruta)
+                if actual is None:
+                    continue
+                comparadas += 1
+                # Solo cuenta la posición de las detecciones que superaban el umbral
+                if previo["score"] > confianza and list(actual.loc) != previo["loc"]:
+                    distinta_posicion += 1
+                if abs(actual.score - previo["score"]) > args.tolerancia:
+                    distinta_confianza += 1
+        estadisticas = matcher.estadisticas()
+        matcher.cerrar()
+
+    resumen = {
+        "frames": len(tiempos),
+        "ms_medio": sum(tiempos) / len(tiempos) if tiempos else 0.0,
+        "ms_p50": percentil(tiempos, 50),
+        "ms_p95": percentil(tiempos, 95),
+        "ms_max": max(tiempos, default=0.0),
+        "comparadas": comparadas,
+        "distinta_posicion": distinta_posicion,
+        "distinta_confianza": distinta_confianza,
+        "matcher": estadisticas
+    }
+    print(json.dumps(resumen, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+"""
+Ejecución de los lotes sin interfaz Tk
+
+Uso (desde Proyecto1_final):
+    python -m cli --lote-inicial 1 --lote-final 50 --formato "LT" --perfil rapido
+    python -m cli --perfil normal --set ahk_backend=stub --resumen resumen.json
+    python -m cli --reloj virtual --set capture_backend=replay --set replay_dir=sesiones/semilla --set simulate_input=true
+
+El progreso se muestra por consola (stderr) y al terminar se imprime en stdout
+un resumen JSON (lotes completados, duración, lotes/hora y estadísticas).
+Ctrl+C detiene el proceso de forma ordenada; el diario de progreso permite
+reanudarlo después desde el último paso confirmado.
+"""
+import argparse
+import json
+import signal
+import sys
+import threading
+import time
+import logging
+from utils.config_manager import ConfigManager
+from utils.ahk_manager import AHKManager
+from models.image_search_model import ImageSearchModel
+from controllers.lote_runner import LoteRunner
+
+logger = logging.getLogger(__name__)
+
+class ConsoleView:
+    """Sustituto de ImageSearchView: mensajes y progreso por consola"""
+    def __init__(self, model, salida=sys.stderr):
+        self.model = model
+        self.salida = salida
+        self.inicio = time.monotonic()
+        self.lote_desde = None
+        self.transitorio = False
+        # log_message llega desde el hilo de trabajo y desde el de entrega de eventos (update)
+        self.lock = threading.Lock()
+
+    def log_message(self, message, transitorio=False):
+        linea = f"{time.strftime('%H:%M:%S')} - {message}"
+        with self.lock:
+            # Las líneas transitorias solo se sobrescriben en una terminal
+            transitorio = transitorio and self.salida.isatty()
+            if self.transitorio:
+                self.salida.write("\r\033[K")
+            self.salida.write(linea if transitorio else linea + "\n")
+            self.salida.flush()
+            self.transitorio = transitorio
+        if not transitorio:
+            logger.info(message)
+
+    def proceso_completado(self):
+        self.log_message("El proceso ha terminado exitosamente.")
+
+    def update(self, event, data):
+        """Observador del modelo: progreso por lote"""
+        if event == "lote_iniciado":
+            if self.lote_desde is None:
+                self.lote_desde = data
+            hechos = data - self.lote_desde
+            total = self.model.lote_final - self.lote_desde + 1
+            transcurrido = time.monotonic() - self.inicio
+            ritmo = hechos * 3600 / transcurrido if hechos and transcurrido > 0 else 0.0
+            self.log_message(f"[{hechos}/{total}] Lote {data} de {self.model.lote_final} - {ritmo:.1f} lotes/h")
+        elif event == "image_not_found":
+            self.log_message(f"Botón '{data['image']}' no encontrado. Mejor coincidencia: "
+                             f"{data['confidence']:.2f} (Intento {data.get('intento', 1)})", transitorio=True)
+        elif event == "error":
+            self.log_message(f"Error: {data}")
+
+def parse_valor(texto):
+    """clave=valor de --set; el valor se interpreta como JSON si es posible"""
+    clave, _, valor = texto.partition("=")
+    try:
+        return clave, json.loads(valor)
+    except ValueError:
+        return clave, valor
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ejecuta los lotes de búsqueda sin interfaz gráfica")
+    parser.add_argument("--lote-inicial", type=int, help="Primer lote (por defecto el de config.json)")
+    parser.add_argument("--lote-final", type=int, help="Último lote (por defecto el de config.json)")
+    parser.add_argument("--formato", help="Patrón de texto para el nombre de archivo")
+    parser.add_argument("--perfil", default="normal", help="Perfil de tiempos de timing_profiles en config.json")
+    parser.add_argument("--set", dest="ajustes", action="append", default=[], metavar="CLAVE=VALOR",
+                        help="Sobrescribe una clave de configuración solo para esta ejecución")
+    parser.add_argument("--reloj", choices=["real", "virtual"],
+                        help="virtual: las esperas no duermen (para sesiones grabadas o simuladas)")
+    parser.add_argument("--sin-reanudar", action="store_true", help="Empezar de cero aunque el diario permita reanudar")
+    parser.add_argument("--config", default="config.json", help="Archivo de configuración")
+    parser.add_argument("--resumen", help="Guardar también el resumen JSON en este archivo")
+    parser.add_argument("--log", default="automation.log", help="Archivo del log detallado")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Mostrar también el log detallado")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        handlers=[logging.FileHandler(args.log, encoding='utf-8')]
+    )
+    if args.verbose:
+        logging.getLogger().addHandler(logging.StreamHandler())
+
+    config_manager = ConfigManager(args.config)
+    config_manager.load()
+
+    # Todo lo indicado en la línea de comandos es temporal: no se guarda en config.json
+    perfiles = config_manager.get("timing_profiles", {})
+    if args.perfil not in perfiles:
+        parser.error(f"Perfil desconocido '{args.perfil}'. Disponibles: {', '.join(perfiles)}")
+    temporales = dict(perfiles[args.perfil])
+    if args.lote_inicial is not None:
+        temporales["lote_inicial"] = args.lote_inicial
+    if args.lote_final is not None:
+        temporales["lote_final"] = args.lote_final
+    if args.formato is not None:
+        temporales["formato_texto"] = args.formato
+    if args.reloj is not None:
+        temporales["clock"] = args.reloj
+    if args.sin_reanudar:
+        temporales["resume_from_journal"] = False
+    temporales.update(parse_valor(ajuste) for ajuste in args.ajustes)
+    config_manager.aplicar_temporal(temporales)
+
+    model = ImageSearchModel(config_manager)
+    ahk_manager = AHKManager(backend=config_manager.get("ahk_backend", "autohotkey"),
+                             argumentos_stub=config_manager.get("ahk_stub_args", []), token=model.token)
+    view = ConsoleView(model)
+    runner = LoteRunner(model, ahk_manager, view)
+    model.add_observer(view)
+
+    errores = runner.validar()
+    if errores:
+        for error in errores:
+            view.log_message(f"Error: {error}")
+        return 2
+
+    view.log_message(f"Lotes {model.lote_inicial} a {model.lote_final}, formato '{model.formato_texto}', "
+                     f"perfil '{args.perfil}'")
+
+    # Ctrl+C / SIGTERM: detener de forma ordenada (las esperas despiertan al instante)
+    def detener(*_):
+        if model.is_running:
+            view.log_message("Deteniendo...")
+            model.set_running(False)
+    signal.signal(signal.SIGTERM, detener)
+
+    # Los lotes corren en otro hilo para que Ctrl+C llegue siempre al principal
+    model.set_running(True)
+    terminado = threading.Event()
+    def ejecutar():
+        try:
+            runner.run_lotes()
+        finally:
+            terminado.set()
+    threading.Thread(target=ejecutar, daemon=True).start()
+    try:
+        while not terminado.is_set():
+            try:
+                terminado.wait(0.2)
+            except KeyboardInterrupt:
+                detener()
+    finally:
+        ahk_manager.stop_ahk()
+        model.event_bus.cerrar()
+
+    resumen = dict(runner.resumen or {}, perfil=args.perfil)
+    texto = json.dumps(resumen, indent=2, ensure_ascii=False)
+    if args.resumen:
+        with open(args.resumen, "w", encoding="utf-8") as f:
+            f.write(texto)
+    print(texto)
+    return 0 if resumen.get("completado") else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
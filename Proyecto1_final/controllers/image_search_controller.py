@@ -9,7 +9,7 @@ import keyboard
 import logging
 from models.image_search_model import ImageSearchModel
 from utils.ahk_manager import AHKManager
-import tkinter.messagebox as messagebox
+from controllers.lote_runner import LoteRunner
 
 logger = logging.getLogger(__name__)
 
@@ -21,8 +21,12 @@ class ImageSearchController:
         self.pause_window = None
         self.authenticated = False
         self.search_thread = None
-        self.ahk_manager = AHKManager()
-        self.nombre_archivo = ""
+        self.ahk_manager = AHKManager(backend=self.model.config_manager.get("ahk_backend", "autohotkey"),
+                                      argumentos_stub=self.model.config_manager.get("ahk_stub_args", []),
+                                      token=self.model.token)
+        
+        # Ejecución de los lotes; la vista se le asigna tras el login
+        self.runner = LoteRunner(self.model, self.ahk_manager)
         
         # Configurar tecla ESC para pausar
         keyboard.on_press_key("esc", lambda e: self.pause_search())
@@ -32,21 +36,7 @@ class ImageSearchController:
     
     def validate_inputs(self):
         """Valida todas las entradas antes de iniciar"""
-        errors = []
-        
-        # Validación simplificada - ya no se requiere distrito
-        if self.model.lote_inicial > self.model.lote_final:
-            errors.append("El lote inicial no puede ser mayor al lote final")
-        
-        if self.model.lote_inicial < 1 or self.model.lote_final < 1:
-            errors.append("Los números de lote deben ser positivos")
-        
-        # Verificar que las imágenes existan
-        for imagen, _, _ in self.model.image_sequence:
-            if not os.path.exists(imagen):
-                errors.append(f"No se encuentra la imagen: {imagen}")
-        
-        return errors
+        return self.runner.validar()
     
     def show_login_window(self):
         """Muestra la ventana de login"""
@@ -58,6 +48,7 @@ class ImageSearchController:
         """Muestra la ventana principal después del login exitoso"""
         from views.main_view import ImageSearchView
         self.view = ImageSearchView(self.root, self)
+        self.runner.view = self.view
         self.model.add_observer(self)
         
         # Configurar la ventana principal
@@ -73,13 +64,14 @@ class ImageSearchController:
     
     def update(self, event, data):
         """Método para recibir actualizaciones del modelo"""
+        # Puede llamarse desde el hilo de trabajo: los cambios de widgets pasan por la cola de la vista
         if event == "running_changed":
-            self.view.update_button_states(data, self.model.is_paused)
+            self.view.ejecutar_en_ui(self.view.update_button_states, data, self.model.is_paused)
         elif event == "paused_changed":
-            self.view.update_button_states(self.model.is_running, data)
+            self.view.ejecutar_en_ui(self.view.update_button_states, self.model.is_running, data)
             if data:  # Si está en pausa
                 # Mostrar ventana de pausa con la información actual
-                self.view.show_pause_window(self.model.current_lote, self.model.lote_final)
+                self.view.ejecutar_en_ui(self.view.show_pause_window, self.model.current_lote, self.model.lote_final)
         elif event == "image_found":
             self.view.log_message(f"Botón '{data['image']}' encontrado en ({data['x']}, {data['y']}) - Confianza: {data['confidence']:.2f}")
         elif event == "image_not_found":
@@ -124,215 +116,6 @@ class ImageSearchController:
         else:
             self.config_window = ConfigWindow(self.root, self)
     
-    def encontrar_ventana_archivo(self):
-        """Busca la ventana de archivo usando template matching con reintentos inteligentes"""
-        intentos = 1
-        confianza_minima = 0.6
-        tiempo_espera_base = 1
-        tiempo_espera_largo = 10
-        
-        # Cargar template una sola vez fuera del bucle
-        template = cv2.imread('img/cargarArchivo.png')
-        if template is None:
-            logger.error("No se pudo cargar la imagen 'cargarArchivo.png'")
-            return None
-        
-        while self.model.is_running: 
-            # Verificar si está pausado
-            if self.model.is_paused:
-                with self.model.pause_condition:
-                    while self.model.is_paused and self.model.is_running:
-                        self.model.pause_condition.wait()
-                if not self.model.is_running:
-                    return False
-            
-            try:
-                # Capturar pantalla completa
-                screenshot = pyautogui.screenshot()
-                pantalla = cv2.cvtColor(np.array(screenshot), cv2.COLOR_RGB2BGR)
-                
-                # Realizar template matching
-                result = cv2.matchTemplate(pantalla, template, cv2.TM_CCOEFF_NORMED)
-                _, max_val, _, max_loc = cv2.minMaxLoc(result)
-                
-                if max_val >= confianza_minima:
-                    logger.info(f"Ventana encontrada con confianza: {max_val:.2f}")
-                    # Devolver tupla (x, y)
-                    return max_loc
-                else:
-                    # Estrategia de espera progresiva
-                    if intentos % 10 == 0 and intentos > 0:
-                        logger.info(f"Intento {intentos}: Mejor coincidencia: {max_val:.2f}")
-                        logger.info("Esperando 10 segundos...")
-                        time.sleep(tiempo_espera_largo)
-                    else:
-                        time.sleep(tiempo_espera_base)
-                    intentos += 1
-                    
-            except Exception as e:
-                logger.error(f"Error durante la búsqueda: {e}")
-                time.sleep(tiempo_espera_base)
-                intentos += 1
-
-        return None
-
-    def handle_b4_special_behavior(self, imagen, clicks, confianza):
-        """Maneja el comportamiento especial para la imagen b4"""
-        # Precionamos el boton b4 (Documentos)
-        success = self.model.click_button(imagen, clicks, confianza)
-        
-        # Esperar despues de precionar el boton
-        time.sleep(3)
-
-        # Buscar la ventana de archivo
-        coordenadas_ventana = self.encontrar_ventana_archivo()
-
-        if coordenadas_ventana:
-            x_ventana, y_ventana = coordenadas_ventana
-            logger.info(f"Coordenadas ventana: x={x_ventana}, y={y_ventana}")
-            
-            # Calcular coordenadas del campo de texto
-            x_campo = x_ventana + 294
-            y_campo = y_ventana + 500
-            logger.info(f"Coordenadas campo texto: x={x_campo}, y={y_campo}")
-            
-            # Iniciar AHK si no está corriendo
-            if not self.ahk_manager.start_ahk():
-                logger.error("No se pudo iniciar AutoHotkey")
-                return False
-            
-            # Enviar comandos a AHK
-            if self.ahk_manager.ejecutar_acciones_ahk(x_campo, y_campo, self.nombre_archivo):
-                time.sleep(10)  # Esperar a que AHK complete la acción
-            else:
-                logger.error("Error enviando comando a AHK")
-                return False
-        else:
-            logger.error("No se pudo encontrar la ventana de archivo.")
-            
-        if success:
-            self.model.alt_n_used = True
-        return success
-        
-    def run_sequence(self):
-        """Ejecuta la secuencia completa de imágenes"""
-        for imagen, clicks, confianza in self.model.image_sequence:
-            # Verificar si está pausado
-            if self.model.is_paused:
-                with self.model.pause_condition:
-                    while self.model.is_paused and self.model.is_running:
-                        self.model.pause_condition.wait()
-                if not self.model.is_running:  # Verificar si se detuvo durante la pausa
-                    return False
-            
-            # Manejar comportamiento especial para b4
-            if "b4.png" in imagen:
-                success = self.handle_b4_special_behavior(imagen, clicks, confianza)
-            else:
-                # Realizar la búsqueda y clic normal para otras imágenes
-                success = self.model.click_button(imagen, clicks, confianza)
-            
-            if not success:
-                self.view.log_message(f"Error: No se pudo encontrar el botón '{imagen}' después de {self.model.current_lote} intentos")
-                return False
-            
-            # Esperar 2 segundos entre imágenes (como en el ejemplo)
-            if imagen != self.model.image_sequence[-1][0] and self.model.is_running:
-                time.sleep(2)
-        
-        return True
-    
-    def run_lotes(self):
-        """Ejecuta los lotes de búsqueda con mejor manejo de estado"""
-        try:
-            # Siempre comenzar desde el lote inicial configurado
-            current_lote = self.model.lote_inicial
-            lote_final = self.model.lote_final
-            
-            # Actualizar el current_lote en el modelo
-            self.model.current_lote = current_lote
-            
-            while current_lote <= lote_final and self.model.is_running:
-                # Verificar pausa de manera más eficiente
-                with self.model.pause_condition:
-                    while self.model.is_paused and self.model.is_running:
-                        self.model.pause_condition.wait()
-                
-                if not self.model.is_running:
-                    break
-                    
-                self.model.current_lote = current_lote
-                
-                # Reiniciar flag de Alt+N para cada lote
-                self.model.alt_n_used = False
-                
-                # Generar nombre de archivo usando el patrón configurado
-                formato_texto = self.model.formato_texto
-                self.nombre_archivo = f"{formato_texto} {current_lote}.kml"
-                
-                self.view.log_message(f"Procesando archivo: {self.nombre_archivo}")
-                self.view.log_message(f"Usando formato: {formato_texto}")
-                
-                # Realizar la secuencia completa
-                success = self.run_sequence()
-                
-                if success:
-                    # Presionar Enter 3 veces después de cada secuencia
-                    self.view.log_message("Presionando Enter 3 veces")
-                    pyautogui.press('enter', presses=3, interval=0.5)
-                    time.sleep(1)
-                    
-                    # Cada 10 lotes, presionar 'S' para guardar
-                    if current_lote % 10 == 0:
-                        self.view.log_message("Presionando 'S' para guardar cambios")
-                        pyautogui.press('s')
-                        time.sleep(1)  # Pequeña espera después de guardar
-                    
-                    self.view.log_message(f"Secuencia completada para lote {current_lote} de {lote_final}")
-                else:
-                    self.view.log_message(f"Secuencia interrumpida para lote {current_lote} de {lote_final}")
-                    break
-                
-                # Pasar al siguiente lote
-                current_lote += 1
-                
-                # Esperar el tiempo configurado entre lotes (si no es el último lote)
-                if current_lote <= lote_final and self.model.is_running:
-                    self.view.log_message(f"Esperando {self.model.delay_time} segundos antes del próximo lote...")
-                    
-                    # Contar el tiempo de espera mostrando el progreso
-                    for i in range(self.model.delay_time, 0, -1):
-                        if not self.model.is_running:
-                            break
-                        if self.model.is_paused:
-                            with self.model.pause_condition:
-                                while self.model.is_paused and self.model.is_running:
-                                    self.model.pause_condition.wait()
-                            if not self.model.is_running:
-                                break
-                        # Actualizar el mensaje cada segundo
-                        self.view.log_message(f"Tiempo restante: {i} segundos")
-                        time.sleep(1)
-                        # Eliminar el mensaje anterior
-                        self.view.status_text.delete("end-2l", "end-1l")
-            
-            # Después de completar todos los lotes
-            if self.model.is_running:  # Solo si se completó naturalmente (no detenido)
-                self.view.log_message("Presionando Ctrl+S para guardar todos los cambios")
-                pyautogui.hotkey('ctrl', 's')
-                time.sleep(1)  # Esperar un momento después de guardar
-                
-                # Mostrar mensaje emergente
-                messagebox.showinfo("Proceso Completado", "El proceso ha terminado exitosamente.")
-            
-            self.model.set_running(False)
-            self.view.log_message("Proceso completado")
-            
-        except Exception as e:
-            logger.error(f"Error inesperado en run_lotes: {str(e)}")
-            self.model.set_running(False)
-            self.view.log_message(f"Error inesperado: {str(e)}")
-    
     def start_search(self):
         """Inicia la búsqueda en un hilo separado"""
         if not self.authenticated:
@@ -348,9 +131,6 @@ class ImageSearchController:
             
         if not self.model.is_running:
             self.model.set_running(True)
-            self.model.set_paused(False)
-            with self.model.pause_condition:
-                self.model.pause_condition.notify_all()
             self.view.log_message("Iniciando proceso de búsqueda...")
             self.view.log_message(f"Formato para el texto: {self.model.formato_texto}")
             self.view.log_message(f"Lotes: {self.model.lote_inicial} a {self.model.lote_final}")
@@ -358,11 +138,11 @@ class ImageSearchController:
             
             # Mostrar la secuencia a ejecutar
             self.view.log_message("Secuencia predefinida a ejecutar:")
-            for i, (imagen, clicks, confianza) in enumerate(self.model.image_sequence, 1):
+            for i, (imagen, clicks, confianza, _) in enumerate(self.model.image_sequence, 1):
                 self.view.log_message(f"  {i}. {imagen} (clics: {clicks}, confianza: {confianza})")
             
             # Iniciar el hilo para ejecutar los lotes
-            self.search_thread = threading.Thread(target=self.run_lotes)
+            self.search_thread = threading.Thread(target=self.runner.run_lotes)
             self.search_thread.daemon = True
             self.search_thread.start()
     
@@ -382,8 +162,6 @@ class ImageSearchController:
             
         if self.model.is_running and self.model.is_paused:
             self.model.set_paused(False)
-            with self.model.pause_condition:
-                self.model.pause_condition.notify_all()
             self.view.log_message("Búsqueda reanudada")
     
     def stop_search(self):
@@ -392,8 +170,5 @@ class ImageSearchController:
             return
             
         self.model.set_running(False)
-        self.model.set_paused(False)
-        with self.model.pause_condition:
-            self.model.pause_condition.notify_all()
         self.ahk_manager.stop_ahk()
         self.view.log_message("Proceso detenido")
\ No newline at end of file
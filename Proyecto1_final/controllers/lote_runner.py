@@ -0,0 +1,372 @@
+import os
+import time
+import logging
+from utils.journal import CheckpointJournal
+from utils.metrics import MetricsRecorder
+
+logger = logging.getLogger(__name__)
+
+class LoteRunner:
+    """
+    Ejecución de los lotes (secuencia de botones + AHK) independiente de la interfaz
+
+    La vista solo necesita log_message(mensaje, transitorio=False) y
+    proceso_completado(); la usan tanto ImageSearchController (Tk) como la
+    línea de comandos (cli.py).
+    """
+    def __init__(self, model, ahk_manager, view=None):
+        self.model = model
+        self.ahk_manager = ahk_manager
+        self.view = view
+        self.nombre_archivo = ""
+        self.resumen = None
+        
+        # Diario de progreso para reanudar un proceso interrumpido
+        config = self.model.config_manager
+        self.journal = CheckpointJournal(
+            config.get("journal_file", "progreso.jsonl"),
+            fsync_cada=config.get("journal_fsync_every", 20),
+            fsync_intervalo=config.get("journal_fsync_interval", 5)
+        )
+        # Tiempos por paso y por lote (JSONL + textfile de Prometheus)
+        self.metricas = MetricsRecorder(
+            config.get("metrics_file", "metricas.jsonl"),
+            config.get("metrics_prometheus_file", "metricas.prom")
+        )
+        self.pasos_lote = []
+    
+    def validar(self):
+        """Valida todas las entradas antes de iniciar"""
+        errors = []
+        
+        # Validación simplificada - ya no se requiere distrito
+        if self.model.lote_inicial > self.model.lote_final:
+            errors.append("El lote inicial no puede ser mayor al lote final")
+        
+        if self.model.lote_inicial < 1 or self.model.lote_final < 1:
+            errors.append("Los números de lote deben ser positivos")
+        
+        # Verificar que las imágenes existan
+        for imagen, *_ in self.model.image_sequence:
+            if not os.path.exists(imagen):
+                errors.append(f"No se encuentra la imagen: {imagen}")
+        
+        return errors
+    
+    def encontrar_ventana_archivo(self):
+        """
+        Espera a que aparezca la ventana de archivo y devuelve su esquina en pantalla
+        
+        Returns:
+            tuple: (x, y) en pantalla, o None si no apareció en file_window_attempts
+                   intentos (de wait_timeout segundos) o si se detuvo el proceso
+        """
+        intentos = 1
+        max_intentos = self.model.config_manager.get("file_window_attempts", 3)
+        confianza_minima = self.model.confianza_ventana_archivo
+        
+        while self.model.is_running and intentos <= max_intentos: 
+            # Obtener template desde la caché del modelo
+            if self.model.template_library.get(self.model.ventana_archivo_template) is None:
+                logger.error("No se pudo cargar la imagen 'cargarArchivo.png'")
+                return None
+            
+            try:
+                # Esperar a que la ventana esté visible y estable
+                resultado = self.model.wait_for(self.model.ventana_archivo_template, confianza_minima=confianza_minima)
+                
+                if resultado is not None:
+                    logger.info(f"Ventana encontrada con confianza: {resultado.score:.2f}")
+                    # Devolver tupla (x, y) en coordenadas de pantalla
+                    offset_x, offset_y = self.model.analisis["offset"]
+                    return (offset_x + resultado.loc[0], offset_y + resultado.loc[1])
+                elif self.model.is_running:
+                    logger.info(f"Intento {intentos}: Mejor coincidencia: {self.model.ultima_confianza:.2f}")
+                    intentos += 1
+                    
+            except Exception as e:
+                logger.error(f"Error durante la búsqueda: {e}")
+                self.model.token.dormir(1)
+                intentos += 1
+
+        return None
+
+    def handle_b4_special_behavior(self, imagen, clicks, confianza, post_condicion=None):
+        """Maneja el comportamiento especial para la imagen b4"""
+        with self.model.traza.tramo("handle_b4_special_behavior", "secuencia"):
+            return self._handle_b4_special_behavior(imagen, clicks, confianza, post_condicion)
+    
+    def _handle_b4_special_behavior(self, imagen, clicks, confianza, post_condicion):
+        # Precionamos el boton b4 (Documentos) y confirmamos que se abre la ventana de archivo
+        success = self.model.click_button(imagen, clicks, confianza, post_condicion=post_condicion)
+        if not success:
+            # La ventana de archivo no se abrió: no tiene sentido esperarla
+            return False
+
+        # Esperar a que aparezca la ventana de archivo
+        with self.model.traza.tramo("encontrar_ventana_archivo", "espera"):
+            coordenadas_ventana = self.encontrar_ventana_archivo()
+
+        if coordenadas_ventana:
+            x_ventana, y_ventana = coordenadas_ventana
+            logger.info(f"Coordenadas ventana: x={x_ventana}, y={y_ventana}")
+            
+            # Calcular coordenadas del campo de texto
+            x_campo = x_ventana + 294
+            y_campo = y_ventana + 500
+            logger.info(f"Coordenadas campo texto: x={x_campo}, y={y_campo}")
+            
+            # Iniciar AHK si no está corriendo
+            if not self.ahk_manager.start_ahk():
+                logger.error("No se pudo iniciar AutoHotkey")
+                return False
+            
+            # Enviar comandos a AHK (vuelve cuando AHK confirma que terminó)
+            self.model.entrada.registrar("ahk", comando="ESCRIBIR_ARCHIVO", x=x_campo, y=y_campo,
+                                         nombre_archivo=self.nombre_archivo)
+            inicio_ahk = self.model.reloj.ahora()
+            with self.model.traza.tramo("ahk ESCRIBIR_ARCHIVO", "ahk", nombre_archivo=self.nombre_archivo):
+                enviado, respuesta = self.ahk_manager.ejecutar_acciones_ahk(x_campo, y_campo, self.nombre_archivo)
+            # Ida y vuelta del comando en el reloj del modelo (como total_ms), también si AHK no respondió
+            self.model.anotar_medicion("ahk_ms", (self.model.reloj.ahora() - inicio_ahk) * 1000, acumular=False)
+            if respuesta is not None:
+                self.model.anotar_medicion("ahk_ack_ms", respuesta["ack_ms"], acumular=False)
+            if enviado:
+                # Esperar a que la ventana de archivo se cierre
+                timeout_ahk = self.model.config_manager.get("ahk_timeout", 10)
+                with self.model.traza.tramo("esperar_cierre_ventana", "espera"):
+                    cerrada = self.model.wait_for(self.model.ventana_archivo_template,
+                                                  confianza_minima=self.model.confianza_ventana_archivo,
+                                                  timeout=timeout_ahk, visible=False)
+                if cerrada is None and self.model.is_running:
+                    logger.warning("La ventana de archivo sigue abierta tras el comando AHK")
+            else:
+                logger.error("Error enviando comando a AHK")
+                return False
+        else:
+            logger.error("No se pudo encontrar la ventana de archivo.")
+            return False
+            
+        self.model.alt_n_used = True
+        return True
+        
+    def registrar_resumen_metricas(self):
+        """Registra en el log dónde se va el tiempo de un lote (p50/p95 por tipo de medida)"""
+        tiempos = self.metricas.resumen()["tiempos_ms"]
+        for metrica in ("lote_total_ms", "lote_captura_ms", "lote_match_ms", "lote_ahk_ms", "lote_otros_ms",
+                        "paso_aparicion_ms", "paso_transicion_ms"):
+            if metrica in tiempos and tiempos[metrica]["n"]:
+                stats = tiempos[metrica]
+                logger.info(f"Métrica {metrica}: n={stats['n']}, media {stats['media']:.0f} ms, "
+                            f"p50 {stats['p50']:.0f} ms, p95 {stats['p95']:.0f} ms")
+    
+    def run_sequence(self, paso_inicial=0):
+        """
+        Ejecuta la secuencia completa de imágenes
+        
+        Args:
+            paso_inicial (int): Índice del primer paso a ejecutar (al reanudar a mitad de lote)
+        """
+        with self.model.traza.tramo("run_sequence", "secuencia", paso_inicial=paso_inicial):
+            return self._run_sequence(paso_inicial)
+    
+    def _run_sequence(self, paso_inicial):
+        for indice, (imagen, clicks, confianza, post_condicion) in enumerate(self.model.image_sequence):
+            if indice < paso_inicial:
+                continue
+            
+            # Verificar si está pausado (y si se detuvo durante la pausa)
+            if not self.model.token.punto_control():
+                return False
+            
+            self.model.iniciar_medicion()
+            inicio = self.model.reloj.ahora()
+            try:
+                with self.model.traza.tramo(f"paso {indice} {os.path.basename(imagen)}", "secuencia"):
+                    # Manejar comportamiento especial para b4
+                    if "b4.png" in imagen:
+                        success = self.handle_b4_special_behavior(imagen, clicks, confianza, post_condicion)
+                    else:
+                        # Realizar la búsqueda y clic normal para otras imágenes; el botón del
+                        # paso siguiente y el objetivo de la post-condición se localizan en el
+                        # mismo frame (el resto se descartaría al invalidar el análisis tras el clic)
+                        pendientes = [paso[0] for paso in self.model.image_sequence[indice + 1:indice + 2]]
+                        if post_condicion is not None and post_condicion[1] is not None:
+                            pendientes.append(post_condicion[1])
+                        pendientes = list(dict.fromkeys(pendientes))
+                        success = self.model.click_button(imagen, clicks, confianza, pendientes, post_condicion)
+            finally:
+                medicion = self.model.terminar_medicion()
+                medicion.update(lote=self.model.current_lote, paso=indice, imagen=imagen,
+                                total_ms=(self.model.reloj.ahora() - inicio) * 1000)
+            medicion["ok"] = success
+            self.pasos_lote.append(self.metricas.registrar_paso(medicion))
+            
+            if not success:
+                self.view.log_message(f"Error: No se pudo encontrar el botón '{imagen}' después de {self.model.current_lote} intentos")
+                return False
+            
+            self.journal.registrar_paso(self.model.current_lote, indice, imagen)
+        
+        return True
+    
+    def run_lotes(self):
+        """
+        Ejecuta los lotes de búsqueda con mejor manejo de estado
+        
+        Returns:
+            dict: Resumen de la ejecución (lotes completados, duración, ritmo, estadísticas)
+        """
+        inicio = self.model.reloj.ahora()
+        inicio_real = time.monotonic()
+        lote_desde = current_lote = self.model.lote_inicial
+        lotes_completados = 0
+        completado = False
+        error = None
+        try:
+            # Comenzar desde el lote inicial configurado, o desde el último paso
+            # confirmado si la ejecución anterior con el mismo rango se interrumpió
+            current_lote = self.model.lote_inicial
+            lote_final = self.model.lote_final
+            paso_inicial = 0
+            
+            reanudacion = None
+            if self.model.config_manager.get("resume_from_journal", True):
+                reanudacion = self.journal.punto_reanudacion(current_lote, lote_final, self.model.formato_texto)
+            if reanudacion:
+                current_lote, paso_inicial = reanudacion
+                self.journal.reanudar(current_lote, paso_inicial)
+                lote_desde = current_lote
+                self.view.log_message(f"Reanudando desde el lote {current_lote}, paso {paso_inicial + 1}")
+            else:
+                self.journal.iniciar(current_lote, lote_final, formato=self.model.formato_texto)
+            
+            # Actualizar el current_lote en el modelo
+            self.model.current_lote = current_lote
+            
+            while current_lote <= lote_final and self.model.is_running:
+                # Verificar pausa
+                if not self.model.token.punto_control():
+                    break
+                    
+                self.model.current_lote = current_lote
+                self.model.notify_observers("lote_iniciado", current_lote)
+                
+                # Reiniciar flag de Alt+N para cada lote
+                self.model.alt_n_used = False
+                self.model.invalidar_analisis()
+                
+                # Generar nombre de archivo usando el patrón configurado
+                formato_texto = self.model.formato_texto
+                self.nombre_archivo = f"{formato_texto} {current_lote}.kml"
+                
+                self.view.log_message(f"Procesando archivo: {self.nombre_archivo}")
+                self.view.log_message(f"Usando formato: {formato_texto}")
+                
+                # Realizar la secuencia completa
+                self.model.traza.iniciar(f"lote-{current_lote}", lote=current_lote, archivo=self.nombre_archivo)
+                inicio_lote = self.model.reloj.ahora()
+                self.pasos_lote = []
+                success = self.run_sequence(paso_inicial)
+                paso_inicial = 0
+                
+                if success:
+                    # Presionar Enter 3 veces después de cada secuencia
+                    self.view.log_message("Presionando Enter 3 veces")
+                    for _ in range(3):
+                        self.model.entrada.press('enter')
+                        self.model.token.dormir(0.5)
+                    self.model.token.dormir(1)
+                    
+                    # Cada 10 lotes, presionar 'S' para guardar
+                    if current_lote % 10 == 0:
+                        self.view.log_message("Presionando 'S' para guardar cambios")
+                        self.model.entrada.press('s')
+                        self.model.token.dormir(1)  # Pequeña espera después de guardar
+                    
+                    self.journal.registrar_lote(current_lote)
+                    self.metricas.registrar_lote(current_lote, self.pasos_lote,
+                                                 (self.model.reloj.ahora() - inicio_lote) * 1000, True)
+                    lotes_completados += 1
+                    self.view.log_message(f"Secuencia completada para lote {current_lote} de {lote_final}")
+                else:
+                    self.metricas.registrar_lote(current_lote, self.pasos_lote,
+                                                 (self.model.reloj.ahora() - inicio_lote) * 1000, False)
+                    self.view.log_message(f"Secuencia interrumpida para lote {current_lote} de {lote_final}")
+                    break
+                
+                # Pasar al siguiente lote
+                current_lote += 1
+                
+                # Esperar el tiempo configurado entre lotes (si no es el último lote)
+                if current_lote <= lote_final and self.model.is_running:
+                    self.view.log_message(f"Esperando {self.model.delay_time} segundos antes del próximo lote...")
+                    
+                    # Contar el tiempo de espera mostrando el progreso
+                    for i in range(self.model.delay_time, 0, -1):
+                        # Actualizar el mensaje cada segundo (reemplaza al anterior)
+                        self.view.log_message(f"Tiempo restante: {i} segundos", transitorio=True)
+                        if not self.model.token.dormir(1):
+                            break
+                
+                # La traza del lote incluye la espera hasta el siguiente
+                self.model.traza.guardar()
+            
+            # Después de completar todos los lotes
+            if self.model.is_running:  # Solo si se completó naturalmente (no detenido)
+                self.view.log_message("Presionando Ctrl+S para guardar todos los cambios")
+                self.model.entrada.hotkey('ctrl', 's')
+                self.model.token.dormir(1)  # Esperar un momento después de guardar
+                
+                # Solo se cierra el diario si se procesaron todos los lotes
+                completado = current_lote > lote_final
+                if completado:
+                    self.journal.finalizar()
+                
+                # Avisar del final (mensaje emergente en la interfaz)
+                self.view.proceso_completado()
+            else:
+                # Detenido a propósito: el próximo inicio no reanuda a mitad de este lote
+                self.journal.detener(current_lote)
+
+            self.model.set_running(False)
+            self.view.log_message("Proceso completado")
+            
+        except Exception as e:
+            logger.error(f"Error inesperado en run_lotes: {str(e)}")
+            self.model.set_running(False)
+            self.view.log_message(f"Error inesperado: {str(e)}")
+            error = str(e)
+        finally:
+            self.model.traza.guardar()
+            self.journal.cerrar()
+            logger.info(f"Diario de progreso: {self.journal.estadisticas()}")
+            self.metricas.cerrar()
+            self.registrar_resumen_metricas()
+            self.model.finalizar_sesion()
+        
+        # Con reloj virtual, duracion_s es lo que habría tardado la ejecución real
+        duracion = self.model.reloj.ahora() - inicio
+        self.resumen = {
+            "lote_inicial": self.model.lote_inicial,
+            "lote_final": self.model.lote_final,
+            "lote_desde": lote_desde,
+            "ultimo_lote": current_lote,
+            "formato": self.model.formato_texto,
+            "lotes_completados": lotes_completados,
+            "completado": completado,
+            "error": error,
+            "duracion_s": duracion,
+            "duracion_real_s": time.monotonic() - inicio_real,
+            "segundos_por_lote": duracion / lotes_completados if lotes_completados else None,
+            "lotes_por_hora": lotes_completados * 3600 / duracion if duracion > 0 else 0.0,
+            "matcher": self.model.matcher.estadisticas(),
+            "cambios": self.model.detector_cambios.estadisticas() if self.model.detector_cambios else None,
+            "plantillas": self.model.template_library.estadisticas(),
+            "eventos": self.model.event_bus.estadisticas(),
+            "diario": self.journal.estadisticas(),
+            "metricas": self.metricas.resumen(),
+            "latencias": self.model.token.estadisticas(),
+            "reloj": self.model.reloj.estadisticas()
+        }
+        return self.resumen
@@ -1,16 +1,23 @@
 import tkinter as tk
+import atexit
+import queue
 import logging
+import logging.handlers
 from controllers.image_search_controller import ImageSearchController
 
-# Configurar logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler("automation.log", encoding='utf-8'),
-        logging.StreamHandler()
-    ]
-)
+# Configurar logging: los hilos (trabajo, Tk, eventos) solo encolan cada registro y
+# un hilo propio lo escribe en automation.log y en la consola, fuera del camino
+# de la captura y los clics
+cola_log = queue.Queue()
+formato_log = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+manejadores_log = [logging.FileHandler("automation.log", encoding='utf-8'), logging.StreamHandler()]
+for manejador in manejadores_log:
+    manejador.setFormatter(formato_log)
+# El QueueHandler solo resuelve el mensaje; el formato completo lo aplican los manejadores
+logging.basicConfig(level=logging.INFO, format='%(message)s', handlers=[logging.handlers.QueueHandler(cola_log)])
+escritor_log = logging.handlers.QueueListener(cola_log, *manejadores_log)
+escritor_log.start()
+atexit.register(escritor_log.stop)  # Escribe lo pendiente al salir
 
 logger = logging.getLogger(__name__)
 
@@ -1,45 +1,110 @@
-import threading
 import time
-import pyautogui
 import cv2
 import numpy as np
 from PIL import Image
 import os
 import logging
 from utils.config_manager import ConfigManager
+from utils.template_library import TemplateLibrary
+from utils.screen_capture import crear_capture_session, BackgroundCapture
+from utils.event_bus import EventBus
+from utils.cancellation import CancellationToken
+from utils.clock import crear_reloj
+from utils.input_driver import InputDriver
+from utils.session_recorder import SessionRecorder
+from utils.trace import TraceRecorder
+from utils.frame_change import FrameChangeDetector
+from models.template_matcher import TemplateMatcher
 
 logger = logging.getLogger(__name__)
 
 class ImageSearchModel:
-    def __init__(self):
-        self.config_manager = ConfigManager()
-        self.config_manager.load()
-        
-        self.is_running = False
-        self.is_paused = False
-        self.pause_event = threading.Event()
-        self.pause_condition = threading.Condition()
-        self.observers = []
+    def __init__(self, config_manager=None):
+        if config_manager is None:
+            config_manager = ConfigManager()
+            config_manager.load()
+        self.config_manager = config_manager
+        self.config_manager.activar_diferido(self.config_manager.get("config_debounce", 2))
+        
+        # Reloj de todas las esperas (real, o virtual para ejecuciones simuladas)
+        self.reloj = crear_reloj(self.config_manager.get("clock", "real"))
+        
+        # Estado de ejecución/pausa: todas las esperas despiertan al detener o pausar
+        self.token = CancellationToken(self.reloj)
+        # Los observadores reciben los eventos de forma asíncrona desde el bus
+        self.event_bus = EventBus(politicas=self.config_manager.get("event_policies"))
         self.alt_n_used = False
         
-        # Secuencia predefinida de imágenes
+        # Línea de tiempo por lote (solo con trace_dir configurado)
+        self.traza = TraceRecorder(self.config_manager.get("trace_dir", ""), reloj=self.reloj.ahora)
+        self.token.traza = self.traza
+        self.event_bus.traza = self.traza
+        
+        # Secuencia predefinida de imágenes: (imagen, clics, confianza, post-condición)
+        # La post-condición indica cómo confirmar que el clic hizo efecto:
+        # ("aparece", plantilla) espera a que se vea esa plantilla y
+        # ("cambia", None) espera a que cambie la zona pulsada
+        self.ventana_archivo_template = "img/cargarArchivo.png"
+        self.confianza_ventana_archivo = 0.6
         self.image_sequence = [
-            ("img/b1.png", 2, self.config_manager.get("confianza_minima", 0.68)),
-            ("img/b2.png", 1, self.config_manager.get("confianza_minima", 0.68)),
-            ("img/b3.png", 1, self.config_manager.get("confianza_minima", 0.68)),
-            ("img/b4.png", 1, self.config_manager.get("confianza_minima", 0.68)),
-            ("img/b1.png", 1, self.config_manager.get("confianza_minima", 0.68)),
-            ("img/b6.png", 1, self.config_manager.get("confianza_minima", 0.68)),
-            ("img/b7.png", 1, self.config_manager.get("confianza_minima", 0.68)),
-            ("img/b8.png", 1, self.config_manager.get("confianza_minima", 0.68))
+            ("img/b1.png", 2, self.config_manager.get("confianza_minima", 0.68), ("aparece", "img/b2.png")),
+            ("img/b2.png", 1, self.config_manager.get("confianza_minima", 0.68), ("aparece", "img/b3.png")),
+            ("img/b3.png", 1, self.config_manager.get("confianza_minima", 0.68), ("aparece", "img/b4.png")),
+            ("img/b4.png", 1, self.config_manager.get("confianza_minima", 0.68), ("aparece", self.ventana_archivo_template)),
+            ("img/b1.png", 1, self.config_manager.get("confianza_minima", 0.68), ("aparece", "img/b6.png")),
+            ("img/b6.png", 1, self.config_manager.get("confianza_minima", 0.68), ("aparece", "img/b7.png")),
+            ("img/b7.png", 1, self.config_manager.get("confianza_minima", 0.68), ("aparece", "img/b8.png")),
+            ("img/b8.png", 1, self.config_manager.get("confianza_minima", 0.68), ("cambia", None))
         ]
+        
+        # Cargar y preprocesar todas las plantillas una sola vez
+        self.template_library = TemplateLibrary()
+        self.template_library.precargar([paso[0] for paso in self.image_sequence] + [self.ventana_archivo_template])
+        
+        # La sesión de captura se abre en el hilo que la usa (mss no es compartible entre hilos)
+        self.capture_session = None
+        self.grabador = None
+        
+        # Clics y teclas (simulados al reproducir una sesión grabada)
+        self.entrada = InputDriver(simular=self.config_manager.get("simulate_input", False))
+        self.entrada.traza = self.traza
+        
+        # Matcher con memoria de la última posición de cada plantilla
+        self.matcher = TemplateMatcher(
+            padding=self.config_manager.get("roi_padding", 40),
+            factores_piramide=self.config_manager.get("pyramid_factors", {}),
+            plantillas_gris=self.config_manager.get("grayscale_templates", []),
+            verificar_color=self.config_manager.get("color_verify_templates", ["img/b4.png"]),
+            tolerancia_color=self.config_manager.get("color_tolerance", 30),
+            hilos=self.config_manager.get("match_threads", 4),
+            max_area_incremental=self.config_manager.get("incremental_max_area", 0.5)
+        )
+        self.matcher.cargar_posiciones(self.config_manager.get("ultimas_posiciones", {}))
+        
+        # Último frame analizado con detect_all, reutilizable por los pasos siguientes
+        self.analisis = None
+        self.ultima_confianza = 0.0
+        
+        # Si la pantalla no cambió desde el último análisis se reutilizan sus coincidencias
+        self.detector_cambios = None
+        if self.config_manager.get("change_detection", True):
+            self.detector_cambios = FrameChangeDetector(
+                tamano_tile=self.config_manager.get("change_tile_size", 32),
+                umbral=self.config_manager.get("change_threshold", 8),
+                mascaras=self.config_manager.get("change_masks", [])
+            )
+        self.resultados_previos = {}  # ruta -> (MatchResult, confianza) del frame de referencia
+        # Si solo cambió una parte, el matcher recalcula su mapa de correlación solo ahí
+        self.matching_incremental = self.config_manager.get("incremental_matching", True)
+        
+        # Tiempos del paso en curso (LoteRunner los vuelca en MetricsRecorder)
+        self.medicion = None
     
     def add_observer(self, observer):
-        self.observers.append(observer)
+        self.event_bus.suscribir(observer)
     
     def notify_observers(self, event, data=None):
-        for observer in self.observers:
-            observer.update(event, data)
+        self.event_bus.publicar(event, data)
     
     def set_configurable(self, key, value):
         """Método genérico para establecer valores configurables"""
@@ -48,12 +113,26 @@ class ImageSearchModel:
             self.config_manager.set(key, value)
             self.notify_observers(f"{key}_changed", value)
     
+    @property
+    def is_running(self):
+        return self.token.activo
+    
+    @property
+    def is_paused(self):
+        return self.token.pausado
+    
     def set_running(self, running):
-        self.is_running = running
+        if running:
+            self.token.iniciar()
+        else:
+            self.token.detener()
         self.notify_observers("running_changed", running)
     
     def set_paused(self, paused):
-        self.is_paused = paused
+        if paused:
+            self.token.pausar()
+        else:
+            self.token.reanudar()
         self.notify_observers("paused_changed", paused)
 
     # Propiedades para acceso directo a configuraciones comunes
@@ -119,88 +198,470 @@ class ImageSearchModel:
             # Fallback a formato por defecto
             return f"LT {lote_actual}.kml"
 
+    def get_capture_session(self):
+        """Devuelve la sesión de captura abierta, creándola si hace falta"""
+        if self.capture_session is None:
+            backend = self.config_manager.get("capture_backend", "pyautogui")
+            opciones = {}
+            if backend == "archivo":
+                opciones["rutas"] = self.config_manager.get("capture_archivos", [])
+            elif backend == "replay":
+                opciones["directorio"] = self.config_manager.get("replay_dir", "")
+                opciones["modo"] = self.config_manager.get("replay_mode", "tiempo")
+                opciones["velocidad"] = self.config_manager.get("replay_speed", 1.0)
+                opciones["reloj"] = self.reloj.ahora
+            fps = self.config_manager.get("capture_fps", 0)
+            if fps > 0:
+                # Un hilo captura continuamente; los pasos consumen el último frame
+                self.capture_session = BackgroundCapture(
+                    lambda: crear_capture_session(backend, **opciones),
+                    fps=fps,
+                    reloj=self.reloj.ahora,
+                    espera_maxima=self.config_manager.get("capture_wait_max", 1.0),
+                    activo=lambda: self.is_running
+                )
+                self.capture_session.traza = self.traza
+                logger.info(f"Sesión de captura abierta con backend '{backend}' en segundo plano a {fps} fps")
+            else:
+                self.capture_session = crear_capture_session(backend, **opciones)
+                logger.info(f"Sesión de captura abierta con backend '{backend}'")
+            
+            directorio = self.config_manager.get("record_dir", "")
+            if directorio:
+                self.iniciar_grabacion(os.path.join(directorio, time.strftime("%Y%m%d-%H%M%S")), backend)
+        return self.capture_session
+    
+    def iniciar_grabacion(self, directorio, backend):
+        """Graba frames, coincidencias y acciones de la sesión de captura abierta"""
+        self.grabador = SessionRecorder(directorio, reloj=self.reloj.ahora)
+        self.grabador.registrar_sesion(
+            backend=backend,
+            region=list(self.capture_session.region),
+            plantillas=list(self.template_library.templates)
+        )
+        self.capture_session.grabador = self.grabador
+        self.entrada.grabador = self.grabador
+        logger.info(f"Grabando la sesión en '{directorio}'")
+    
+    def cerrar_captura(self):
+        """Cierra la sesión de captura y registra su coste medio"""
+        if self.capture_session is not None:
+            stats = self.capture_session.estadisticas()
+            logger.info(f"Captura ({stats['backend']}): {stats['capturas']} frames, {stats['tiempo_medio_ms']:.1f} ms de media")
+            if "producidos" in stats:
+                logger.info(f"Hilo de captura: {stats['producidos']} frames producidos "
+                            f"({stats['captura_media_ms']:.1f} ms de media), {stats['esperas_largas']} esperas de más de {self.config_manager.get('capture_wait_max', 1.0)} s")
+            self.capture_session.close()
+            self.capture_session = None
+        # La próxima sesión no se compara con frames de esta
+        if self.detector_cambios is not None:
+            self.detector_cambios.olvidar()
+        self.resultados_previos = {}
+        self.matcher.olvidar_mapas()
+        if self.grabador is not None:
+            self.entrada.grabador = None
+            self.grabador.cerrar()
+            self.grabador = None
+    
+    def iniciar_medicion(self):
+        """Empieza a acumular los tiempos de un paso de la secuencia"""
+        self.medicion = {
+            "captura_ms": 0.0,
+            "match_ms": 0.0,
+            "capturas": 0,
+            "intentos": 0,
+            "mejor_score": 0.0,
+            "aparicion_ms": None,
+            "transicion_ms": None,
+            "reintentos_clic": 0,
+            "ahk_ms": None
+        }
+    
+    def anotar_medicion(self, clave, valor, acumular=True):
+        """Suma (o asigna) un valor a la medición del paso en curso, si la hay"""
+        if self.medicion is None or valor is None:
+            return
+        if acumular:
+            self.medicion[clave] = (self.medicion.get(clave) or 0) + valor
+        else:
+            self.medicion[clave] = valor
+    
+    def terminar_medicion(self):
+        """Devuelve la medición del paso en curso y deja de medir"""
+        medicion, self.medicion = self.medicion, None
+        return medicion or {}
+    
+    def capturar(self):
+        """
+        Captura un frame anotando su coste en la medición del paso
+
+        Returns:
+            tuple: (sesión, frame); frame es None si la captura en segundo plano
+                   dejó de esperar un frame porque el proceso se detuvo
+        """
+        session = self.get_capture_session()
+        inicio = self.reloj.ahora()
+        with self.traza.tramo("captura", "captura"):
+            frame = session.grab()
+        # Todas las duraciones del paso se miden con el reloj del modelo (total_ms incluido)
+        self.anotar_medicion("captura_ms", (self.reloj.ahora() - inicio) * 1000)
+        self.anotar_medicion("capturas", 1)
+        return session, frame
+    
+    def analizar_pantalla(self, rutas, confianza_minima):
+        """
+        Captura un frame y localiza en él todas las plantillas indicadas
+        
+        Si el detector de cambios no ve diferencias con el frame de referencia,
+        las plantillas ya buscadas en él (con la misma confianza) no se vuelven
+        a correlacionar: se reutiliza su resultado. Si cambió solo una parte, el
+        matcher recorrelaciona únicamente los rectángulos cambiados.
+        
+        Returns:
+            dict: análisis con el frame_id, su instante, el offset de la captura
+                  y los resultados por plantilla; None si no se obtuvo un frame (proceso detenido)
+        """
+        session, frame = self.capturar()
+        if frame is None:
+            self.analisis = None
+            return None
+        rutas = list(dict.fromkeys(rutas))
+        
+        reutilizables = {}
+        cambios = None
+        if self.detector_cambios is not None:
+            detector = self.detector_cambios
+            tiles = detector.comparar(frame)
+            if tiles is not None and not tiles.any():
+                reutilizables = {ruta: resultado for ruta, (resultado, confianza) in self.resultados_previos.items()
+                                 if ruta in rutas and confianza == confianza_minima}
+                detector.plantillas_omitidas += len(reutilizables)
+                cambios = {"desde": detector.version, "hasta": detector.version, "rectangulos": []}
+            else:
+                desde = detector.version if tiles is not None else None
+                rectangulos = detector.rectangulos(tiles)
+                detector.fijar_referencia(frame, tiles)
+                self.resultados_previos = {}
+                cambios = {"desde": desde, "hasta": detector.version, "rectangulos": rectangulos}
+            if not self.matching_incremental:
+                cambios = None
+        
+        templates = [t for t in (self.template_library.get(ruta) for ruta in rutas if ruta not in reutilizables) if t is not None]
+        nuevos = {}
+        if templates:
+            frame_gris = session.gray() if any(self.matcher.usa_gris(t.ruta) for t in templates) else None
+            inicio = self.reloj.ahora()
+            with self.traza.tramo("match", "match", plantillas=len(templates)):
+                nuevos = self.matcher.detect_all(frame, templates, confianza_minima, frame_gris, cambios)
+            self.anotar_medicion("match_ms", (self.reloj.ahora() - inicio) * 1000)
+            for resultado in nuevos.values():
+                if resultado.score > confianza_minima:
+                    x, y = resultado.loc
+                    resultado.parche = frame[y:y + resultado.alto, x:x + resultado.ancho].copy()
+                if self.detector_cambios is not None:
+                    self.resultados_previos[resultado.ruta] = (resultado, confianza_minima)
+        resultados = {ruta: reutilizables.get(ruta) or nuevos.get(ruta) for ruta in rutas
+                      if ruta in reutilizables or ruta in nuevos}
+        if self.grabador is not None:
+            self.grabador.registrar_matches(session.frame_id, resultados)
+        self.analisis = {
+            "frame_id": session.frame_id,
+            "timestamp": self.reloj.ahora(),
+            "offset": session.offset,
+            "resultados": resultados
+        }
+        return self.analisis
+    
+    def resultado_analizado(self, imagen, confianza_minima):
+        """Resultado de la plantilla en el último análisis, si es reciente y supera el umbral"""
+        if self.analisis is None:
+            return None
+        if self.reloj.ahora() - self.analisis["timestamp"] > self.config_manager.get("analysis_max_age", 3):
+            return None
+        resultado = self.analisis["resultados"].get(imagen)
+        if resultado is None or resultado.score <= confianza_minima:
+            return None
+        return resultado
+    
+    def invalidar_analisis(self):
+        """Descarta el último análisis (tras un cambio de pantalla conocido)"""
+        self.analisis = None
+        # Con captura en segundo plano, los frames ya capturados son de antes del cambio
+        if self.capture_session is not None:
+            self.capture_session.descartar_anteriores()
+    
+    def finalizar_sesion(self):
+        """Libera la captura, guarda las posiciones aprendidas y registra estadísticas"""
+        self.cerrar_captura()
+        self.matcher.cerrar()
+        self.invalidar_analisis()
+        self.config_manager.set("ultimas_posiciones", self.matcher.exportar_posiciones())
+        
+        self.config_manager.flush()
+        
+        stats = self.config_manager.estadisticas()
+        logger.info(f"Configuración: {stats['flushes']} escrituras, {stats['sets_agrupados']} cambios agrupados, "
+                    f"{stats['tiempo_medio_flush_ms']:.1f} ms de media")
+        stats = self.token.estadisticas()
+        if stats["pausa"]["n"] or stats["parada"]["n"]:
+            logger.info(f"Latencia de pausa: media {stats['pausa']['media_ms']:.0f} ms, máx {stats['pausa']['max_ms']:.0f} ms; "
+                        f"de parada: media {stats['parada']['media_ms']:.0f} ms, máx {stats['parada']['max_ms']:.0f} ms")
+        stats = self.event_bus.estadisticas()
+        logger.info(f"Eventos: {stats['publicados']} publicados, {stats['entregados']} entregados, "
+                    f"{stats['coalescidos']} coalescidos, {stats['descartados']} descartados")
+        stats = self.template_library.estadisticas()
+        logger.info(f"Caché de plantillas: {stats['hits']} hits, {stats['misses']} misses, {stats['recargas']} recargas")
+        if self.detector_cambios is not None:
+            stats = self.detector_cambios.estadisticas()
+            logger.info(f"Detector de cambios: {stats['sin_cambios']}/{stats['comparaciones']} frames sin cambios, "
+                        f"{stats['plantillas_omitidas']} búsquedas omitidas, {stats['tiempo_medio_ms']:.2f} ms de media")
+        stats = self.matcher.estadisticas()
+        logger.info(f"Búsqueda por ROI: {stats['aciertos_roi']}/{stats['busquedas_roi']} aciertos "
+                    f"({stats['hit_rate_roi']:.0%}), {stats['busquedas_completas']} búsquedas completas, "
+                    f"{stats['busquedas_incrementales']} incrementales "
+                    f"({stats['fraccion_recalculada_media']:.0%} del frame de media), "
+                    f"{stats['tiempo_ahorrado_ms']:.0f} ms ahorrados")
+
     @property
     def confianza_minima(self):
         return self.config_manager.get("confianza_minima", 0.68)
     
-    def click_button(self, imagen, clicks=1, confianza_minima=None):
+    def wait_for(self, imagen, stable_frames=None, timeout=None, confianza_minima=None, pendientes=None, visible=True):
         """
-        Busca un botón en pantalla y hace clic en él
+        Espera a que un botón esté visible y estable en pantalla
+        
+        Sondea la pantalla a wait_poll_hz capturas por segundo y vuelve en cuanto
+        la plantilla lleva stable_frames frames consecutivos en la misma posición
+        sin cambios de píxeles, en lugar de dormir un tiempo fijo.
         
         Args:
-            imagen (str): Ruta de la imagen del botón a buscar
-            clicks (int): Número de clics a realizar
+            imagen (str): Ruta de la imagen a esperar
+            stable_frames (int): Frames consecutivos estables necesarios
+            timeout (float): Segundos máximos de espera
             confianza_minima (float): Umbral de confianza para la detección (0-1)
+            pendientes (list): Plantillas que se localizan en el mismo frame
+            visible (bool): False para esperar a que la plantilla desaparezca
         
         Returns:
-            bool: True si encontró el botón, False en caso contrario
+            MatchResult: última coincidencia si se cumplió la condición, None si
+                         se agotó el tiempo o se detuvo el proceso. La mejor
+                         confianza observada queda en self.ultima_confianza
         """
         if confianza_minima is None:
             confianza_minima = self.confianza_minima
+        if stable_frames is None:
+            stable_frames = self.config_manager.get("wait_stable_frames", 2)
+        if timeout is None:
+            timeout = self.config_manager.get("wait_timeout", 10)
+        periodo = 1.0 / self.config_manager.get("wait_poll_hz", 5)
+        tolerancia = self.config_manager.get("wait_stable_tolerance", 2.0)
+        rutas = [imagen] + [ruta for ruta in (pendientes or []) if ruta != imagen]
+        
+        limite = self.reloj.ahora() + timeout
+        consecutivos = 0
+        anterior = None
+        self.ultima_confianza = 0.0
+        
+        while self.is_running:
+            # Verificar si está pausado (la pausa no consume el tiempo de espera)
+            if self.is_paused:
+                if not self.token.punto_control():
+                    return None
+                limite = self.reloj.ahora() + timeout
+                consecutivos = 0
+                anterior = None
             
-        intentos = 1
-        tiempo_entre_intentos = 1.5
-        tiempo_entre_lotes = 10
+            inicio = self.reloj.ahora()
+            resultado = None
+            if consecutivos == 0 and visible:
+                resultado = self.resultado_analizado(imagen, confianza_minima)
+            if resultado is None:
+                analisis = self.analizar_pantalla(rutas, confianza_minima)
+                if analisis is None:
+                    return None
+                resultado = analisis["resultados"].get(imagen)
+            if resultado is None:
+                return None
+            self.ultima_confianza = max(self.ultima_confianza, resultado.score)
+            
+            encontrado = resultado.score > confianza_minima
+            if not visible:
+                consecutivos = 0 if encontrado else consecutivos + 1
+            elif not encontrado:
+                consecutivos = 0
+                anterior = None
+            else:
+                estable = (anterior is not None and anterior.loc == resultado.loc
+                           and cv2.absdiff(anterior.parche, resultado.parche).mean() <= tolerancia)
+                consecutivos = consecutivos + 1 if estable else 1
+                anterior = resultado
+            
+            if consecutivos >= stable_frames:
+                return resultado
+            if inicio >= limite:
+                return None
+            self.token.esperar(periodo - (self.reloj.ahora() - inicio))
+        
+        return None
+
+    def umbral_de(self, imagen):
+        """Umbral de confianza con el que se busca cada plantilla"""
+        if imagen == self.ventana_archivo_template:
+            return self.confianza_ventana_archivo
+        return self.confianza_minima
+
+    def esperar_cambio(self, loc, parche, timeout):
+        """
+        Espera a que cambien los píxeles de una zona respecto a una copia previa
+        
+        Returns:
+            bool: True si la zona cambió antes del timeout
+        """
+        periodo = 1.0 / self.config_manager.get("wait_poll_hz", 5)
+        umbral = self.config_manager.get("transition_change_threshold", 8.0)
+        x, y = loc
+        alto, ancho = parche.shape[:2]
+        limite = self.reloj.ahora() + timeout
         
         while self.is_running:
-            # Verificar si está pausado
+            # La pausa no consume el tiempo de espera
             if self.is_paused:
-                with self.pause_condition:
-                    while self.is_paused and self.is_running:
-                        self.pause_condition.wait()
-                if not self.is_running:
+                if not self.token.punto_control():
                     return False
+                limite = self.reloj.ahora() + timeout
             
-            # Obtener dimensiones de la pantalla
-            ancho_pantalla, alto_pantalla = pyautogui.size()
-            vm_region = (0, 0, ancho_pantalla, alto_pantalla)
+            inicio = self.reloj.ahora()
+            _, frame = self.capturar()
+            if frame is None:
+                return False
+            zona = frame[y:y + alto, x:x + ancho]
+            if zona.shape != parche.shape or cv2.absdiff(zona, parche).mean() > umbral:
+                return True
+            if inicio >= limite:
+                return False
+            self.token.esperar(periodo - (self.reloj.ahora() - inicio))
+        return False
 
-            # Capturar pantalla
-            screenshot = pyautogui.screenshot(region=vm_region)
-            img = cv2.cvtColor(np.array(screenshot), cv2.COLOR_RGB2BGR)
+    def verificar_transicion(self, post_condicion, resultado, pendientes=None, objetivo_visible=False):
+        """
+        Comprueba que el clic produjo la transición esperada
+        
+        Args:
+            post_condicion (tuple): ("aparece", plantilla) o ("cambia", None)
+            resultado (MatchResult): Coincidencia del botón pulsado (con su parche previo)
+            pendientes (list): Plantillas que se localizan en los mismos frames
+            objetivo_visible (bool): La plantilla de "aparece" ya se veía antes del clic;
+                entonces verla no prueba nada y además tiene que cambiar la zona pulsada
+        
+        Returns:
+            bool: True si la transición ocurrió dentro de transition_timeout
+        """
+        tipo, objetivo = post_condicion
+        timeout = self.config_manager.get("transition_timeout", 3)
+        if tipo == "aparece":
+            if objetivo_visible and not self.esperar_cambio(resultado.loc, resultado.parche, timeout):
+                return False
+            return self.wait_for(objetivo, stable_frames=1, timeout=timeout,
+                                 confianza_minima=self.umbral_de(objetivo), pendientes=pendientes) is not None
+        if tipo == "cambia":
+            return self.esperar_cambio(resultado.loc, resultado.parche, timeout)
+        logger.warning(f"Post-condición desconocida: {tipo}")
+        return True
 
-            # Cargar template
-            template = cv2.imread(imagen)
-            if template is None:
+    def click_button(self, imagen, clicks=1, confianza_minima=None, pendientes=None, post_condicion=None):
+        """
+        Busca un botón en pantalla y hace clic en él
+        
+        Args:
+            imagen (str): Ruta de la imagen del botón a buscar
+            clicks (int): Número de clics a realizar
+            confianza_minima (float): Umbral de confianza para la detección (0-1)
+            pendientes (list): Plantillas de los pasos siguientes; se localizan en
+                el mismo frame para que esos pasos no necesiten otra captura
+            post_condicion (tuple): Transición esperada tras el clic; si no ocurre
+                se repite el clic (hasta click_retries veces)
+        
+        Returns:
+            bool: True si encontró el botón (y se produjo la transición), False en caso
+                  contrario o si la transición no ocurrió tras agotar los reintentos
+                  (salvo con transition_failure_continue)
+        """
+        if confianza_minima is None:
+            confianza_minima = self.confianza_minima
+        # El objetivo de "aparece" se localiza en los mismos frames, para saber si ya se veía antes del clic
+        objetivo = post_condicion[1] if post_condicion is not None and post_condicion[0] == "aparece" else None
+        if objetivo is not None:
+            pendientes = list(dict.fromkeys(list(pendientes or []) + [objetivo]))
+            
+        intentos = 1
+        reintentos_clic = 0
+        max_reintentos_clic = self.config_manager.get("click_retries", 2)
+        inicio = self.reloj.ahora()
+        
+        while self.is_running:
+            # Obtener template (cacheado, se recarga solo si cambió en disco)
+            if self.template_library.get(imagen) is None:
                 self.notify_observers("error", f"No se pudo cargar la imagen '{imagen}'. Verifica la ruta y el formato.")
                 return False
 
-            h, w = template.shape[:2]
+            # Esperar a que el botón esté visible y estable (sin esperas fijas)
+            with self.traza.tramo("wait_for", "espera", imagen=imagen):
+                resultado = self.wait_for(imagen, confianza_minima=confianza_minima, pendientes=pendientes)
+            self.anotar_medicion("intentos", 1)
+            if self.medicion is not None:
+                self.medicion["mejor_score"] = max(self.medicion["mejor_score"], self.ultima_confianza)
 
-            # Buscar el botón
-            result = cv2.matchTemplate(img, template, cv2.TM_CCOEFF_NORMED)
-            _, max_val, _, max_loc = cv2.minMaxLoc(result)
-
-            if max_val > confianza_minima:
+            if resultado is not None:
+                # Tiempo hasta que el botón apareció estable (desde el inicio del paso)
+                self.anotar_medicion("aparicion_ms", (self.reloj.ahora() - inicio) * 1000, acumular=False)
                 # Calcular centro del botón
-                center_x = vm_region[0] + max_loc[0] + w//2
-                center_y = vm_region[1] + max_loc[1] + h//2
+                offset_x, offset_y = self.analisis["offset"]
+                center_x = offset_x + resultado.centro[0]
+                center_y = offset_y + resultado.centro[1]
                 
-                # Esperar 2.5 segundos antes de hacer clic
-                time.sleep(2.5)
+                objetivo_visible = (objetivo is not None
+                                    and self.resultado_analizado(objetivo, self.umbral_de(objetivo)) is not None)
                 
                 # Realizar clic
-                pyautogui.moveTo(center_x, center_y)
-                pyautogui.click(clicks=clicks)
+                self.entrada.click(center_x, center_y, clicks, imagen=imagen)
                 
                 self.notify_observers("image_found", {
                     "image": imagen,
                     "x": center_x,
                     "y": center_y,
-                    "confidence": max_val
+                    "confidence": resultado.score
                 })
-                return True
-            else:
-                if intentos % 10 == 0:
-                    logger.info(f"Intento {intentos}: Mejor coincidencia: {max_val:.2f}")
-                    time.sleep(tiempo_entre_lotes)
-                else:
-                    time.sleep(tiempo_entre_intentos)
-                    
+                
+                # La pantalla ya no es la analizada antes del clic
+                self.invalidar_analisis()
+                
+                if post_condicion is None:
+                    return True
+                inicio_transicion = self.reloj.ahora()
+                with self.traza.tramo("verificar_transicion", "espera", post_condicion=list(post_condicion)):
+                    transicion = self.verificar_transicion(post_condicion, resultado, pendientes, objetivo_visible)
+                self.anotar_medicion("transicion_ms", (self.reloj.ahora() - inicio_transicion) * 1000, acumular=False)
+                if transicion:
+                    return True
+                if not self.is_running:
+                    return False
+                
+                reintentos_clic += 1
+                self.anotar_medicion("reintentos_clic", 1)
+                if reintentos_clic > max_reintentos_clic:
+                    if self.config_manager.get("transition_failure_continue", False):
+                        logger.warning(f"El clic en '{imagen}' no produjo la transición esperada {post_condicion}; se continúa")
+                        return True
+                    logger.error(f"El clic en '{imagen}' no produjo la transición esperada {post_condicion} "
+                                 f"tras {max_reintentos_clic} reintentos")
+                    return False
+                logger.info(f"El clic en '{imagen}' no produjo la transición esperada, reintentando ({reintentos_clic}/{max_reintentos_clic})")
+            elif self.is_running:
+                logger.info(f"Intento {intentos}: Mejor coincidencia: {self.ultima_confianza:.2f}")
                 intentos += 1
                 self.notify_observers("image_not_found", {
                     "image": imagen,
-                    "confidence": max_val,
+                    "confidence": self.ultima_confianza,
                     "intento": intentos
                 })
         
@@ -0,0 +1,411 @@
+import os
+import time
+import threading
+import logging
+from concurrent.futures import ThreadPoolExecutor
+import cv2
+
+logger = logging.getLogger(__name__)
+
+class MatchResult:
+    """Resultado de buscar una plantilla en un frame"""
+    def __init__(self, ruta, score, loc, ancho, alto, modo, tiempo_ms):
+        self.ruta = ruta
+        self.score = score
+        self.loc = loc  # Esquina superior izquierda en coordenadas del frame
+        self.ancho = ancho
+        self.alto = alto
+        self.modo = modo  # "roi", "completa", "piramide" o "incremental"
+        self.tiempo_ms = tiempo_ms
+        self.gris = False
+        self.color_ok = None  # None si no se verificó el color
+        self.parche = None  # Copia de los píxeles encontrados (para comprobar estabilidad)
+
+    @property
+    def centro(self):
+        return self.loc[0] + self.ancho // 2, self.loc[1] + self.alto // 2
+
+class TemplateMatcher:
+    """
+    Template matching con región de interés aprendida
+
+    Recuerda, por plantilla, dónde se encontró por última vez. La siguiente
+    búsqueda se hace primero en esa zona ampliada con un margen (padding) y
+    solo si la confianza queda por debajo del umbral se recorre la pantalla
+    completa.
+
+    La búsqueda completa puede ser piramidal por plantilla: se correlaciona a
+    1/factor de resolución para obtener candidatos y cada uno se confirma a
+    resolución completa en una ventana pequeña, así que la confianza devuelta
+    es la misma TM_CCOEFF_NORMED que compara con confianza_minima.
+
+    Las plantillas listadas en plantillas_gris se correlacionan en un solo
+    canal. Si además están en verificar_color, la coincidencia se confirma en
+    BGR sobre la zona encontrada (correlación y color medio), para botones que
+    solo se distinguen por el color, como b4.png frente a b4no.png.
+
+    Si se le indican los cambios del frame (rectángulos que cambiaron desde
+    el frame de la versión anterior), guarda por plantilla el mapa completo de
+    correlación y solo recalcula la parte afectada: cada rectángulo ampliado
+    con el tamaño de la plantilla. El coste pasa a ser proporcional a lo que
+    cambia en la pantalla y no a su tamaño.
+
+    buscar() se ejecuta en los hilos del pool de detect_all: las posiciones,
+    los mapas y los contadores se leen y actualizan bajo self.lock, y solo la
+    correlación (matchTemplate) corre fuera de él.
+    """
+    MAX_CANDIDATOS = 3
+    TAMANO_MINIMO_PIRAMIDE = 8  # Lado mínimo (px) de la plantilla reducida
+
+    def __init__(self, padding=40, factores_piramide=None, plantillas_gris=None,
+                 verificar_color=None, tolerancia_color=30, hilos=None, max_area_incremental=0.5):
+        self.padding = padding
+        self.hilos = hilos or min(4, os.cpu_count() or 1)
+        self._pool = None
+        self.factores_piramide = dict(factores_piramide or {})
+        self.plantillas_gris = set(plantillas_gris or [])
+        self.verificar_color = set(verificar_color or [])
+        self.tolerancia_color = tolerancia_color
+        self.lock = threading.Lock()
+        self.ultimas_posiciones = {}
+        self.tiempos_completa = {}  # ruta -> tiempo medio (ms) de la búsqueda completa
+        # ruta -> (versión del frame, gris, forma del frame, mapa de correlación)
+        self.mapas = {}
+        # Fracción del frame a partir de la cual es más barato recalcular el mapa entero
+        self.max_area_incremental = max_area_incremental
+
+        self.busquedas_roi = 0
+        self.aciertos_roi = 0
+        self.busquedas_completas = 0
+        self.busquedas_piramide = 0
+        self.busquedas_gris = 0
+        self.rechazos_color = 0
+        self.tiempo_ahorrado_ms = 0.0
+        self.detecciones_multiples = 0
+        self.ultimo_detect_all_ms = 0.0
+        self.busquedas_incrementales = 0
+        self.fraccion_recalculada = 0.0  # Suma de la fracción del frame recorrelada en cada búsqueda incremental
+
+    def cargar_posiciones(self, posiciones):
+        """Inicializa la memoria de posiciones (por ejemplo desde la configuración)"""
+        with self.lock:
+            for ruta, loc in (posiciones or {}).items():
+                self.ultimas_posiciones[ruta] = tuple(loc)
+
+    def exportar_posiciones(self):
+        with self.lock:
+            return {ruta: list(loc) for ruta, loc in self.ultimas_posiciones.items()}
+
+    def olvidar(self, ruta=None):
+        """Descarta la posición aprendida de una plantilla (o de todas)"""
+        with self.lock:
+            if ruta is None:
+                self.ultimas_posiciones.clear()
+            else:
+                self.ultimas_posiciones.pop(ruta, None)
+
+    def olvidar_mapas(self):
+        """Descarta los mapas de correlación (los frames siguientes no son comparables)"""
+        with self.lock:
+            self.mapas.clear()
+
+    def usa_gris(self, ruta):
+        return ruta in self.plantillas_gris
+
+    def _region_roi(self, frame, template, loc):
+        alto_frame, ancho_frame = frame.shape[:2]
+        x0 = max(0, loc[0] - self.padding)
+        y0 = max(0, loc[1] - self.padding)
+        x1 = min(ancho_frame, loc[0] + template.ancho + self.padding)
+        y1 = min(alto_frame, loc[1] + template.alto + self.padding)
+        if x1 - x0 < template.ancho or y1 - y0 < template.alto:
+            return None
+        return x0, y0, x1, y1
+
+    def _buscar_roi(self, frame, plantilla, template, confianza_minima):
+        with self.lock:
+            loc = self.ultimas_posiciones.get(template.ruta)
+        if loc is None:
+            return None
+        region = self._region_roi(frame, template, loc)
+        if region is None:
+            return None
+
+        x0, y0, x1, y1 = region
+        inicio = time.perf_counter()
+        result = cv2.matchTemplate(frame[y0:y1, x0:x1], plantilla, cv2.TM_CCOEFF_NORMED)
+        _, max_val, _, max_loc = cv2.minMaxLoc(result)
+        tiempo_ms = (time.perf_counter() - inicio) * 1000
+        loc = (x0 + max_loc[0], y0 + max_loc[1])
+
+        with self.lock:
+            self.busquedas_roi += 1
+            if max_val < confianza_minima:
+                return None
+
+            self.aciertos_roi += 1
+            tiempo_completa = self.tiempos_completa.get(template.ruta)
+            if tiempo_completa is None:
+                # Sin medición previa: estimar por la proporción de área recorrida
+                area_frame = frame.shape[0] * frame.shape[1]
+                tiempo_completa = tiempo_ms * area_frame / ((x1 - x0) * (y1 - y0))
+            self.tiempo_ahorrado_ms += max(0.0, tiempo_completa - tiempo_ms)
+            self.ultimas_posiciones[template.ruta] = loc
+            # El mapa no se actualizó con este frame: ya no sirve de partida
+            self.mapas.pop(template.ruta, None)
+        return MatchResult(template.ruta, max_val, loc, template.ancho, template.alto, "roi", tiempo_ms)
+
+    def _candidatos_piramide(self, frame, pequena, factor):
+        """Picos de correlación en la imagen reducida, en coordenadas de resolución completa"""
+        alto_p, ancho_p = pequena.shape[:2]
+        if min(alto_p, ancho_p) < self.TAMANO_MINIMO_PIRAMIDE:
+            return None
+
+        escala = 1.0 / factor
+        frame_pequeno = cv2.resize(frame, None, fx=escala, fy=escala, interpolation=cv2.INTER_AREA)
+        if frame_pequeno.shape[0] < alto_p or frame_pequeno.shape[1] < ancho_p:
+            return None
+
+        result = cv2.matchTemplate(frame_pequeno, pequena, cv2.TM_CCOEFF_NORMED)
+        candidatos = []
+        for _ in range(self.MAX_CANDIDATOS):
+            _, max_val, _, max_loc = cv2.minMaxLoc(result)
+            if candidatos and max_val <= 0:
+                break
+            candidatos.append((round(max_loc[0] * factor), round(max_loc[1] * factor)))
+            # Suprimir la vecindad del pico para que el siguiente candidato sea otro objeto
+            x, y = max_loc
+            result[max(0, y - alto_p // 2):y + alto_p // 2 + 1, max(0, x - ancho_p // 2):x + ancho_p // 2 + 1] = -1
+        return candidatos
+
+    def _buscar_piramide(self, frame, plantilla, pequena, factor):
+        candidatos = self._candidatos_piramide(frame, pequena, factor)
+        if candidatos is None:
+            return None
+
+        alto_frame, ancho_frame = frame.shape[:2]
+        alto_t, ancho_t = plantilla.shape[:2]
+        margen = 2 * int(factor)
+        mejor_val, mejor_loc = -1.0, candidatos[0]
+        for cx, cy in candidatos:
+            x0 = max(0, cx - margen)
+            y0 = max(0, cy - margen)
+            x1 = min(ancho_frame, cx + ancho_t + margen)
+            y1 = min(alto_frame, cy + alto_t + margen)
+            if x1 - x0 < ancho_t or y1 - y0 < alto_t:
+                continue
+            result = cv2.matchTemplate(frame[y0:y1, x0:x1], plantilla, cv2.TM_CCOEFF_NORMED)
+            _, max_val, _, max_loc = cv2.minMaxLoc(result)
+            if max_val > mejor_val:
+                mejor_val, mejor_loc = max_val, (x0 + max_loc[0], y0 + max_loc[1])
+        return mejor_val, mejor_loc
+
+    def _buscar_incremental(self, frame, plantilla, template, confianza_minima, gris, cambios):
+        """
+        Actualiza el mapa de correlación de la plantilla solo en las zonas cambiadas
+
+        Returns:
+            MatchResult: mejor coincidencia en el mapa actualizado, o None si no hay
+                         un mapa del frame anterior o los cambios son demasiado grandes
+        """
+        with self.lock:
+            entrada = self.mapas.get(template.ruta)
+        if entrada is None or entrada[:3] != (cambios["desde"], gris, frame.shape):
+            return None
+
+        alto_frame, ancho_frame = frame.shape[:2]
+        alto_t, ancho_t = plantilla.shape[:2]
+        regiones = []
+        for x0, y0, x1, y1 in cambios["rectangulos"]:
+            # Posiciones de la plantilla que solapan con el rectángulo cambiado
+            rx0, ry0 = max(0, x0 - ancho_t + 1), max(0, y0 - alto_t + 1)
+            rx1, ry1 = min(ancho_frame, x1 + ancho_t - 1), min(alto_frame, y1 + alto_t - 1)
+            if rx1 - rx0 >= ancho_t and ry1 - ry0 >= alto_t:
+                regiones.append((rx0, ry0, rx1, ry1))
+        area = sum((x1 - x0) * (y1 - y0) for x0, y0, x1, y1 in regiones) / (alto_frame * ancho_frame)
+        if area > self.max_area_incremental:
+            return None
+
+        inicio = time.perf_counter()
+        mapa = entrada[3]
+        for x0, y0, x1, y1 in regiones:
+            parcial = cv2.matchTemplate(frame[y0:y1, x0:x1], plantilla, cv2.TM_CCOEFF_NORMED)
+            mapa[y0:y0 + parcial.shape[0], x0:x0 + parcial.shape[1]] = parcial
+        _, max_val, _, max_loc = cv2.minMaxLoc(mapa)
+        tiempo_ms = (time.perf_counter() - inicio) * 1000
+
+        with self.lock:
+            self.mapas[template.ruta] = (cambios["hasta"], gris, frame.shape, mapa)
+            self.busquedas_incrementales += 1
+            self.fraccion_recalculada += area
+            tiempo_completa = self.tiempos_completa.get(template.ruta)
+            if tiempo_completa is not None:
+                self.tiempo_ahorrado_ms += max(0.0, tiempo_completa - tiempo_ms)
+            if max_val >= confianza_minima:
+                self.ultimas_posiciones[template.ruta] = max_loc
+        return MatchResult(template.ruta, max_val, max_loc, template.ancho, template.alto, "incremental", tiempo_ms)
+
+    def _buscar_completa(self, frame, plantilla, template, confianza_minima, gris, cambios=None):
+        inicio = time.perf_counter()
+        modo = "completa"
+        coincidencia = None
+        mapa = None
+        factor = self.factores_piramide.get(template.ruta, 1)
+        if factor > 1:
+            pequena = template.escalada(factor, gris=gris)
+            coincidencia = self._buscar_piramide(frame, plantilla, pequena, factor)
+        if coincidencia is not None:
+            modo = "piramide"
+            max_val, max_loc = coincidencia
+        else:
+            mapa = cv2.matchTemplate(frame, plantilla, cv2.TM_CCOEFF_NORMED)
+            _, max_val, _, max_loc = cv2.minMaxLoc(mapa)
+        tiempo_ms = (time.perf_counter() - inicio) * 1000
+
+        with self.lock:
+            self.busquedas_completas += 1
+            if coincidencia is not None:
+                self.busquedas_piramide += 1
+            if mapa is not None and cambios is not None:
+                # Mapa de partida para las búsquedas incrementales de los frames siguientes
+                self.mapas[template.ruta] = (cambios["hasta"], gris, frame.shape, mapa)
+
+            # Media móvil del coste de la búsqueda completa para estimar el ahorro
+            anterior = self.tiempos_completa.get(template.ruta)
+            self.tiempos_completa[template.ruta] = tiempo_ms if anterior is None else 0.8 * anterior + 0.2 * tiempo_ms
+
+            if max_val >= confianza_minima:
+                self.ultimas_posiciones[template.ruta] = max_loc
+        return MatchResult(template.ruta, max_val, max_loc, template.ancho, template.alto, modo, tiempo_ms)
+
+    def _verificar_color(self, frame, template, resultado):
+        """
+        Confirma en BGR una coincidencia encontrada en escala de grises
+
+        La confianza pasa a ser la correlación BGR en esa posición; si además el
+        color medio se aleja de la plantilla más de tolerancia_color, se descarta.
+        """
+        x, y = resultado.loc
+        zona = frame[y:y + template.alto, x:x + template.ancho]
+        if zona.shape[:2] != (template.alto, template.ancho):
+            resultado.color_ok = False
+            return resultado
+
+        score = float(cv2.matchTemplate(zona, template.imagen, cv2.TM_CCOEFF_NORMED)[0, 0])
+        media = cv2.mean(zona)[:3]
+        distancia = max(abs(a - b) for a, b in zip(media, template.media))
+        resultado.color_ok = distancia <= self.tolerancia_color
+        resultado.score = score if resultado.color_ok else 0.0
+        return resultado
+
+    def buscar(self, frame, template, confianza_minima, frame_gris=None, cambios=None):
+        """
+        Busca la plantilla en el frame
+
+        Args:
+            frame (numpy.ndarray): Captura de pantalla en BGR
+            template (Template): Plantilla de TemplateLibrary
+            confianza_minima (float): Umbral por debajo del cual la ROI no se acepta
+            frame_gris (numpy.ndarray): Captura en escala de grises, si ya se calculó
+            cambios (dict): {"desde": versión anterior, "hasta": versión de este frame,
+                "rectangulos": [(x0, y0, x1, y1)] cambiados entre ambas}; None para no
+                usar mapas incrementales
+
+        Returns:
+            MatchResult: mejor coincidencia encontrada (puede estar bajo el umbral)
+        """
+        gris = self.usa_gris(template.ruta)
+        if gris:
+            if frame_gris is None:
+                frame_gris = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            imagen, plantilla = frame_gris, template.gris
+            with self.lock:
+                self.busquedas_gris += 1
+        else:
+            imagen, plantilla = frame, template.imagen
+
+        # Una plantilla mayor que el frame no puede estar en él (p. ej. sesiones con capturas parciales)
+        if template.alto > imagen.shape[0] or template.ancho > imagen.shape[1]:
+            return MatchResult(template.ruta, 0.0, (0, 0), template.ancho, template.alto, "completa", 0.0)
+
+        resultado = None
+        incremental = cambios is not None and self.factores_piramide.get(template.ruta, 1) <= 1
+        if incremental:
+            resultado = self._buscar_incremental(imagen, plantilla, template, confianza_minima, gris, cambios)
+        if resultado is None:
+            resultado = self._buscar_roi(imagen, plantilla, template, confianza_minima)
+        if resultado is None:
+            resultado = self._buscar_completa(imagen, plantilla, template, confianza_minima, gris,
+                                              cambios if incremental else None)
+        resultado.gris = gris
+
+        if gris and template.ruta in self.verificar_color and resultado.score >= confianza_minima:
+            resultado = self._verificar_color(frame, template, resultado)
+            if resultado.score < confianza_minima:
+                with self.lock:
+                    self.rechazos_color += 1
+                self.olvidar(template.ruta)
+                logger.debug(f"'{template.ruta}' descartado en la verificación de color (confianza BGR {resultado.score:.2f})")
+        return resultado
+
+    def detect_all(self, frame, templates, confianza_minima, frame_gris=None, cambios=None):
+        """
+        Localiza varias plantillas sobre un mismo frame
+
+        Cada plantilla se busca en un hilo del pool (OpenCV libera el GIL
+        durante matchTemplate), así que el coste total se acerca al de la
+        plantilla más cara en lugar de a la suma de todas.
+
+        Args:
+            frame (numpy.ndarray): Captura de pantalla en BGR
+            templates (list): Plantillas de TemplateLibrary
+            confianza_minima (float): Umbral de confianza para la detección (0-1)
+            frame_gris (numpy.ndarray): Captura en escala de grises, si ya se calculó
+            cambios (dict): Rectángulos cambiados desde el frame anterior (ver buscar)
+
+        Returns:
+            dict: ruta -> MatchResult (con posición, confianza y tiempo de cada plantilla)
+        """
+        inicio = time.perf_counter()
+        if frame_gris is None and any(self.usa_gris(t.ruta) for t in templates):
+            frame_gris = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+
+        if len(templates) <= 1 or self.hilos <= 1:
+            resultados = {t.ruta: self.buscar(frame, t, confianza_minima, frame_gris, cambios) for t in templates}
+        else:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.hilos, thread_name_prefix="matcher")
+            futuros = {t.ruta: self._pool.submit(self.buscar, frame, t, confianza_minima, frame_gris, cambios)
+                       for t in templates}
+            resultados = {ruta: futuro.result() for ruta, futuro in futuros.items()}
+
+        with self.lock:
+            self.detecciones_multiples += 1
+            self.ultimo_detect_all_ms = (time.perf_counter() - inicio) * 1000
+        return resultados
+
+    def cerrar(self):
+        """Detiene el pool de hilos de detect_all"""
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
+            self._pool = None
+
+    def estadisticas(self):
+        with self.lock:
+            return self._estadisticas()
+
+    def _estadisticas(self):
+        return {
+            "busquedas_roi": self.busquedas_roi,
+            "aciertos_roi": self.aciertos_roi,
+            "hit_rate_roi": self.aciertos_roi / self.busquedas_roi if self.busquedas_roi else 0.0,
+            "busquedas_completas": self.busquedas_completas,
+            "busquedas_piramide": self.busquedas_piramide,
+            "busquedas_gris": self.busquedas_gris,
+            "rechazos_color": self.rechazos_color,
+            "detecciones_multiples": self.detecciones_multiples,
+            "busquedas_incrementales": self.busquedas_incrementales,
+            "fraccion_recalculada_media": (self.fraccion_recalculada / self.busquedas_incrementales
+                                           if self.busquedas_incrementales else 0.0),
+            "tiempo_ahorrado_ms": self.tiempo_ahorrado_ms
+        }
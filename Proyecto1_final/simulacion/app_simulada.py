@@ -0,0 +1,189 @@
+"""
+Aplicación simulada que imita la aplicación GIS para pruebas de extremo a extremo
+
+Uso (desde Proyecto1_final, con un display X, p. ej. Xvfb):
+    python -m simulacion.app_simulada --latencia-ms 300 --jitter-ms 100 --prob-fallo 0.05 --resultado sim.json
+
+Dibuja los botones de img/ (las mismas imágenes que busca el bot) de uno en
+uno, en el orden de la secuencia de ImageSearchModel: b1, b2, b3, b4, la
+ventana "cargar archivo" con su campo de texto, b1, b6, b7 y b8. Cada clic
+válido oculta el botón y muestra el siguiente pasada la latencia configurada.
+Con --prob-fallo un clic se ignora (el bot debe detectarlo y reintentar) y
+con --prob-lento la respuesta tarda --factor-lento veces más.
+
+El resultado (nombres de archivo recibidos, lotes, clics y fallos inyectados)
+se reescribe en --resultado tras cada lote.
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+import tkinter as tk
+
+# Paso de la secuencia -> imagen y posición (x, y) en la ventana
+PASOS = [
+    ("b1", "img/b1.png", (100, 100)),
+    ("b2", "img/b2.png", (300, 120)),
+    ("b3", "img/b3.png", (500, 140)),
+    ("b4", "img/b4.png", (700, 160)),
+    ("dialogo", "img/cargarArchivo.png", (50, 80)),
+    ("b1", "img/b1.png", (100, 100)),
+    ("b6", "img/b6.png", (150, 400)),
+    ("b7", "img/b7.png", (400, 420)),
+    ("b8", "img/b8.png", (650, 440))
+]
+# Posición del campo de texto respecto a la esquina de la ventana de archivo
+# (la misma que calcula handle_b4_special_behavior: +294, +500)
+CAMPO_TEXTO = (294, 500)
+SEÑUELO = ("img/b4no.png", (820, 150))
+
+class AppSimulada:
+    def __init__(self, root, args):
+        self.root = root
+        self.args = args
+        self.rng = random.Random(args.semilla)
+        self.paso = 0
+        self.en_transicion = False
+
+        self.archivos = []
+        self.clics = 0
+        self.clics_ignorados = 0
+        self.fallos_inyectados = 0
+        self.respuestas_lentas = 0
+        self.inicio = time.time()
+
+        root.title("App simulada")
+        root.geometry(f"{args.ancho}x{args.alto}+0+0")
+        root.configure(background="white")
+
+        self.imagenes = {}
+        self.widgets = []
+        for nombre, ruta, (x, y) in PASOS:
+            if ruta not in self.imagenes:
+                self.imagenes[ruta] = tk.PhotoImage(file=ruta)
+            if nombre == "dialogo":
+                widget = self.crear_dialogo(ruta)
+            else:
+                widget = tk.Label(root, image=self.imagenes[ruta], borderwidth=0, highlightthickness=0)
+                widget.bind("<Button-1>", lambda e, indice=len(self.widgets): self.clic(indice))
+            self.widgets.append((widget, x, y))
+
+        if args.señuelo:
+            ruta, (x, y) = SEÑUELO
+            self.imagenes[ruta] = tk.PhotoImage(file=ruta)
+            señuelo = tk.Label(root, image=self.imagenes[ruta], borderwidth=0, highlightthickness=0)
+            señuelo.bind("<Button-1>", lambda e: self.ignorar())
+            señuelo.place(x=x, y=y)
+
+        root.bind_all("<Button-1>", lambda e: self.contar_clic(), add="+")
+        root.protocol("WM_DELETE_WINDOW", self.salir)
+        self.mostrar(0)
+        self.guardar_resultado()
+
+    def crear_dialogo(self, ruta):
+        """Ventana de archivo: la imagen cargarArchivo.png y el campo de texto"""
+        dialogo = tk.Frame(self.root, background="white")
+        tk.Label(dialogo, image=self.imagenes[ruta], borderwidth=0, highlightthickness=0).place(x=0, y=0)
+        self.entrada = tk.Entry(dialogo, width=30)
+        x, y = CAMPO_TEXTO
+        self.entrada.place(x=x - 40, y=y - 10)
+        self.entrada.bind("<Return>", lambda e: self.archivo_enviado())
+        ancho = max(self.imagenes[ruta].width(), x + 260)
+        alto = max(self.imagenes[ruta].height(), y + 40)
+        dialogo.configure(width=ancho, height=alto)
+        return dialogo
+
+    def contar_clic(self):
+        self.clics += 1
+
+    def ignorar(self):
+        self.clics_ignorados += 1
+
+    def latencia(self):
+        ms = self.args.latencia_ms + self.rng.uniform(-self.args.jitter_ms, self.args.jitter_ms)
+        if self.rng.random() < self.args.prob_lento:
+            self.respuestas_lentas += 1
+            ms *= self.args.factor_lento
+        return max(0, int(ms))
+
+    def mostrar(self, paso):
+        self.paso = paso
+        widget, x, y = self.widgets[paso]
+        widget.place(x=x, y=y)
+        if PASOS[paso][0] == "dialogo":
+            self.entrada.delete(0, tk.END)
+        self.en_transicion = False
+
+    def avanzar(self):
+        """Oculta el paso actual y muestra el siguiente tras la latencia"""
+        self.en_transicion = True
+        self.widgets[self.paso][0].place_forget()
+        siguiente = (self.paso + 1) % len(PASOS)
+        if siguiente == 0:
+            self.guardar_resultado()
+        self.root.after(self.latencia(), lambda: self.mostrar(siguiente))
+
+    def clic(self, indice):
+        if self.en_transicion or indice != self.paso:
+            self.ignorar()
+            return
+        if self.rng.random() < self.args.prob_fallo:
+            self.fallos_inyectados += 1
+            return
+        self.avanzar()
+
+    def archivo_enviado(self):
+        if self.en_transicion or PASOS[self.paso][0] != "dialogo":
+            return
+        self.archivos.append(self.entrada.get())
+        self.avanzar()
+
+    def resultado(self):
+        return {
+            "archivos": self.archivos,
+            "lotes": len(self.archivos),
+            "clics": self.clics,
+            "clics_ignorados": self.clics_ignorados,
+            "fallos_inyectados": self.fallos_inyectados,
+            "respuestas_lentas": self.respuestas_lentas,
+            "duracion_s": time.time() - self.inicio
+        }
+
+    def guardar_resultado(self):
+        if not self.args.resultado:
+            return
+        directorio = os.path.dirname(os.path.abspath(self.args.resultado))
+        fd, ruta_tmp = tempfile.mkstemp(prefix=".sim-", suffix=".tmp", dir=directorio)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(self.resultado(), f, indent=2)
+        os.replace(ruta_tmp, self.args.resultado)
+
+    def salir(self):
+        self.guardar_resultado()
+        self.root.destroy()
+
+def main():
+    parser = argparse.ArgumentParser(description="Aplicación simulada para probar el bot de extremo a extremo")
+    parser.add_argument("--latencia-ms", type=float, default=300, help="Retardo entre un clic y la siguiente pantalla")
+    parser.add_argument("--jitter-ms", type=float, default=100, help="Variación aleatoria de la latencia")
+    parser.add_argument("--prob-fallo", type=float, default=0.0, help="Probabilidad de ignorar un clic válido")
+    parser.add_argument("--prob-lento", type=float, default=0.0, help="Probabilidad de una respuesta lenta")
+    parser.add_argument("--factor-lento", type=float, default=5.0, help="Multiplicador de latencia de una respuesta lenta")
+    parser.add_argument("--sin-señuelo", dest="señuelo", action="store_false", help="No mostrar b4no.png junto a b4")
+    parser.add_argument("--ancho", type=int, default=1024)
+    parser.add_argument("--alto", type=int, default=768)
+    parser.add_argument("--semilla", type=int, default=None, help="Semilla de la latencia y los fallos")
+    parser.add_argument("--resultado", help="Archivo JSON con el resultado de la simulación")
+    args = parser.parse_args()
+
+    root = tk.Tk()
+    app = AppSimulada(root, args)
+    try:
+        root.mainloop()
+    except KeyboardInterrupt:
+        app.salir()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""
+Prueba de extremo a extremo del bot contra la aplicación simulada
+
+Uso (desde Proyecto1_final, en Linux con Xvfb instalado):
+    python -m simulacion.harness --lotes 20 --perfil rapido --latencia-ms 300 --prob-fallo 0.05
+    python -m simulacion.harness --lotes 5 --sin-xvfb            (usa el DISPLAY actual)
+
+Arranca un servidor X virtual, la aplicación simulada y la línea de comandos
+(cli.py) con AHK sustituido por utils/ahk_stub.py --ejecutar. Al terminar
+combina el resumen del bot con el de la aplicación simulada: lotes/hora,
+nombres de archivo recibidos frente a esperados, clics y fallos inyectados.
+Todo lo que escribe el bot (configuración, diario, métricas y log) va a un
+directorio temporal, sin tocar config.json ni los archivos de las ejecuciones
+reales; las trazas se desactivan salvo que se pidan con --set trace_dir=...
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+def esperar_display(display, timeout=10):
+    """Espera a que el servidor X acepte conexiones (socket de /tmp/.X11-unix)"""
+    socket = f"/tmp/.X11-unix/X{display.lstrip(':').split('.')[0]}"
+    limite = time.monotonic() + timeout
+    while time.monotonic() < limite:
+        if os.path.exists(socket):
+            return True
+        time.sleep(0.1)
+    return False
+
+def esperar_archivo(ruta, timeout=10):
+    limite = time.monotonic() + timeout
+    while time.monotonic() < limite:
+        if os.path.exists(ruta):
+            return True
+        time.sleep(0.1)
+    return False
+
+def terminar(proceso):
+    if proceso is not None and proceso.poll() is None:
+        proceso.terminate()
+        try:
+            proceso.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            proceso.kill()
+
+def main():
+    parser = argparse.ArgumentParser(description="Ejecuta el bot contra la aplicación simulada y mide lotes/hora")
+    parser.add_argument("--lotes", type=int, default=10)
+    parser.add_argument("--formato", default="LT")
+    parser.add_argument("--perfil", default="rapido", help="Perfil de tiempos del bot (timing_profiles)")
+    parser.add_argument("--capture-backend", default="mss", help="Backend de captura del bot (mss o pyautogui)")
+    parser.add_argument("--set", dest="ajustes", action="append", default=[], metavar="CLAVE=VALOR",
+                        help="Ajuste adicional para el bot (se pasa a cli.py)")
+    parser.add_argument("--latencia-ms", type=float, default=300)
+    parser.add_argument("--jitter-ms", type=float, default=100)
+    parser.add_argument("--prob-fallo", type=float, default=0.0)
+    parser.add_argument("--prob-lento", type=float, default=0.0)
+    parser.add_argument("--semilla", type=int, default=1)
+    parser.add_argument("--display", default=":99")
+    parser.add_argument("--pantalla", default="1024x768x24", help="Geometría de la pantalla de Xvfb")
+    parser.add_argument("--sin-xvfb", action="store_true", help="No arrancar Xvfb, usar el DISPLAY actual")
+    parser.add_argument("--timeout", type=float, default=None, help="Segundos máximos para el bot")
+    parser.add_argument("--salida", help="Guardar también el resultado JSON en este archivo")
+    args = parser.parse_args()
+
+    if not args.sin_xvfb and shutil.which("Xvfb") is None:
+        parser.error("No se encontró Xvfb (instálalo o usa --sin-xvfb con un DISPLAY disponible)")
+
+    directorio = tempfile.mkdtemp(prefix="sim-")
+    ruta_sim = os.path.join(directorio, "simulacion.json")
+    entorno = dict(os.environ)
+    xvfb = app = None
+    try:
+        if not args.sin_xvfb:
+            xvfb = subprocess.Popen(["Xvfb", args.display, "-screen", "0", args.pantalla, "-nolisten", "tcp"],
+                                    stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            if not esperar_display(args.display):
+                raise RuntimeError(f"Xvfb no arrancó en {args.display}")
+            entorno["DISPLAY"] = args.display
+
+        ancho, alto = args.pantalla.split("x")[:2]
+        app = subprocess.Popen([
+            sys.executable, "-m", "simulacion.app_simulada",
+            "--latencia-ms", str(args.latencia_ms), "--jitter-ms", str(args.jitter_ms),
+            "--prob-fallo", str(args.prob_fallo), "--prob-lento", str(args.prob_lento),
+            "--semilla", str(args.semilla), "--ancho", ancho, "--alto", alto,
+            "--resultado", ruta_sim
+        ], env=entorno)
+        if not esperar_archivo(ruta_sim):
+            raise RuntimeError("La aplicación simulada no arrancó")
+        time.sleep(0.5)  # Dar tiempo a que la ventana se dibuje
+
+        comando = [
+            sys.executable, "-m", "cli",
+            "--config", os.path.join(directorio, "config.json"),
+            "--log", os.path.join(directorio, "automation.log"),
+            "--lote-inicial", "1", "--lote-final", str(args.lotes),
+            "--formato", args.formato, "--perfil", args.perfil, "--sin-reanudar",
+            "--set", f'capture_backend="{args.capture_backend}"',
+            "--set", 'ahk_backend="stub"',
+            "--set", 'ahk_stub_args=["--ejecutar"]',
+            "--set", f'journal_file={json.dumps(os.path.join(directorio, "progreso.jsonl"))}',
+            "--set", f'metrics_file={json.dumps(os.path.join(directorio, "metricas.jsonl"))}',
+            "--set", f'metrics_prometheus_file={json.dumps(os.path.join(directorio, "metricas.prom"))}',
+            "--set", 'trace_dir=""',
+            "--set", 'record_dir=""'
+        ]
+        for ajuste in args.ajustes:
+            comando += ["--set", ajuste]
+
+        inicio = time.monotonic()
+        try:
+            bot = subprocess.run(comando, env=entorno, stdout=subprocess.PIPE, text=True, timeout=args.timeout)
+            salida_bot = bot.stdout
+        except subprocess.TimeoutExpired as e:
+            salida_bot = e.stdout or ""
+        duracion = time.monotonic() - inicio
+        time.sleep(0.5)  # Último guardado de la aplicación simulada
+    finally:
+        terminar(app)
+        terminar(xvfb)
+
+    try:
+        resumen_bot = json.loads(salida_bot)
+    except ValueError:
+        resumen_bot = {}
+    try:
+        with open(ruta_sim, "r", encoding="utf-8") as f:
+            simulacion = json.load(f)
+    except (OSError, ValueError):
+        simulacion = {}
+    shutil.rmtree(directorio, ignore_errors=True)
+
+    esperados = [f"{args.formato} {lote}.kml" for lote in range(1, args.lotes + 1)]
+    recibidos = simulacion.get("archivos", [])
+    lotes = len(recibidos)
+    resultado = {
+        "lotes_pedidos": args.lotes,
+        "lotes_recibidos": lotes,
+        "archivos_correctos": sum(1 for a, b in zip(recibidos, esperados) if a == b),
+        "duracion_s": duracion,
+        "lotes_por_hora": lotes * 3600 / duracion if duracion > 0 else 0.0,
+        "segundos_por_lote": duracion / lotes if lotes else None,
+        "parametros": {
+            "perfil": args.perfil,
+            "latencia_ms": args.latencia_ms,
+            "jitter_ms": args.jitter_ms,
+            "prob_fallo": args.prob_fallo,
+            "prob_lento": args.prob_lento,
+            "semilla": args.semilla
+        },
+        "simulacion": simulacion,
+        "bot": resumen_bot
+    }
+    texto = json.dumps(resultado, indent=2, ensure_ascii=False)
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            f.write(texto)
+    print(texto)
+    return 0 if resultado["archivos_correctos"] == args.lotes else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,265 @@
+"""
+Generador de pantallas sintéticas con posiciones conocidas
+
+Uso (desde Proyecto1_final):
+    python -m simulacion.pantallas_sinteticas --salida sinteticas --cantidad 1000
+    python -m simulacion.pantallas_sinteticas --salida sinteticas --cantidad 200 --escala 0.1 --brillo 25 \\
+        --prob-jpeg 0.5 --calidad 40 90 --prob-rdp 0.2 --prob-señuelo 0.5 --fondos ../image.png ../image1.png
+    python -m benchmarks.matcher --manifiesto sinteticas
+
+Pega los botones de img/ (b*.png y cargarArchivo.png) sobre fondos variados
+(liso, degradado, ruido, ventanas o una captura repetida) sin que se solapen,
+con variación opcional de escala y de brillo por botón, compresión JPEG o
+tipo escritorio remoto (color de 16 bits y croma a media resolución) y
+señuelos: b4no.png y copias de los botones en otro color.
+
+Escribe pantalla_NNNNN.png y manifiesto.json con la verdad de cada pantalla:
+por objeto, la plantilla, su caja (x, y, ancho, alto), la escala, el brillo y
+"señuelo" = True si en esa caja NO debe detectarse esa plantilla (copias en
+otro color). Una plantilla contenida tal cual en otra pegada (b4.png dentro de
+b4no.png) también figura, con "origen" = la plantilla que la contiene; si la
+contiene un señuelo, es a su vez un señuelo.
+"""
+import argparse
+import glob
+import json
+import os
+import random
+import cv2
+import numpy as np
+
+MANIFIESTO = "manifiesto.json"
+SEÑUELOS = ["img/b4no.png"]
+TIPOS_FONDO = ["liso", "degradado", "ruido", "ventanas", "captura"]
+
+def _color(rng):
+    return [rng.randint(0, 255) for _ in range(3)]
+
+def crear_fondo(tipo, ancho, alto, rng, capturas=None):
+    """Fondo de ancho x alto del tipo indicado (BGR)"""
+    if tipo == "captura" and capturas:
+        captura = rng.choice(capturas)
+        repeticiones = (alto // captura.shape[0] + 1, ancho // captura.shape[1] + 1, 1)
+        return np.tile(captura, repeticiones)[:alto, :ancho].copy()
+    if tipo == "degradado":
+        inicio, fin = np.array(_color(rng), np.float32), np.array(_color(rng), np.float32)
+        t = np.linspace(0, 1, ancho, dtype=np.float32)[None, :, None]
+        return np.repeat((inicio + (fin - inicio) * t).astype(np.uint8), alto, axis=0)
+    if tipo == "ruido":
+        base = np.full((alto, ancho, 3), _color(rng), np.int16)
+        ruido = np.random.default_rng(rng.getrandbits(32)).integers(-30, 31, (alto, ancho, 1), dtype=np.int16)
+        return np.clip(base + ruido, 0, 255).astype(np.uint8)
+    if tipo == "ventanas":
+        # Rectángulos con barra de título, como ventanas de escritorio superpuestas
+        fondo = np.full((alto, ancho, 3), _color(rng), np.uint8)
+        for _ in range(rng.randint(3, 8)):
+            # En pantallas de menos de 50 px las ventanas se ajustan al tamaño disponible
+            x0, y0 = rng.randint(0, ancho - min(50, ancho)), rng.randint(0, alto - min(50, alto))
+            x1, y1 = rng.randint(x0 + min(40, ancho - x0), ancho), rng.randint(y0 + min(40, alto - y0), alto)
+            cv2.rectangle(fondo, (x0, y0), (x1, y1), _color(rng), -1)
+            cv2.rectangle(fondo, (x0, y0), (x1, min(y1, y0 + 22)), _color(rng), -1)
+            cv2.rectangle(fondo, (x0, y0), (x1, y1), (90, 90, 90), 1)
+        return fondo
+    return np.full((alto, ancho, 3), _color(rng), np.uint8)
+
+def ajustar_brillo(imagen, delta):
+    return np.clip(imagen.astype(np.int16) + int(delta), 0, 255).astype(np.uint8)
+
+def teñir(imagen, rng):
+    """
+    Copia del mismo dibujo en otro color (señuelo casi idéntico)
+
+    Desplaza cada canal por separado: la forma se conserva (TM_CCOEFF_NORMED
+    sigue alto) pero el color medio cambia, como un botón en otro estado.
+    """
+    desplazamientos = [rng.choice([-1, 1]) * rng.randint(40, 80) for _ in range(3)]
+    return np.clip(imagen.astype(np.int16) + np.array(desplazamientos, np.int16), 0, 255).astype(np.uint8)
+
+def comprimir_jpeg(imagen, calidad):
+    _, datos = cv2.imencode(".jpg", imagen, [cv2.IMWRITE_JPEG_QUALITY, int(calidad)])
+    return cv2.imdecode(datos, cv2.IMREAD_COLOR)
+
+def comprimir_rdp(imagen):
+    """Aproxima un escritorio remoto: color de 16 bits (RGB565) y croma 4:2:0"""
+    b, g, r = cv2.split(imagen)
+    imagen = cv2.merge([b & 0xF8, g & 0xFC, r & 0xF8])
+    ycrcb = cv2.cvtColor(imagen, cv2.COLOR_BGR2YCrCb)
+    alto, ancho = ycrcb.shape[:2]
+    for canal in (1, 2):
+        reducido = cv2.resize(ycrcb[..., canal], (max(1, ancho // 2), max(1, alto // 2)), interpolation=cv2.INTER_AREA)
+        ycrcb[..., canal] = cv2.resize(reducido, (ancho, alto), interpolation=cv2.INTER_LINEAR)
+    return cv2.cvtColor(ycrcb, cv2.COLOR_YCrCb2BGR)
+
+def _libre(caja, ocupadas):
+    return all(caja[2] <= o[0] or caja[0] >= o[2] or caja[3] <= o[1] or caja[1] >= o[3] for o in ocupadas)
+
+def generar_pantalla(plantillas, opciones, rng, capturas=None, señuelos=None):
+    """
+    Compone una pantalla con los botones en posiciones conocidas
+
+    Args:
+        plantillas (list): [(ruta, imagen BGR)] de los botones a pegar
+        opciones (argparse.Namespace): ancho, alto, fondo, presencia, escala, brillo,
+            brillo_global, prob_jpeg, calidad, prob_rdp y prob_señuelo
+        rng (random.Random): Generador de la pantalla (reproducible con semilla)
+        capturas (list): Imágenes para los fondos de tipo "captura"
+        señuelos (list): [(ruta, imagen BGR)] de los señuelos casi idénticos
+
+    Returns:
+        tuple: (imagen, datos) con el fondo, la compresión aplicada y los objetos
+    """
+    ancho, alto = opciones.ancho, opciones.alto
+    tipos = [t for t in (opciones.fondo or TIPOS_FONDO) if t != "captura" or capturas]
+    tipo = rng.choice(tipos)
+    imagen = crear_fondo(tipo, ancho, alto, rng, capturas)
+
+    # Primero los botones, después los señuelos (en el espacio libre que quede)
+    piezas = [(ruta, original, None) for ruta, original in plantillas if rng.random() < opciones.presencia]
+    for ruta, original in señuelos or []:
+        if rng.random() < opciones.prob_señuelo:
+            piezas.append((ruta, original, "casi_identico"))
+    if plantillas and rng.random() < opciones.prob_señuelo:
+        ruta, original = rng.choice(plantillas)
+        piezas.append((ruta, teñir(original, rng), "tinte"))
+
+    ocupadas = []
+    pegadas = []
+    objetos = []
+    for ruta, original, señuelo in piezas:
+        escala = 1.0 + rng.uniform(-opciones.escala, opciones.escala) if opciones.escala else 1.0
+        pieza = original
+        if escala != 1.0:
+            pieza = cv2.resize(original, None, fx=escala, fy=escala,
+                               interpolation=cv2.INTER_AREA if escala < 1 else cv2.INTER_LINEAR)
+        brillo = rng.uniform(-opciones.brillo, opciones.brillo) if opciones.brillo else 0.0
+        if brillo:
+            pieza = ajustar_brillo(pieza, brillo)
+        alto_p, ancho_p = pieza.shape[:2]
+        if alto_p > alto or ancho_p > ancho:
+            continue
+        for _ in range(200):
+            x, y = rng.randint(0, ancho - ancho_p), rng.randint(0, alto - alto_p)
+            caja = (x, y, x + ancho_p, y + alto_p)
+            if _libre(caja, ocupadas):
+                imagen[y:y + alto_p, x:x + ancho_p] = pieza
+                ocupadas.append(caja)
+                pegadas.append((ruta, pieza, x, y, señuelo))
+                # b4no.png es una detección válida de b4no.png; la copia teñida no lo es de su original
+                objeto = {"plantilla": ruta, "x": x, "y": y, "ancho": ancho_p, "alto": alto_p,
+                          "escala": escala, "brillo": brillo, "señuelo": señuelo == "tinte"}
+                if señuelo:
+                    objeto["variante"] = señuelo
+                objetos.append(objeto)
+                break
+
+    # Botones que aparecen tal cual dentro de otra pieza pegada
+    for ruta, original in plantillas:
+        for otra, pieza, x, y, señuelo in pegadas:
+            if otra == ruta or pieza.shape[0] < original.shape[0] or pieza.shape[1] < original.shape[1]:
+                continue
+            _, max_val, _, max_loc = cv2.minMaxLoc(cv2.matchTemplate(pieza, original, cv2.TM_CCOEFF_NORMED))
+            if max_val >= 0.99:
+                objetos.append({"plantilla": ruta, "x": x + max_loc[0], "y": y + max_loc[1],
+                                "ancho": original.shape[1], "alto": original.shape[0], "escala": 1.0,
+                                "brillo": 0.0, "señuelo": bool(señuelo), "origen": otra})
+
+    brillo_global = rng.uniform(-opciones.brillo_global, opciones.brillo_global) if opciones.brillo_global else 0.0
+    if brillo_global:
+        imagen = ajustar_brillo(imagen, brillo_global)
+    calidad = None
+    if rng.random() < opciones.prob_jpeg:
+        calidad = rng.randint(*opciones.calidad)
+        imagen = comprimir_jpeg(imagen, calidad)
+    rdp = rng.random() < opciones.prob_rdp
+    if rdp:
+        imagen = comprimir_rdp(imagen)
+
+    return imagen, {
+        "ancho": ancho,
+        "alto": alto,
+        "fondo": tipo,
+        "brillo_global": brillo_global,
+        "jpeg": calidad,
+        "rdp": rdp,
+        "objetos": objetos
+    }
+
+def leer_manifiesto(directorio):
+    """Lee el manifiesto de un directorio generado; las rutas de imagen quedan absolutas"""
+    with open(os.path.join(directorio, MANIFIESTO), "r", encoding="utf-8") as f:
+        manifiesto = json.load(f)
+    for pantalla in manifiesto["pantallas"]:
+        pantalla["ruta"] = os.path.join(directorio, pantalla["archivo"])
+    return manifiesto
+
+def cargar_imagenes(rutas):
+    imagenes = []
+    for ruta in rutas:
+        imagen = cv2.imread(ruta, cv2.IMREAD_COLOR)
+        if imagen is None:
+            print(f"No se pudo cargar '{ruta}'")
+            continue
+        imagenes.append((ruta, imagen))
+    return imagenes
+
+def crear_parser():
+    parser = argparse.ArgumentParser(description="Genera pantallas sintéticas con la posición real de cada botón")
+    parser.add_argument("--salida", required=True, help="Directorio de las pantallas y del manifiesto")
+    parser.add_argument("--cantidad", type=int, default=100)
+    parser.add_argument("--semilla", type=int, default=1)
+    parser.add_argument("--plantillas", nargs="+", default=None,
+                        help="Botones a pegar (por defecto img/b*.png, sin señuelos, e img/cargarArchivo.png)")
+    parser.add_argument("--ancho", type=int, default=1366)
+    parser.add_argument("--alto", type=int, default=768)
+    parser.add_argument("--fondo", nargs="+", choices=TIPOS_FONDO, help="Tipos de fondo (por defecto todos)")
+    parser.add_argument("--fondos", nargs="+", default=[], help="Capturas para los fondos de tipo 'captura'")
+    parser.add_argument("--presencia", type=float, default=0.9, help="Probabilidad de que cada botón aparezca")
+    parser.add_argument("--escala", type=float, default=0.0, help="Variación máxima de escala (0.1 = ±10%%)")
+    parser.add_argument("--brillo", type=float, default=0.0, help="Variación máxima de brillo por botón")
+    parser.add_argument("--brillo-global", type=float, default=0.0, help="Variación máxima de brillo de la pantalla")
+    parser.add_argument("--prob-jpeg", type=float, default=0.0, help="Probabilidad de compresión JPEG")
+    parser.add_argument("--calidad", type=int, nargs=2, default=[40, 90], metavar=("MIN", "MAX"),
+                        help="Rango de calidad JPEG")
+    parser.add_argument("--prob-rdp", type=float, default=0.0, help="Probabilidad de compresión tipo escritorio remoto")
+    parser.add_argument("--prob-señuelo", type=float, default=0.0,
+                        help="Probabilidad de pegar cada señuelo (b4no.png y un botón en otro color)")
+    return parser
+
+def main(argv=None):
+    parser = crear_parser()
+    args = parser.parse_args(argv)
+    if args.ancho < 1 or args.alto < 1:
+        parser.error("--ancho y --alto deben ser positivos")
+    # glob devuelve img\b4no.png en Windows: se comparan rutas normalizadas
+    excluidas = {os.path.normpath(r) for r in SEÑUELOS}
+    rutas = args.plantillas or sorted(r for r in glob.glob("img/b*.png")
+                                      if os.path.normpath(r) not in excluidas) + ["img/cargarArchivo.png"]
+    plantillas = cargar_imagenes(rutas)
+    señuelos = cargar_imagenes(SEÑUELOS)
+    capturas = [imagen for _, imagen in cargar_imagenes(args.fondos)]
+
+    os.makedirs(args.salida, exist_ok=True)
+    rng = random.Random(args.semilla)
+    pantallas = []
+    for i in range(args.cantidad):
+        imagen, datos = generar_pantalla(plantillas, args, rng, capturas, señuelos)
+        archivo = f"pantalla_{i + 1:05d}.png"
+        cv2.imwrite(os.path.join(args.salida, archivo), imagen)
+        pantallas.append(dict(archivo=archivo, **datos))
+
+    parametros = {k: v for k, v in vars(args).items() if k != "salida"}
+    manifiesto = {
+        "version": 1,
+        "parametros": parametros,
+        "plantillas": [ruta for ruta, _ in plantillas] + [ruta for ruta, _ in señuelos],
+        "pantallas": pantallas
+    }
+    with open(os.path.join(args.salida, MANIFIESTO), "w", encoding="utf-8") as f:
+        json.dump(manifiesto, f, indent=1, ensure_ascii=False)
+
+    objetos = sum(len(p["objetos"]) for p in pantallas)
+    señuelos_pegados = sum("variante" in o for p in pantallas for o in p["objetos"])
+    print(f"{len(pantallas)} pantallas en '{args.salida}': {objetos} objetos ({señuelos_pegados} señuelos)")
+
+if __name__ == "__main__":
+    main()
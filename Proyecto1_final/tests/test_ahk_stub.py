@@ -0,0 +1,102 @@
+import os
+import threading
+import time
+
+import pytest
+
+from utils.ahk_manager import AHKManager
+from utils.cancellation import CancellationToken
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def manager(monkeypatch):
+    monkeypatch.chdir(RAIZ)  # El stub se lanza como "python -m utils.ahk_stub"
+    manager = AHKManager(backend="stub", argumentos_stub=["--latencia-ms", "50"])
+    assert manager.start_ahk(timeout=10)
+    yield manager
+    manager.stop_ahk()
+
+
+def test_ping_recibe_ack_y_done(manager):
+    respuesta = manager.enviar_comando("PING", timeout=5)
+    assert respuesta["seq"] == 1
+    assert respuesta["estado"] == "OK"
+    assert 0 <= respuesta["ack_ms"] <= respuesta["total_ms"]
+    assert manager.respuestas == {}
+
+
+def test_escribir_archivo_cuenta_la_ejecucion(manager):
+    ok, respuesta = manager.ejecutar_acciones_ahk(100, 200, "LT\tcon tabulador.txt")
+    assert ok
+    assert respuesta["seq"] == 1
+    assert respuesta["ahk_ms"] >= 40
+    assert respuesta["total_ms"] >= respuesta["ahk_ms"]
+    assert manager.ultima_respuesta is respuesta
+
+
+def test_seq_crece_y_cada_respuesta_es_la_suya(manager):
+    respuestas = [manager.enviar_comando("PING", timeout=5) for _ in range(5)]
+    assert [r["seq"] for r in respuestas] == [1, 2, 3, 4, 5]
+
+
+def test_accion_desconocida_devuelve_error(manager):
+    respuesta = manager.enviar_comando("BORRAR_TODO", timeout=5)
+    assert respuesta["estado"] == "ERROR"
+    # El canal sigue utilizable tras un error
+    assert manager.enviar_comando("PING", timeout=5)["estado"] == "OK"
+
+
+def test_respuesta_tardia_se_descarta(monkeypatch):
+    monkeypatch.chdir(RAIZ)
+    manager = AHKManager(backend="stub", argumentos_stub=["--latencia-ms", "300"])
+    assert manager.start_ahk(timeout=10)
+    try:
+        assert manager.enviar_comando("ESCRIBIR_ARCHIVO", 1, 2, "lento.kml", timeout=0.05) is None
+        time.sleep(0.5)  # Llega el DONE tardío del comando 1
+        respuesta = manager.enviar_comando("PING", timeout=5)
+        assert respuesta["seq"] == 2 and respuesta["estado"] == "OK"
+        assert manager.respuestas == {}
+        assert manager.en_vuelo == set()
+    finally:
+        manager.stop_ahk()
+
+
+@pytest.fixture
+def manager_lento(monkeypatch):
+    monkeypatch.chdir(RAIZ)
+    token = CancellationToken()
+    token.iniciar()
+    manager = AHKManager(backend="stub", argumentos_stub=["--latencia-ms", "1500"], token=token)
+    assert manager.start_ahk(timeout=10)
+    yield manager
+    manager.stop_ahk()
+
+
+def test_detener_no_espera_al_done(manager_lento):
+    threading.Timer(0.2, manager_lento.token.detener).start()
+    inicio = time.monotonic()
+    assert manager_lento.enviar_comando("ESCRIBIR_ARCHIVO", 1, 2, "x.kml", timeout=10) is None
+    assert time.monotonic() - inicio < 1
+    assert manager_lento.token.estadisticas()["parada"]["n"] == 1
+
+
+def test_la_pausa_detiene_el_hilo_y_recoge_el_done_al_reanudar(manager_lento):
+    token = manager_lento.token
+    threading.Timer(0.2, token.pausar).start()
+    threading.Timer(2.0, token.reanudar).start()
+    respuesta = manager_lento.enviar_comando("ESCRIBIR_ARCHIVO", 1, 2, "x.kml", timeout=1.6)
+    # La pausa no consume el timeout: el DONE (a los 1.5 s) llegó durante la pausa
+    assert respuesta["estado"] == "OK"
+    stats = token.estadisticas()["pausa"]
+    assert stats["n"] == 1 and stats["max_ms"] < 500
+
+
+def test_sin_proceso_no_hay_respuesta(manager):
+    manager.enviar_comando("PING", timeout=5)
+    manager.stop_ahk()
+    assert manager.enviar_comando("PING", timeout=1) is None
+    assert manager.ultima_respuesta is None
+    ok, respuesta = manager.ejecutar_acciones_ahk(1, 2, "x")
+    assert not ok and respuesta is None
@@ -0,0 +1,121 @@
+import threading
+import time
+
+import pytest
+
+from utils.cancellation import CancellationToken
+from utils.clock import RealClock, VirtualClock, crear_reloj
+
+
+def token_virtual():
+    token = CancellationToken(VirtualClock())
+    token.iniciar()
+    return token
+
+
+def en_hilo(funcion, *args):
+    resultado = {}
+    hilo = threading.Thread(target=lambda: resultado.setdefault("valor", funcion(*args)), daemon=True)
+    hilo.start()
+    return hilo, resultado
+
+
+def test_crear_reloj():
+    assert isinstance(crear_reloj("real"), RealClock)
+    assert isinstance(crear_reloj("virtual"), VirtualClock)
+    with pytest.raises(ValueError):
+        crear_reloj("lunar")
+
+
+def test_reloj_virtual_avanza_sin_dormir():
+    reloj = VirtualClock()
+    antes = reloj.ahora()
+    inicio = time.monotonic()
+    reloj.avanzar(3600)
+    reloj.avanzar(0)
+    reloj.avanzar(-5)
+    assert time.monotonic() - inicio < 1
+    assert reloj.ahora() - antes >= 3600
+    stats = reloj.estadisticas()
+    assert stats["espera_saltada_s"] == 3600
+    assert stats["esperas"] == 1
+    assert stats["tiempo_simulado_s"] >= stats["tiempo_real_s"] + 3600
+
+
+def test_esperar_virtual_adelanta_el_reloj():
+    token = token_virtual()
+    inicio = time.monotonic()
+    assert token.esperar(30)
+    assert token.dormir(60)
+    assert time.monotonic() - inicio < 1
+    assert token.reloj.adelanto == 90
+
+
+def test_esperar_virtual_detenido_no_adelanta():
+    token = token_virtual()
+    token.detener()
+    assert not token.esperar(30)
+    assert not token.dormir(30)
+    assert token.reloj.adelanto == 0
+
+
+def test_esperar_virtual_en_pausa_no_adelanta():
+    token = token_virtual()
+    token.pausar()
+    assert token.esperar(30)  # Sigue activo, pero la espera no cuenta
+    assert token.reloj.adelanto == 0
+
+
+def test_dormir_virtual_espera_a_la_reanudacion():
+    token = token_virtual()
+    token.pausar()
+    hilo, resultado = en_hilo(token.dormir, 45)
+    hilo.join(0.2)
+    assert hilo.is_alive()
+    assert token.reloj.adelanto == 0
+
+    token.reanudar()
+    hilo.join(5)
+    assert resultado["valor"] is True
+    assert token.reloj.adelanto == 45
+
+
+def test_detener_en_pausa_corta_dormir():
+    token = token_virtual()
+    token.pausar()
+    hilo, resultado = en_hilo(token.dormir, 45)
+    hilo.join(0.2)
+    token.detener()
+    hilo.join(5)
+    assert resultado["valor"] is False
+    assert token.reloj.adelanto == 0
+    stats = token.estadisticas()
+    assert stats["pausa"]["n"] == 1
+    assert stats["parada"]["n"] == 1
+
+
+def test_esperar_real_vuelve_al_detener():
+    token = CancellationToken(RealClock())
+    token.iniciar()
+    hilo, resultado = en_hilo(token.esperar, 30)
+    time.sleep(0.1)
+    inicio = time.monotonic()
+    token.detener()
+    hilo.join(5)
+    assert time.monotonic() - inicio < 1
+    assert resultado["valor"] is False
+
+
+def test_dormir_real_descuenta_la_pausa():
+    token = CancellationToken(RealClock())
+    token.iniciar()
+    inicio = time.monotonic()
+    hilo, resultado = en_hilo(token.dormir, 0.3)
+    time.sleep(0.1)
+    token.pausar()
+    time.sleep(0.3)
+    token.reanudar()
+    hilo.join(5)
+    # 0.3 s activos + 0.3 s de pausa: la pausa no consume la espera
+    assert resultado["valor"] is True
+    assert time.monotonic() - inicio >= 0.55
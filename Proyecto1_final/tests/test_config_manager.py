@@ -0,0 +1,110 @@
+import atexit
+import json
+import os
+import stat
+import sys
+import threading
+import time
+
+import pytest
+
+from utils.config_manager import ConfigManager
+
+
+def leer(ruta):
+    with open(ruta, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def test_sin_diferido_guarda_en_cada_set(tmp_path):
+    ruta = tmp_path / "config.json"
+    config = ConfigManager(str(ruta))
+    config.set("lote_final", 7)
+    assert leer(ruta)["lote_final"] == 7
+    assert config.estadisticas()["flushes"] == 1
+
+
+def test_diferido_agrupa_los_set(tmp_path):
+    ruta = tmp_path / "config.json"
+    config = ConfigManager(str(ruta))
+    config.debounce = 0.2  # Sin atexit: activar_diferido lo registraría para todo el proceso
+    for lote in range(1, 6):
+        config.set("current_lote", lote)
+    assert not ruta.exists()
+    assert config.estadisticas()["pendiente"]
+
+    limite = time.monotonic() + 5
+    while config.estadisticas()["flushes"] == 0 and time.monotonic() < limite:
+        time.sleep(0.02)
+    stats = config.estadisticas()
+    assert stats["flushes"] == 1
+    assert stats["sets_agrupados"] == 4
+    assert not stats["pendiente"]
+    assert leer(ruta)["current_lote"] == 5
+
+
+def test_flush_guarda_lo_pendiente(tmp_path):
+    ruta = tmp_path / "config.json"
+    config = ConfigManager(str(ruta))
+    config.debounce = 60
+    config.set("delay_time", 9)
+    config.flush()
+    assert leer(ruta)["delay_time"] == 9
+    assert config.timer is None
+    config.flush()  # Nada pendiente: no vuelve a escribir
+    assert config.estadisticas()["flushes"] == 1
+
+
+def test_temporales_no_se_guardan(tmp_path):
+    ruta = tmp_path / "config.json"
+    config = ConfigManager(str(ruta))
+    config.aplicar_temporal({"delay_time": 0})
+    config.set("delay_time", 3)
+    config.set("lote_final", 2)
+    assert config.get("delay_time") == 3
+    assert leer(ruta)["delay_time"] == 2
+
+
+def test_guardados_concurrentes_terminan_con_el_ultimo_valor(tmp_path):
+    ruta = tmp_path / "config.json"
+    config = ConfigManager(str(ruta))
+
+    def escribir(inicio):
+        for valor in range(inicio, inicio + 20):
+            config.set(f"clave_{inicio}", valor)
+
+    hilos = [threading.Thread(target=escribir, args=(i * 100,)) for i in range(4)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    guardado = leer(ruta)
+    for i in range(4):
+        assert guardado[f"clave_{i * 100}"] == i * 100 + 19
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="permisos POSIX")
+def test_conserva_los_permisos_del_archivo(tmp_path):
+    ruta = tmp_path / "config.json"
+    ruta.write_text("{}", encoding="utf-8")
+    os.chmod(ruta, 0o644)
+    config = ConfigManager(str(ruta))
+    config.set("lote_final", 3)
+    assert stat.S_IMODE(os.stat(ruta).st_mode) == 0o644
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="permisos POSIX")
+def test_archivo_nuevo_no_queda_privado(tmp_path):
+    ruta = tmp_path / "config.json"
+    ConfigManager(str(ruta)).save()
+    assert stat.S_IMODE(os.stat(ruta).st_mode) == 0o644
+
+
+def test_activar_diferido_registra_un_solo_flush(tmp_path, monkeypatch):
+    registrados = []
+    monkeypatch.setattr(atexit, "register", registrados.append)
+    config = ConfigManager(str(tmp_path / "config.json"))
+    config.activar_diferido(2)
+    config.activar_diferido(5)
+    assert registrados == [config.flush]
+    assert config.debounce == 5
@@ -0,0 +1,126 @@
+import threading
+import time
+
+from utils.event_bus import EventBus
+
+COALESCER = {"modo": "coalescer", "clave": "image"}
+
+
+class Observador:
+    """Registra los eventos; el primero bloquea la entrega hasta liberar()"""
+    def __init__(self, bloquear=False):
+        self.recibidos = []
+        self.ocupado = threading.Event()
+        self.liberado = threading.Event()
+        if not bloquear:
+            self.liberado.set()
+
+    def update(self, evento, datos):
+        self.recibidos.append((evento, datos))
+        self.ocupado.set()
+        self.liberado.wait(5)
+
+    def liberar(self):
+        self.liberado.set()
+
+
+def bus_ocupado(politicas, **kwargs):
+    """Bus cuyo hilo de despacho está entregando un primer evento que no termina"""
+    bus = EventBus(politicas, **kwargs)
+    observador = Observador(bloquear=True)
+    bus.suscribir(observador)
+    bus.publicar("inicio")
+    assert observador.ocupado.wait(5)
+    return bus, observador
+
+
+def test_entrega_todos_en_orden():
+    bus = EventBus()
+    observador = Observador()
+    bus.suscribir(observador)
+    for i in range(20):
+        bus.publicar("log", i)
+    bus.cerrar()
+    assert observador.recibidos == [("log", i) for i in range(20)]
+    assert bus.estadisticas()["entregados"] == 20
+
+
+def test_coalescer_entrega_solo_el_ultimo_por_clave():
+    bus, observador = bus_ocupado({"image_not_found": COALESCER})
+    for intento in range(5):
+        bus.publicar("image_not_found", {"image": "b1", "intento": intento})
+        bus.publicar("image_not_found", {"image": "b2", "intento": intento})
+    bus.publicar("log", "fin")
+    observador.liberar()
+    bus.cerrar()
+
+    assert observador.recibidos == [
+        ("inicio", None),
+        ("image_not_found", {"image": "b1", "intento": 4}),
+        ("image_not_found", {"image": "b2", "intento": 4}),
+        ("log", "fin"),
+    ]
+    stats = bus.estadisticas()
+    assert stats["publicados"] == 12
+    assert stats["coalescidos"] == 8
+    assert stats["entregados"] == 4
+
+
+def test_intervalo_limita_la_frecuencia_por_clave():
+    bus = EventBus({"progreso": dict(COALESCER, intervalo=0.3)})
+    observador = Observador()
+    bus.suscribir(observador)
+    bus.publicar("progreso", {"image": "b1", "n": 0})
+    assert bus.esperar_vacia(5)
+
+    # Dentro del intervalo el evento queda diferido y sigue coalesciendo
+    bus.publicar("progreso", {"image": "b1", "n": 1})
+    bus.publicar("progreso", {"image": "b1", "n": 2})
+    time.sleep(0.1)
+    assert observador.recibidos == [("progreso", {"image": "b1", "n": 0})]
+    assert bus.estadisticas()["pendientes"] == 1
+
+    limite = time.monotonic() + 5
+    while len(observador.recibidos) < 2 and time.monotonic() < limite:
+        time.sleep(0.02)
+    assert observador.recibidos[1] == ("progreso", {"image": "b1", "n": 2})
+    bus.cerrar()
+
+
+def test_descarta_coalescibles_con_la_cola_llena():
+    bus, observador = bus_ocupado({"image_not_found": COALESCER}, max_pendientes=2)
+    for imagen in ("b1", "b2", "b3", "b4"):
+        bus.publicar("image_not_found", {"image": imagen})
+    # Los eventos normales nunca se descartan
+    bus.publicar("log", "sigue")
+    observador.liberar()
+    bus.cerrar()
+
+    assert [datos for _, datos in observador.recibidos] == [None, {"image": "b1"}, {"image": "b2"}, "sigue"]
+    assert bus.estadisticas()["descartados"] == 2
+
+
+def test_un_observador_que_falla_no_corta_la_entrega():
+    class Roto:
+        def update(self, evento, datos):
+            raise RuntimeError("fallo")
+
+    bus = EventBus()
+    observador = Observador()
+    bus.suscribir(Roto())
+    bus.suscribir(observador)
+    bus.publicar("log", 1)
+    bus.publicar("log", 2)
+    bus.cerrar()
+    assert observador.recibidos == [("log", 1), ("log", 2)]
+    assert bus.estadisticas()["errores"] == 2
+
+
+def test_cerrado_ignora_publicaciones():
+    bus = EventBus()
+    observador = Observador()
+    bus.suscribir(observador)
+    bus.cerrar()
+    bus.publicar("log", 1)
+    assert observador.recibidos == []
+    assert bus.estadisticas()["publicados"] == 0
@@ -0,0 +1,83 @@
+import numpy as np
+
+from utils.frame_change import FrameChangeDetector
+
+
+def fondo():
+    return np.random.default_rng(0).integers(0, 256, (100, 130, 3), dtype=np.uint8)
+
+
+def test_sin_referencia_todo_cuenta_como_cambiado():
+    detector = FrameChangeDetector(tamano_tile=32)
+    assert detector.comparar(fondo()) is None
+    assert detector.rectangulos(None) == []
+
+
+def test_frame_igual_no_tiene_cambios():
+    detector = FrameChangeDetector(tamano_tile=32)
+    detector.fijar_referencia(fondo())
+    tiles = detector.comparar(fondo())
+    assert tiles.shape == (4, 5) and not tiles.any()
+    assert detector.estadisticas()["sin_cambios"] == 1
+
+
+def test_ruido_por_debajo_del_umbral():
+    detector = FrameChangeDetector(tamano_tile=32, umbral=8)
+    frame = fondo()
+    detector.fijar_referencia(frame)
+    ruido = frame.astype(np.int16)
+    ruido[::3, ::5] += 6
+    assert not detector.comparar(np.clip(ruido, 0, 255).astype(np.uint8)).any()
+
+
+def test_rectangulos_de_la_zona_cambiada():
+    detector = FrameChangeDetector(tamano_tile=32)
+    detector.fijar_referencia(fondo())
+    frame = fondo()
+    frame[40:50, 70:80] ^= 0xFF  # Tile (1, 2)
+    frame[90:95, 120:125] ^= 0xFF  # Tile (2, 3)
+    tiles = detector.comparar(frame)
+    assert sorted(zip(*np.nonzero(tiles))) == [(1, 2), (2, 3)]
+    # Contiguos en diagonal: una sola caja
+    assert detector.rectangulos(tiles) == [(64, 32, 128, 96)]
+
+    frame = fondo()
+    frame[0:5, 0:5] ^= 0xFF
+    frame[96:100, 128:130] ^= 0xFF  # Tiles del borde, recortados al tamaño del frame
+    assert sorted(detector.rectangulos(detector.comparar(frame))) == [(0, 0, 32, 32), (128, 96, 130, 100)]
+
+
+def test_mascara_ignora_la_zona():
+    detector = FrameChangeDetector(tamano_tile=32, mascaras=[[100, 0, 30, 20]])  # Reloj en la esquina
+    detector.fijar_referencia(fondo())
+    frame = fondo()
+    frame[5:15, 105:125] ^= 0xFF
+    assert not detector.comparar(frame).any()
+    frame[25:30, 105:125] ^= 0xFF  # Fuera de la máscara
+    assert detector.comparar(frame).any()
+
+
+def test_cambios_lentos_se_acumulan_en_la_referencia():
+    detector = FrameChangeDetector(tamano_tile=32, umbral=8)
+    frame = np.full((64, 64, 3), 100, np.uint8)
+    detector.fijar_referencia(frame)
+    frame[:32, :32] += 5
+    tiles = detector.comparar(frame)
+    assert not tiles.any()
+    detector.fijar_referencia(frame, tiles)  # Nada cambiado: la referencia no se mueve
+    frame[:32, :32] += 5
+    tiles = detector.comparar(frame)
+    assert tiles[0, 0] and tiles.sum() == 1
+
+    version = detector.version
+    detector.fijar_referencia(frame, tiles)
+    assert detector.version == version + 1
+    assert not detector.comparar(frame).any()
+
+
+def test_cambio_de_tamano_reinicia_la_referencia():
+    detector = FrameChangeDetector(tamano_tile=32)
+    detector.fijar_referencia(fondo())
+    assert detector.comparar(np.zeros((50, 50, 3), np.uint8)) is None
+    detector.olvidar()
+    assert detector.comparar(fondo()) is None
@@ -0,0 +1,220 @@
+import os
+
+import cv2
+import numpy as np
+import pytest
+
+pytest.importorskip("PIL")  # Dependencia de models.image_search_model
+
+from models.image_search_model import ImageSearchModel
+from utils.config_manager import ConfigManager
+from utils.screen_capture import CaptureSession
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ANCHO, ALTO = 480, 320
+
+
+class PantallaGuionada(CaptureSession):
+    """Backend de prueba: la captura n muestra lo que devuelva pantalla(n)"""
+    nombre = "guion"
+
+    def __init__(self, pantalla):
+        super().__init__()
+        self.pantalla = pantalla
+        self.region = (0, 0, ANCHO, ALTO)
+
+    def _capturar(self):
+        frame = self.pantalla(self.frame_id)
+        self._asegurar_buffers(*frame.shape[:2])
+        self._buffer[:] = frame
+
+
+def componer(*botones):
+    """Pantalla fija con las plantillas indicadas pegadas: (ruta, x, y)"""
+    frame = np.random.default_rng(0).integers(0, 256, (ALTO, ANCHO, 3), dtype=np.uint8)
+    for ruta, x, y in botones:
+        imagen = cv2.imread(ruta)
+        frame[y:y + imagen.shape[0], x:x + imagen.shape[1]] = imagen
+    return frame
+
+
+@pytest.fixture
+def modelo(tmp_path, monkeypatch):
+    monkeypatch.chdir(RAIZ)  # Las plantillas de la secuencia son rutas relativas (img/...)
+    config = ConfigManager(str(tmp_path / "config.json"))
+    config.aplicar_temporal({"clock": "virtual", "simulate_input": True, "config_debounce": 0,
+                             "match_threads": 1, "wait_poll_hz": 10, "wait_timeout": 2,
+                             "wait_stable_frames": 2})
+    modelo = ImageSearchModel(config)
+    modelo.set_running(True)
+    yield modelo
+    modelo.set_running(False)
+    modelo.matcher.cerrar()
+    modelo.event_bus.cerrar()
+
+
+def guion(modelo, pantalla):
+    modelo.capture_session = PantallaGuionada(pantalla)
+    return modelo.capture_session
+
+
+def test_wait_for_espera_a_que_el_boton_aparezca_estable(modelo):
+    vacia, con_boton = componer(), componer(("img/b1.png", 200, 150))
+    sesion = guion(modelo, lambda n: con_boton if n >= 3 else vacia)
+    resultado = modelo.wait_for("img/b1.png", confianza_minima=0.9)
+    assert resultado is not None and resultado.loc == (200, 150)
+    # Aparece en la captura 4 y se necesita una más igual para darlo por estable
+    assert sesion.capturas == 5
+
+
+def test_wait_for_no_acepta_un_boton_que_se_mueve(modelo):
+    posiciones = [(100, 100), (110, 100), (120, 100), (130, 100)]
+    frames = [componer(("img/b1.png", x, y)) for x, y in posiciones]
+    sesion = guion(modelo, lambda n: frames[min(n, len(frames) - 1)])
+    resultado = modelo.wait_for("img/b1.png", confianza_minima=0.9)
+    assert resultado.loc == (130, 100)
+    assert sesion.capturas == 5
+
+
+def test_wait_for_agota_el_timeout(modelo):
+    vacia = componer()
+    guion(modelo, lambda n: vacia)
+    inicio = modelo.reloj.ahora()
+    assert modelo.wait_for("img/b1.png", confianza_minima=0.9, timeout=2) is None
+    assert modelo.reloj.ahora() - inicio >= 2
+    assert modelo.ultima_confianza < 0.9
+
+
+def test_wait_for_desaparicion(modelo):
+    vacia, con_boton = componer(), componer(("img/b1.png", 200, 150))
+    sesion = guion(modelo, lambda n: con_boton if n < 2 else vacia)
+    assert modelo.wait_for("img/b1.png", confianza_minima=0.9, visible=False) is not None
+    assert sesion.capturas == 4
+
+
+def test_wait_for_vuelve_al_detener(modelo):
+    vacia = componer()
+    guion(modelo, lambda n: vacia)
+    modelo.set_running(False)
+    assert modelo.wait_for("img/b1.png", confianza_minima=0.9, timeout=60) is None
+
+
+def pantalla_por_clics(modelo, antes, despues, clics_necesarios=1):
+    """La pantalla pasa de 'antes' a 'despues' cuando se han hecho clics_necesarios clics"""
+    return guion(modelo, lambda n: despues if modelo.entrada.acciones >= clics_necesarios else antes)
+
+
+def test_click_button_confirma_la_transicion(modelo):
+    pantalla_por_clics(modelo, componer(("img/b1.png", 50, 50)), componer(("img/b2.png", 300, 200)))
+    assert modelo.click_button("img/b1.png", 1, 0.9, post_condicion=("aparece", "img/b2.png"))
+    assert modelo.entrada.acciones == 1
+
+
+def test_click_button_reintenta_si_el_clic_no_hizo_efecto(modelo):
+    pantalla_por_clics(modelo, componer(("img/b1.png", 50, 50)), componer(("img/b2.png", 300, 200)),
+                       clics_necesarios=2)
+    modelo.iniciar_medicion()
+    assert modelo.click_button("img/b1.png", 1, 0.9, post_condicion=("aparece", "img/b2.png"))
+    assert modelo.entrada.acciones == 2
+    assert modelo.terminar_medicion()["reintentos_clic"] == 1
+
+
+def test_click_button_falla_tras_agotar_los_reintentos(modelo):
+    modelo.config_manager.aplicar_temporal({"click_retries": 2, "transition_timeout": 1})
+    pantalla_por_clics(modelo, componer(("img/b1.png", 50, 50)), None, clics_necesarios=99)
+    assert not modelo.click_button("img/b1.png", 1, 0.9, post_condicion=("aparece", "img/b2.png"))
+    assert modelo.entrada.acciones == 3
+
+
+def test_transition_failure_continue(modelo):
+    modelo.config_manager.aplicar_temporal({"click_retries": 0, "transition_timeout": 1,
+                                            "transition_failure_continue": True})
+    pantalla_por_clics(modelo, componer(("img/b1.png", 50, 50)), None, clics_necesarios=99)
+    assert modelo.click_button("img/b1.png", 1, 0.9, post_condicion=("aparece", "img/b2.png"))
+    assert modelo.entrada.acciones == 1
+
+
+def test_objetivo_ya_visible_no_prueba_la_transicion(modelo):
+    modelo.config_manager.aplicar_temporal({"click_retries": 1, "transition_timeout": 1})
+    # b2 se ve desde antes del clic y la pantalla nunca cambia
+    fija = componer(("img/b1.png", 50, 50), ("img/b2.png", 300, 200))
+    guion(modelo, lambda n: fija)
+    assert not modelo.click_button("img/b1.png", 1, 0.9, post_condicion=("aparece", "img/b2.png"))
+    assert modelo.entrada.acciones == 2
+
+
+def test_objetivo_ya_visible_y_la_zona_pulsada_cambia(modelo):
+    antes = componer(("img/b1.png", 50, 50), ("img/b2.png", 300, 200))
+    despues = componer(("img/b2.png", 300, 200))
+    pantalla_por_clics(modelo, antes, despues)
+    assert modelo.click_button("img/b1.png", 1, 0.9, post_condicion=("aparece", "img/b2.png"))
+    assert modelo.entrada.acciones == 1
+
+
+def test_post_condicion_cambia(modelo):
+    modelo.config_manager.aplicar_temporal({"click_retries": 0, "transition_timeout": 1})
+    pantalla_por_clics(modelo, componer(("img/b1.png", 50, 50)), componer())
+    assert modelo.click_button("img/b1.png", 1, 0.9, post_condicion=("cambia", None))
+
+    modelo.entrada.acciones = 0
+    fija = componer(("img/b1.png", 50, 50))
+    guion(modelo, lambda n: fija)
+    modelo.invalidar_analisis()
+    assert not modelo.click_button("img/b1.png", 1, 0.9, post_condicion=("cambia", None))
+
+
+def contar_correlaciones(modelo, monkeypatch):
+    """Cuenta las plantillas que llegan al matcher en cada análisis"""
+    llamadas = []
+    original = modelo.matcher.detect_all
+
+    def detect_all(frame, templates, *args, **kwargs):
+        llamadas.append(sorted(t.ruta for t in templates))
+        return original(frame, templates, *args, **kwargs)
+
+    monkeypatch.setattr(modelo.matcher, "detect_all", detect_all)
+    return llamadas
+
+
+def test_frame_sin_cambios_reutiliza_los_resultados(modelo, monkeypatch):
+    llamadas = contar_correlaciones(modelo, monkeypatch)
+    fija = componer(("img/b1.png", 200, 150))
+    guion(modelo, lambda n: fija.copy())
+    rutas = ["img/b1.png", "img/b2.png"]
+
+    primero = modelo.analizar_pantalla(rutas, 0.9)
+    segundo = modelo.analizar_pantalla(rutas, 0.9)
+    assert llamadas == [rutas]
+    assert segundo["resultados"]["img/b1.png"] is primero["resultados"]["img/b1.png"]
+    assert segundo["frame_id"] != primero["frame_id"]
+    assert modelo.detector_cambios.plantillas_omitidas == 2
+
+    # Con otra confianza el resultado previo no sirve
+    modelo.analizar_pantalla(rutas, 0.8)
+    assert llamadas[-1] == rutas
+
+
+def test_cambio_de_pantalla_vuelve_a_correlacionar(modelo, monkeypatch):
+    llamadas = contar_correlaciones(modelo, monkeypatch)
+    antes, despues = componer(("img/b1.png", 200, 150)), componer(("img/b1.png", 40, 40))
+    guion(modelo, lambda n: antes if n < 1 else despues)
+    assert modelo.analizar_pantalla(["img/b1.png"], 0.9)["resultados"]["img/b1.png"].loc == (200, 150)
+    assert modelo.analizar_pantalla(["img/b1.png"], 0.9)["resultados"]["img/b1.png"].loc == (40, 40)
+    assert len(llamadas) == 2
+    assert modelo.detector_cambios.plantillas_omitidas == 0
+
+
+def test_cambio_en_zona_enmascarada_no_cuenta(modelo, monkeypatch):
+    modelo.detector_cambios.mascaras = [(400, 0, 80, 30)]  # Reloj en la esquina
+    llamadas = contar_correlaciones(modelo, monkeypatch)
+    base = componer(("img/b1.png", 200, 150))
+
+    def pantalla(n):
+        frame = base.copy()
+        frame[5:20, 410:470] = n * 40  # La hora cambia en cada captura
+        return frame
+
+    guion(modelo, pantalla)
+    for _ in range(3):
+        assert modelo.analizar_pantalla(["img/b1.png"], 0.9)["resultados"]["img/b1.png"].loc == (200, 150)
+    assert len(llamadas) == 1
@@ -0,0 +1,67 @@
+import cv2
+import numpy as np
+
+from models.template_matcher import TemplateMatcher
+from utils.frame_change import FrameChangeDetector
+from utils.template_library import Template
+
+
+def analizar(detector, matcher, frame, template):
+    """Mismo flujo que ImageSearchModel.analizar_pantalla para una plantilla"""
+    tiles = detector.comparar(frame)
+    desde = detector.version if tiles is not None else None
+    rectangulos = detector.rectangulos(tiles)
+    detector.fijar_referencia(frame, tiles)
+    cambios = {"desde": desde, "hasta": detector.version, "rectangulos": rectangulos}
+    return matcher.buscar(frame, template, 0.8, cambios=cambios)
+
+
+def secuencia_boton_desvaneciendose(frames=60):
+    """Un botón que se funde con el fondo poco a poco mientras un spinner se mueve en otra esquina"""
+    rng = np.random.default_rng(1)
+    fondo = rng.integers(0, 256, (240, 320, 3), dtype=np.uint8)
+    boton = rng.integers(0, 256, (40, 60, 3), dtype=np.uint8)
+    debajo = fondo[100:140, 120:180].astype(np.float32)
+    for i in range(frames + 1):
+        frame = fondo.copy()
+        alfa = 1.0 - i / frames
+        frame[100:140, 120:180] = (alfa * boton + (1 - alfa) * debajo).astype(np.uint8)
+        x = 10 + (i % 4) * 8
+        frame[200:216, x:x + 16] = 255 if i % 2 else 0
+        yield frame, boton
+
+
+def test_incremental_coincide_con_recorrelacion_completa():
+    detector = FrameChangeDetector(tamano_tile=32, umbral=8)
+    matcher = TemplateMatcher(hilos=1)
+    template = None
+    modos = set()
+    for frame, boton in secuencia_boton_desvaneciendose():
+        if template is None:
+            template = Template("boton", boton, 0)
+        resultado = analizar(detector, matcher, frame, template)
+        modos.add(resultado.modo)
+
+        completo = cv2.matchTemplate(frame, template.imagen, cv2.TM_CCOEFF_NORMED)
+        _, esperado, _, _ = cv2.minMaxLoc(completo)
+        assert abs(resultado.score - esperado) < 0.1
+
+    assert "incremental" in modos
+    # Al final el botón ya no está: el mapa en caché no puede seguir dándolo por visible
+    assert resultado.score < 0.8
+
+
+def test_fijar_referencia_solo_copia_tiles_cambiados():
+    detector = FrameChangeDetector(tamano_tile=16, umbral=8)
+    frame = np.zeros((64, 64, 3), dtype=np.uint8)
+    detector.fijar_referencia(frame)
+
+    siguiente = frame.copy()
+    siguiente[:, :] = 5  # Cambio por debajo del umbral en toda la pantalla
+    siguiente[0:16, 0:16] = 200
+    tiles = detector.comparar(siguiente)
+    assert tiles.sum() == 1
+    detector.fijar_referencia(siguiente, tiles)
+
+    assert (detector.referencia[0:16, 0:16] == 200).all()
+    assert (detector.referencia[16:, 16:] == 0).all()
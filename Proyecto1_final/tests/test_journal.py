@@ -0,0 +1,105 @@
+from utils.journal import CheckpointJournal
+
+
+def diario(tmp_path):
+    return CheckpointJournal(str(tmp_path / "progreso.jsonl"), fsync_cada=1000, fsync_intervalo=1000)
+
+
+def test_sin_diario_no_hay_reanudacion(tmp_path):
+    assert diario(tmp_path).punto_reanudacion(1, 5) is None
+
+
+def test_reanuda_tras_el_ultimo_paso(tmp_path):
+    journal = diario(tmp_path)
+    journal.iniciar(1, 5)
+    journal.registrar_paso(1, 0, "img/b1.png")
+    journal.registrar_paso(1, 1, "img/b2.png")
+    journal.cerrar()
+    assert diario(tmp_path).punto_reanudacion(1, 5) == (1, 2)
+
+
+def test_reanuda_en_el_lote_siguiente(tmp_path):
+    journal = diario(tmp_path)
+    journal.iniciar(1, 5)
+    journal.registrar_paso(1, 7, "img/b8.png")
+    journal.registrar_lote(1)
+    journal.registrar_paso(2, 0, "img/b1.png")
+    journal.registrar_lote(2)
+    journal.cerrar()
+    assert diario(tmp_path).punto_reanudacion(1, 5) == (3, 0)
+
+
+def test_otro_rango_no_reanuda(tmp_path):
+    journal = diario(tmp_path)
+    journal.iniciar(1, 5)
+    journal.registrar_paso(1, 0, "img/b1.png")
+    journal.cerrar()
+    assert diario(tmp_path).punto_reanudacion(2, 5) is None
+    assert diario(tmp_path).punto_reanudacion(1, 6) is None
+
+
+def test_otro_formato_no_reanuda(tmp_path):
+    journal = diario(tmp_path)
+    journal.iniciar(1, 5, formato="LT")
+    journal.registrar_paso(2, 3, "img/b4.png")
+    journal.cerrar()
+    assert diario(tmp_path).punto_reanudacion(1, 5, "LT") == (2, 4)
+    assert diario(tmp_path).punto_reanudacion(1, 5, "MZ") is None
+
+
+def test_ejecucion_finalizada_no_reanuda(tmp_path):
+    journal = diario(tmp_path)
+    journal.iniciar(1, 1)
+    journal.registrar_lote(1)
+    journal.finalizar()
+    journal.cerrar()
+    assert diario(tmp_path).punto_reanudacion(1, 1) is None
+
+
+def test_todos_los_lotes_completados_no_reanuda(tmp_path):
+    journal = diario(tmp_path)
+    journal.iniciar(1, 2)
+    journal.registrar_lote(1)
+    journal.registrar_lote(2)
+    journal.cerrar()
+    assert diario(tmp_path).punto_reanudacion(1, 2) is None
+
+
+def test_detenido_por_el_usuario_no_reanuda(tmp_path):
+    journal = diario(tmp_path)
+    journal.iniciar(1, 5)
+    journal.registrar_paso(3, 4, "img/b1.png")
+    journal.detener(3)
+    journal.cerrar()
+    assert diario(tmp_path).punto_reanudacion(1, 5) is None
+
+
+def test_reanudacion_encadenada(tmp_path):
+    journal = diario(tmp_path)
+    journal.iniciar(1, 5)
+    journal.registrar_paso(2, 3, "img/b4.png")
+    journal.cerrar()
+
+    journal = diario(tmp_path)
+    lote, paso = journal.punto_reanudacion(1, 5)
+    journal.reanudar(lote, paso)
+    journal.registrar_paso(2, 4, "img/b1.png")
+    journal.cerrar()
+    assert diario(tmp_path).punto_reanudacion(1, 5) == (2, 5)
+
+
+def test_linea_truncada_se_ignora(tmp_path):
+    journal = diario(tmp_path)
+    journal.iniciar(1, 5)
+    journal.registrar_paso(1, 0, "img/b1.png")
+    journal.cerrar()
+    with open(journal.ruta, "a", encoding="utf-8") as f:
+        f.write('{"tipo": "paso", "lote": 1, "pa')
+
+    journal = diario(tmp_path)
+    assert journal.punto_reanudacion(1, 5) == (1, 1)
+    # El siguiente registro no se pega a la línea truncada
+    journal.reanudar(1, 1)
+    journal.registrar_paso(1, 1, "img/b2.png")
+    journal.cerrar()
+    assert diario(tmp_path).punto_reanudacion(1, 5) == (1, 2)
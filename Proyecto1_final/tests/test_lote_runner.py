@@ -0,0 +1,55 @@
+from controllers.lote_runner import LoteRunner
+from utils.cancellation import CancellationToken
+from utils.clock import VirtualClock
+from utils.config_manager import ConfigManager
+from utils.trace import TraceRecorder
+
+
+class ModeloFalso:
+    """Lo que LoteRunner usa del modelo: el clic en b4 y la espera de la ventana de archivo"""
+    ventana_archivo_template = "img/cargarArchivo.png"
+    confianza_ventana_archivo = 0.8
+
+    def __init__(self, tmp_path, clic_ok=True):
+        self.config_manager = ConfigManager(str(tmp_path / "config.json"))
+        self.config_manager.aplicar_temporal({"journal_file": str(tmp_path / "progreso.jsonl"),
+                                              "metrics_file": "", "metrics_prometheus_file": ""})
+        self.reloj = VirtualClock()
+        self.token = CancellationToken(self.reloj)
+        self.token.iniciar()
+        self.traza = TraceRecorder("")
+        self.template_library = {self.ventana_archivo_template: object()}
+        self.clic_ok = clic_ok
+        self.clics = 0
+        self.esperas = 0
+        self.ultima_confianza = 0.3
+        self.alt_n_used = False
+
+    @property
+    def is_running(self):
+        return self.token.activo
+
+    def click_button(self, imagen, clicks, confianza, pendientes=None, post_condicion=None):
+        self.clics += 1
+        return self.clic_ok
+
+    def wait_for(self, imagen, **kwargs):
+        self.esperas += 1
+        return None
+
+
+def test_b4_sin_transicion_no_espera_la_ventana(tmp_path):
+    modelo = ModeloFalso(tmp_path, clic_ok=False)
+    runner = LoteRunner(modelo, ahk_manager=None)
+    assert runner.handle_b4_special_behavior("img/b4.png", 1, 0.7, ("aparece", modelo.ventana_archivo_template)) is False
+    assert modelo.esperas == 0
+    assert not modelo.alt_n_used
+
+
+def test_ventana_de_archivo_que_no_aparece_agota_los_intentos(tmp_path):
+    modelo = ModeloFalso(tmp_path)
+    modelo.config_manager.aplicar_temporal({"file_window_attempts": 4})
+    runner = LoteRunner(modelo, ahk_manager=None)
+    assert runner.handle_b4_special_behavior("img/b4.png", 1, 0.7) is False
+    assert modelo.esperas == 4
+    assert not modelo.alt_n_used
@@ -0,0 +1,104 @@
+import json
+import os
+import stat
+import sys
+
+import pytest
+
+from utils.metrics import Histogram, MetricsRecorder
+
+
+def histograma(*valores):
+    h = Histogram()
+    for valor in valores:
+        h.observar(valor)
+    return h
+
+
+def test_histograma_vacio():
+    h = Histogram()
+    assert h.percentil(50) == 0.0
+    assert h.resumen() == {"n": 0, "media": 0.0, "p50": 0.0, "p95": 0.0, "max": 0.0}
+
+
+def test_percentiles_interpolan_dentro_del_bucket():
+    h = histograma(*([20] * 50 + [200] * 50))
+    assert h.cuentas[2] == 50 and h.cuentas[5] == 50  # (10, 25] y (100, 250]
+    assert h.percentil(50) == pytest.approx(25)
+    assert h.percentil(75) == pytest.approx(175)
+    # Las estimaciones no salen del rango observado
+    assert h.percentil(25) == 20
+    assert h.percentil(100) == 200
+
+
+def test_percentil_de_un_solo_valor():
+    h = histograma(7)
+    for p in (1, 50, 95, 100):
+        assert h.percentil(p) == 7
+
+
+def test_valores_por_encima_del_ultimo_limite():
+    h = histograma(50, 200000, 300000)
+    assert h.cuentas[-1] == 2
+    assert 120000 <= h.percentil(95) <= 300000
+    assert h.percentil(100) == 300000
+
+
+def test_percentiles_crecientes():
+    h = histograma(*[(i * 37) % 5000 for i in range(1, 500)])
+    estimados = [h.percentil(p) for p in range(0, 101, 5)]
+    assert estimados == sorted(estimados)
+
+
+def test_combinar_equivale_a_observar_todo():
+    a = histograma(3, 40, 900)
+    b = histograma(15, 15000)
+    a.combinar(b)
+    todo = histograma(3, 40, 900, 15, 15000)
+    assert a.cuentas == todo.cuentas
+    assert a.resumen() == todo.resumen()
+
+
+def test_registrar_paso_y_lote(tmp_path):
+    ruta = tmp_path / "metricas.jsonl"
+    prom = tmp_path / "metricas.prom"
+    metricas = MetricsRecorder(str(ruta), str(prom))
+    pasos = [
+        metricas.registrar_paso({"lote": 1, "paso": 0, "imagen": "img/b1.png", "ok": True, "intentos": 2,
+                                 "total_ms": 300.0, "captura_ms": 40.0, "match_ms": 60.0, "ahk_ms": None}),
+        metricas.registrar_paso({"lote": 1, "paso": 1, "imagen": "img/b2.png", "ok": False, "intentos": 3,
+                                 "total_ms": 1000.0, "captura_ms": 100.0, "match_ms": 100.0, "ahk_ms": 900.0}),
+    ]
+    assert pasos[0]["otros_ms"] == 200.0
+    assert pasos[1]["otros_ms"] == 0.0  # Nunca negativo
+
+    registro = metricas.registrar_lote(1, pasos, 1500.0, ok=True)
+    assert registro["ahk_ms"] == 900.0
+    assert registro["otros_ms"] == 300.0
+    metricas.cerrar()
+
+    lineas = [json.loads(linea) for linea in ruta.read_text(encoding="utf-8").splitlines()]
+    assert [linea["tipo"] for linea in lineas] == ["paso", "paso", "lote"]
+
+    resumen = metricas.resumen()
+    assert resumen["contadores"]["pasos"] == 2
+    assert resumen["contadores"]["pasos_fallidos"] == 1
+    assert resumen["contadores"]["intentos"] == 5
+    assert resumen["contadores"]["lotes_completados"] == 1
+    assert resumen["tiempos_ms"]["paso_total_ms"]["n"] == 2
+    assert resumen["tiempos_ms"]["paso_ahk_ms"]["n"] == 1  # Los None no se observan
+
+    texto = prom.read_text(encoding="utf-8")
+    assert 'deteccion_paso_total_seconds_bucket{imagen="img/b1.png",le="0.5"} 1' in texto
+    assert 'deteccion_paso_total_seconds_bucket{imagen="img/b2.png",le="0.5"} 0' in texto
+    assert 'deteccion_paso_total_seconds_bucket{imagen="img/b2.png",le="+Inf"} 1' in texto
+    assert "deteccion_lote_total_seconds_count 1" in texto
+    assert "deteccion_pasos_total 2" in texto
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="permisos POSIX")
+def test_textfile_legible_por_otros_usuarios(tmp_path):
+    prom = tmp_path / "metricas.prom"
+    metricas = MetricsRecorder("", str(prom))
+    metricas.exportar_prometheus()
+    assert stat.S_IMODE(os.stat(prom).st_mode) == 0o644
@@ -0,0 +1,82 @@
+import json
+import os
+import random
+
+import pytest
+
+from models.template_matcher import TemplateMatcher
+from simulacion.pantallas_sinteticas import (TIPOS_FONDO, cargar_imagenes, crear_fondo, crear_parser,
+                                             generar_pantalla, main)
+from utils.template_library import Template
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PLANTILLAS = ["img/b1.png", "img/b2.png", "img/b3.png", "img/b6.png", "img/b7.png", "img/b8.png"]
+
+
+def opciones(*argumentos):
+    return crear_parser().parse_args(["--salida", "no-se-usa"] + list(argumentos))
+
+
+@pytest.fixture
+def en_raiz(monkeypatch):
+    monkeypatch.chdir(RAIZ)
+
+
+@pytest.mark.parametrize("tipo", TIPOS_FONDO)
+@pytest.mark.parametrize("tamano", [(1, 1), (40, 40), (49, 120), (300, 200)])
+def test_fondos_de_cualquier_tamano(tipo, tamano):
+    ancho, alto = tamano
+    rng = random.Random(3)
+    for _ in range(5):
+        fondo = crear_fondo(tipo, ancho, alto, rng)
+        assert fondo.shape == (alto, ancho, 3)
+
+
+def test_misma_semilla_misma_pantalla(en_raiz):
+    plantillas = cargar_imagenes(PLANTILLAS)
+    args = opciones("--ancho", "400", "--alto", "300", "--brillo", "10", "--prob-jpeg", "0.5")
+    imagen_a, datos_a = generar_pantalla(plantillas, args, random.Random(7))
+    imagen_b, datos_b = generar_pantalla(plantillas, args, random.Random(7))
+    assert (imagen_a == imagen_b).all()
+    assert datos_a == datos_b
+
+
+def test_el_matcher_encuentra_los_botones_del_manifiesto(en_raiz):
+    """Regresión de precisión: cada botón pegado se localiza en su caja"""
+    plantillas = cargar_imagenes(PLANTILLAS)
+    templates = {ruta: Template(ruta, imagen, 0) for ruta, imagen in plantillas}
+    args = opciones("--ancho", "640", "--alto", "400", "--presencia", "0.7")
+    rng = random.Random(11)
+    comprobados = 0
+    for _ in range(5):
+        matcher = TemplateMatcher(hilos=1)
+        imagen, datos = generar_pantalla(plantillas, args, rng)
+        cajas = {}
+        for objeto in datos["objetos"]:
+            if not objeto["señuelo"]:
+                cajas.setdefault(objeto["plantilla"], []).append((objeto["x"], objeto["y"]))
+        for ruta, posiciones in cajas.items():
+            resultado = matcher.buscar(imagen, templates[ruta], 0.9)
+            assert resultado.score > 0.95
+            assert resultado.loc in posiciones
+            comprobados += 1
+    assert comprobados > 10
+
+
+def test_main_escribe_el_manifiesto_sin_pegar_señuelos_como_botones(en_raiz, tmp_path):
+    salida = tmp_path / "sinteticas"
+    main(["--salida", str(salida), "--cantidad", "3", "--ancho", "500", "--alto", "400",
+          "--prob-señuelo", "1", "--fondo", "liso"])
+    with open(salida / "manifiesto.json", encoding="utf-8") as f:
+        manifiesto = json.load(f)
+    assert len(manifiesto["pantallas"]) == 3
+    for pantalla in manifiesto["pantallas"]:
+        assert (salida / pantalla["archivo"]).exists()
+        for objeto in pantalla["objetos"]:
+            if os.path.normpath(objeto["plantilla"]) == os.path.normpath("img/b4no.png"):
+                assert objeto.get("variante") == "casi_identico"
+
+
+def test_main_rechaza_tamanos_no_positivos(en_raiz, tmp_path):
+    with pytest.raises(SystemExit):
+        main(["--salida", str(tmp_path), "--cantidad", "1", "--ancho", "0"])
@@ -0,0 +1,86 @@
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from utils.screen_capture import BackgroundCapture, CaptureSession, LatestFrameSlot
+
+
+class CapturaLenta(CaptureSession):
+    """Backend de prueba: cada frame tarda 'demora' segundos y lleva su número en el primer píxel"""
+    nombre = "lenta"
+
+    def __init__(self, demora):
+        super().__init__()
+        self.demora = demora
+        self.numero = 0
+        self.region = (0, 0, 8, 8)
+
+    def _capturar(self):
+        time.sleep(self.demora)
+        self.numero += 1
+        self._asegurar_buffers(8, 8)
+        self._buffer[:] = self.numero % 256
+
+
+class CapturaRota(CapturaLenta):
+    def _capturar(self):
+        raise OSError("pantalla no disponible")
+
+
+def test_slot_entrega_solo_frames_nuevos():
+    slot = LatestFrameSlot()
+    assert slot.leer(timeout=0)[0] is None
+    slot.publicar(np.full((2, 2, 3), 7, np.uint8), 1.0)
+    frame, frame_id, instante = slot.leer(timeout=0)
+    assert frame_id == 1 and instante == 1.0 and (frame == 7).all()
+    assert slot.leer(posterior_a=1, timeout=0)[0] is None
+    assert slot.leer(desde=2.0, timeout=0)[0] is None
+
+
+def test_primer_frame_lento_no_es_un_error():
+    sesion = BackgroundCapture(lambda: CapturaLenta(0.3), fps=10, espera_maxima=0.1)
+    try:
+        frame = sesion.grab()
+        assert frame is not None and sesion.frame_id == 1
+    finally:
+        sesion.close()
+
+
+def test_nunca_entrega_un_frame_anterior_a_descartar():
+    sesion = BackgroundCapture(lambda: CapturaLenta(0.25), fps=2, espera_maxima=0.1)
+    try:
+        sesion.grab()
+        for _ in range(3):
+            sesion.descartar_anteriores()
+            limite = sesion.descartar_hasta
+            sesion.grab()
+            assert sesion.timestamp >= limite
+        assert sesion.esperas_largas >= 1
+    finally:
+        sesion.close()
+
+
+def test_deja_de_esperar_al_detener():
+    activo = threading.Event()
+    activo.set()
+    sesion = BackgroundCapture(lambda: CapturaLenta(0.05), fps=1, activo=activo.is_set)
+    try:
+        sesion.grab()
+        sesion.descartar_anteriores()
+        threading.Timer(0.2, activo.clear).start()
+        inicio = time.monotonic()
+        assert sesion.grab() is None
+        assert time.monotonic() - inicio < 1.0
+    finally:
+        sesion.close()
+
+
+def test_error_del_hilo_de_captura():
+    sesion = BackgroundCapture(lambda: CapturaRota(0), fps=10)
+    try:
+        with pytest.raises(RuntimeError, match="pantalla no disponible"):
+            sesion.grab()
+    finally:
+        sesion.close()
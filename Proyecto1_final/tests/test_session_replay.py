@@ -0,0 +1,92 @@
+import numpy as np
+import pytest
+
+from utils.screen_capture import ReplayCapture, crear_capture_session
+from utils.session_recorder import SessionRecorder, leer_sesion
+
+
+class Reloj:
+    def __init__(self):
+        self.t = 0.0
+
+    def __call__(self):
+        return self.t
+
+
+def frame(valor):
+    imagen = np.zeros((30, 40, 3), np.uint8)
+    imagen[:, :, 0] = valor
+    imagen[5, 5] = (valor, 255 - valor, 7)
+    return imagen
+
+
+def grabar(directorio, valores, intervalo=1.0, offset=(100, 50)):
+    reloj = Reloj()
+    grabador = SessionRecorder(str(directorio), reloj=reloj)
+    grabador.registrar_sesion(backend="prueba", region=[offset[0], offset[1], 40, 30])
+    for frame_id, valor in enumerate(valores, 1):
+        grabador.registrar_frame(frame(valor), frame_id, offset)
+        reloj.t += intervalo
+    grabador.registrar_accion("click", x=120, y=60, clicks=1)
+    grabador.cerrar()
+    return grabador
+
+
+def test_grabacion_deduplica_frames(tmp_path):
+    grabador = grabar(tmp_path, [10, 10, 20, 10])
+    stats = grabador.estadisticas()
+    assert stats["frames"] == 4 and stats["unicos"] == 2 and stats["duplicados"] == 2
+    registros = leer_sesion(str(tmp_path))
+    # Los frames los escribe el hilo: el orden lo da 't', no la línea del archivo
+    assert sorted(r["tipo"] for r in registros) == ["accion", "frame", "frame", "frame", "frame", "sesion"]
+    frames = [r for r in registros if r["tipo"] == "frame"]
+    assert [r["t"] for r in frames] == [0.0, 1.0, 2.0, 3.0]
+    assert [r["t"] for r in registros if r["tipo"] == "accion"] == [4.0]
+    assert frames[0]["archivo"] == frames[1]["archivo"] != frames[2]["archivo"]
+
+
+def test_reproduccion_secuencial_sin_perdidas(tmp_path):
+    grabar(tmp_path, [10, 20, 30])
+    sesion = crear_capture_session("replay", directorio=str(tmp_path), modo="secuencial")
+    assert sesion.offset == (100, 50)
+    vistos = [sesion.grab().copy() for _ in range(4)]
+    for visto, valor in zip(vistos, [10, 20, 30, 30]):  # Al terminar se repite el último
+        assert (visto == frame(valor)).all()
+    assert sesion.terminada
+
+
+def test_reproduccion_segun_el_reloj(tmp_path):
+    grabar(tmp_path, [10, 20, 30], intervalo=2.0)
+    reloj = Reloj()
+    sesion = ReplayCapture(str(tmp_path), modo="tiempo", velocidad=2.0, reloj=reloj)
+    esperados = []
+    for t in (0.0, 0.4, 1.1, 1.9, 10.0):
+        reloj.t = t
+        esperados.append(sesion.grab()[0, 0, 0])
+    # A velocidad 2, el frame grabado en t=2 s se ve en t=1 s
+    assert esperados == [10, 10, 20, 20, 30]
+
+
+def test_sesion_sin_frames(tmp_path):
+    grabador = SessionRecorder(str(tmp_path))
+    grabador.registrar_sesion(backend="prueba")
+    grabador.cerrar()
+    with pytest.raises(ValueError):
+        ReplayCapture(str(tmp_path))
+
+
+def test_lo_capturado_se_reproduce_igual(tmp_path):
+    origen = tmp_path / "origen"
+    grabar(origen, [10, 20, 30])
+    copia = tmp_path / "copia"
+
+    # Grabar lo que entrega una sesión de captura y reproducir la grabación
+    sesion = ReplayCapture(str(origen), modo="secuencial")
+    sesion.grabador = SessionRecorder(str(copia))
+    capturados = [sesion.grab().copy() for _ in range(3)]
+    sesion.grabador.cerrar()
+
+    reproduccion = ReplayCapture(str(copia), modo="secuencial")
+    for capturado in capturados:
+        assert (reproduccion.grab() == capturado).all()
+    assert reproduccion.offset == sesion.offset
@@ -0,0 +1,69 @@
+import os
+
+import cv2
+import numpy as np
+
+from utils.template_library import TemplateLibrary
+
+
+def escribir(ruta, valor, mtime_ns=None):
+    imagen = np.zeros((20, 30, 3), np.uint8)
+    imagen[:, :15] = valor
+    assert cv2.imwrite(str(ruta), imagen)
+    if mtime_ns is not None:
+        os.utime(ruta, ns=(mtime_ns, mtime_ns))
+
+
+def test_segunda_lectura_sale_de_la_cache(tmp_path):
+    ruta = tmp_path / "b1.png"
+    escribir(ruta, 200)
+    biblioteca = TemplateLibrary()
+    primera = biblioteca.get(str(ruta))
+    assert primera is not None and primera.size == (30, 20)
+    assert biblioteca.get(str(ruta)) is primera
+    stats = biblioteca.estadisticas()
+    assert stats["hits"] == 1 and stats["misses"] == 1 and stats["recargas"] == 0
+
+
+def test_recarga_si_cambia_el_mtime(tmp_path):
+    ruta = tmp_path / "b1.png"
+    escribir(ruta, 200, mtime_ns=1_000_000_000)
+    biblioteca = TemplateLibrary([str(ruta)])
+    vieja = biblioteca.get(str(ruta))
+
+    # Misma ruta, contenido nuevo y otro mtime: la entrada cacheada ya no vale
+    escribir(ruta, 50, mtime_ns=2_000_000_000)
+    nueva = biblioteca.get(str(ruta))
+    assert nueva is not vieja
+    assert nueva.imagen[0, 0, 0] == 50
+    assert biblioteca.estadisticas()["recargas"] == 1
+    assert biblioteca.get(str(ruta)) is nueva
+
+
+def test_archivo_borrado_o_ilegible(tmp_path):
+    ruta = tmp_path / "b1.png"
+    escribir(ruta, 200)
+    biblioteca = TemplateLibrary([str(ruta)])
+    os.remove(ruta)
+    assert biblioteca.get(str(ruta)) is None
+    assert biblioteca.estadisticas()["plantillas"] == 0
+
+    roto = tmp_path / "roto.png"
+    roto.write_bytes(b"no es una imagen")
+    assert biblioteca.get(str(roto)) is None
+
+
+def test_invalidar_fuerza_la_recarga(tmp_path):
+    ruta = tmp_path / "b1.png"
+    escribir(ruta, 200)
+    biblioteca = TemplateLibrary([str(ruta)])
+    antes = biblioteca.get(str(ruta))
+    biblioteca.invalidar(str(ruta))
+    assert biblioteca.get(str(ruta)) is not antes
+    assert biblioteca.estadisticas()["recargas"] == 0  # No es un cambio en disco
+
+
+def test_plantilla_plana(tmp_path):
+    ruta = tmp_path / "plana.png"
+    cv2.imwrite(str(ruta), np.full((10, 10, 3), 128, np.uint8))
+    assert TemplateLibrary().get(str(ruta)).es_plana
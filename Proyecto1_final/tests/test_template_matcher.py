@@ -0,0 +1,187 @@
+import cv2
+import numpy as np
+
+from models.template_matcher import TemplateMatcher
+from utils.template_library import Template
+
+
+def escena(plantillas=6):
+    rng = np.random.default_rng(2)
+    frame = rng.integers(0, 256, (200, 400, 3), dtype=np.uint8)
+    templates = [Template(f"t{i}", frame[20:50, 10 + 60 * i:50 + 60 * i].copy(), 0) for i in range(plantillas)]
+    return frame, templates
+
+
+def test_detect_all_encuentra_cada_plantilla():
+    frame, templates = escena()
+    matcher = TemplateMatcher(hilos=4)
+    try:
+        resultados = matcher.detect_all(frame, templates, 0.9)
+    finally:
+        matcher.cerrar()
+    for i, template in enumerate(templates):
+        assert resultados[template.ruta].loc == (10 + 60 * i, 20)
+        assert resultados[template.ruta].score > 0.99
+
+
+def test_contadores_consistentes_con_varios_hilos():
+    frame, templates = escena()
+    matcher = TemplateMatcher(hilos=4)
+    rondas = 20
+    try:
+        for _ in range(rondas):
+            matcher.olvidar()
+            matcher.detect_all(frame, templates, 0.9)
+    finally:
+        matcher.cerrar()
+    stats = matcher.estadisticas()
+    assert stats["busquedas_completas"] == rondas * len(templates)
+    assert stats["detecciones_multiples"] == rondas
+    assert len(matcher.exportar_posiciones()) == len(templates)
+
+
+def test_roi_tras_la_primera_busqueda():
+    frame, templates = escena(1)
+    matcher = TemplateMatcher(hilos=1)
+    assert matcher.buscar(frame, templates[0], 0.9).modo == "completa"
+    assert matcher.buscar(frame, templates[0], 0.9).modo == "roi"
+    assert matcher.estadisticas()["aciertos_roi"] == 1
+
+
+def pantalla_con_boton(x, y, semilla=3):
+    """Fondo aleatorio fijo con el mismo botón pegado en (x, y)"""
+    rng = np.random.default_rng(semilla)
+    frame = rng.integers(0, 256, (300, 400, 3), dtype=np.uint8)
+    boton = np.random.default_rng(99).integers(0, 256, (24, 40, 3), dtype=np.uint8)
+    frame[y:y + 24, x:x + 40] = boton
+    return frame, Template("boton", boton, 0)
+
+
+def test_roi_sigue_al_boton_dentro_del_margen():
+    frame, template = pantalla_con_boton(100, 100)
+    matcher = TemplateMatcher(padding=40, hilos=1)
+    matcher.buscar(frame, template, 0.9)
+    frame, _ = pantalla_con_boton(130, 80)
+    resultado = matcher.buscar(frame, template, 0.9)
+    assert resultado.modo == "roi" and resultado.loc == (130, 80)
+    assert matcher.exportar_posiciones() == {"boton": [130, 80]}
+
+
+def test_fallo_de_roi_recurre_a_la_pantalla_completa():
+    frame, template = pantalla_con_boton(20, 20)
+    matcher = TemplateMatcher(padding=40, hilos=1)
+    matcher.buscar(frame, template, 0.9)
+    frame, _ = pantalla_con_boton(320, 250)
+    resultado = matcher.buscar(frame, template, 0.9)
+    assert resultado.modo == "completa" and resultado.loc == (320, 250)
+    assert resultado.score > 0.99
+    stats = matcher.estadisticas()
+    assert stats["busquedas_roi"] == 1 and stats["aciertos_roi"] == 0
+    assert matcher.exportar_posiciones() == {"boton": [320, 250]}
+
+
+def test_posicion_cargada_y_roi_en_el_borde():
+    frame, template = pantalla_con_boton(0, 276)
+    matcher = TemplateMatcher(padding=40, hilos=1)
+    matcher.cargar_posiciones({"boton": [0, 276]})
+    resultado = matcher.buscar(frame, template, 0.9)
+    assert resultado.modo == "roi" and resultado.loc == (0, 276)
+
+
+def test_sin_coincidencia_no_se_aprende_la_posicion():
+    frame, template = pantalla_con_boton(100, 100)
+    otro = Template("otro", np.random.default_rng(5).integers(0, 256, (24, 40, 3), dtype=np.uint8), 0)
+    matcher = TemplateMatcher(hilos=1)
+    assert matcher.buscar(frame, otro, 0.9).score < 0.9
+    assert matcher.exportar_posiciones() == {}
+    assert matcher.buscar(frame, otro, 0.9).modo == "completa"
+
+
+def barajar_bloques(imagen, lado, rng):
+    """Permuta los píxeles dentro de cada bloque lado x lado: igual reducido, distinto a resolución completa"""
+    copia = imagen.copy()
+    for y in range(0, imagen.shape[0], lado):
+        for x in range(0, imagen.shape[1], lado):
+            bloque = copia[y:y + lado, x:x + lado].reshape(-1, 3)
+            copia[y:y + lado, x:x + lado] = bloque[rng.permutation(len(bloque))].reshape(lado, lado, 3)
+    return copia
+
+
+def escena_piramide(con_boton):
+    rng = np.random.default_rng(4)
+    frame = np.full((320, 480, 3), 90, np.uint8)
+    boton = rng.integers(0, 256, (48, 64, 3), dtype=np.uint8)
+    frame[40:88, 40:104] = barajar_bloques(boton, 4, rng)  # Señuelo
+    if con_boton:
+        frame[200:248, 300:364] = boton
+    return frame, Template("boton", boton, 0)
+
+
+def test_piramide_confirma_a_resolucion_completa():
+    frame, template = escena_piramide(con_boton=True)
+    matcher = TemplateMatcher(factores_piramide={"boton": 4}, hilos=1)
+    resultado = matcher.buscar(frame, template, 0.9)
+    assert resultado.modo == "piramide"
+    assert resultado.loc == (300, 200)
+    assert resultado.score > 0.99
+
+
+def test_falso_positivo_de_la_piramide_se_rechaza():
+    frame, template = escena_piramide(con_boton=False)
+    reducida = template.escalada(4)
+    señuelo = cv2.resize(frame[40:88, 40:104], (reducida.shape[1], reducida.shape[0]), interpolation=cv2.INTER_AREA)
+    # A 1/4 el señuelo es indistinguible del botón...
+    assert cv2.matchTemplate(señuelo, reducida, cv2.TM_CCOEFF_NORMED)[0, 0] > 0.95
+
+    matcher = TemplateMatcher(factores_piramide={"boton": 4}, hilos=1)
+    resultado = matcher.buscar(frame, template, 0.9)
+    # ...pero la confianza devuelta es la de resolución completa
+    assert resultado.modo == "piramide"
+    assert resultado.score < 0.5
+    assert matcher.exportar_posiciones() == {}
+
+
+def test_plantilla_demasiado_pequena_para_la_piramide():
+    frame, template = pantalla_con_boton(100, 100)  # 40x24: a 1/4 queda por debajo de 8 px
+    matcher = TemplateMatcher(factores_piramide={"boton": 4}, hilos=1)
+    resultado = matcher.buscar(frame, template, 0.9)
+    assert resultado.modo == "completa" and resultado.loc == (100, 100)
+    assert matcher.estadisticas()["busquedas_piramide"] == 0
+
+
+def escena_color(variante):
+    """Botón gris o su variante teñida: en escala de grises solo difieren en un desplazamiento de brillo"""
+    g = np.random.default_rng(6).integers(60, 190, (24, 40)).astype(np.int16)
+    boton = np.dstack([g, g, g]).astype(np.uint8)
+    teñido = np.dstack([g - 50, g, g + 50]).astype(np.uint8)
+    frame = np.full((200, 300, 3), 30, np.uint8)
+    frame[80:104, 120:160] = teñido if variante else boton
+    return frame, Template("b4", boton, 0)
+
+
+def test_gris_confirma_en_color():
+    frame, template = escena_color(variante=False)
+    matcher = TemplateMatcher(plantillas_gris=["b4"], verificar_color=["b4"], hilos=1)
+    resultado = matcher.buscar(frame, template, 0.9)
+    assert resultado.gris and resultado.color_ok
+    assert resultado.loc == (120, 80) and resultado.score > 0.99
+
+
+def test_variante_de_otro_color_se_rechaza():
+    frame, template = escena_color(variante=True)
+    solo_gris = TemplateMatcher(plantillas_gris=["b4"], hilos=1)
+    assert solo_gris.buscar(frame, template, 0.9).score > 0.9  # En gris es indistinguible
+
+    matcher = TemplateMatcher(plantillas_gris=["b4"], verificar_color=["b4"], tolerancia_color=30, hilos=1)
+    resultado = matcher.buscar(frame, template, 0.9)
+    assert resultado.color_ok is False and resultado.score == 0.0
+    assert matcher.estadisticas()["rechazos_color"] == 1
+    assert matcher.exportar_posiciones() == {}  # La siguiente búsqueda no parte de la variante
+
+
+def test_gris_sin_verificacion_no_toca_el_color():
+    frame, template = escena_color(variante=False)
+    matcher = TemplateMatcher(plantillas_gris=["b4"], hilos=1)
+    resultado = matcher.buscar(frame, template, 0.9, frame_gris=cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY))
+    assert resultado.gris and resultado.color_ok is None
+    assert matcher.estadisticas()["busquedas_gris"] == 1
@@ -0,0 +1,88 @@
+import json
+import threading
+
+from utils.trace import TraceRecorder
+
+
+class Reloj:
+    def __init__(self, t=100.0):
+        self.t = t
+
+    def __call__(self):
+        return self.t
+
+
+def test_sin_directorio_no_traza(tmp_path):
+    traza = TraceRecorder("")
+    traza.iniciar("lote-1")
+    assert not traza.activo
+    with traza.tramo("captura"):
+        pass
+    assert traza.guardar() is None
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_tramos_anidados_y_en_microsegundos(tmp_path):
+    reloj = Reloj()
+    traza = TraceRecorder(str(tmp_path / "trazas"), reloj=reloj)
+    traza.iniciar("lote-3", lote=3)
+    with traza.tramo("run_sequence", "lote"):
+        reloj.t += 0.010
+        with traza.tramo("captura", "vision", imagen="img/b1.png"):
+            reloj.t += 0.025
+        reloj.t += 0.005
+    ruta = traza.guardar()
+    assert not traza.activo
+
+    datos = json.loads(open(ruta, encoding="utf-8").read())
+    assert datos["otherData"] == {"lote": 3, "traza": "lote-3"}
+    eventos = [e for e in datos["traceEvents"] if e["ph"] == "X"]
+    # Ordenados por inicio: el tramo externo va antes aunque se cierre después
+    assert [e["name"] for e in eventos] == ["run_sequence", "captura"]
+    externo, interno = eventos
+    assert externo["ts"] == 0 and round(externo["dur"]) == 40000
+    assert round(interno["ts"]) == 10000 and round(interno["dur"]) == 25000
+    assert interno["args"] == {"imagen": "img/b1.png"} and "args" not in externo
+    assert externo["ts"] + externo["dur"] >= interno["ts"] + interno["dur"]
+
+
+def test_cada_hilo_tiene_su_nombre(tmp_path):
+    traza = TraceRecorder(str(tmp_path), reloj=Reloj())
+    traza.iniciar("lote-1")
+    with traza.tramo("clic"):
+        pass
+    hilo = threading.Thread(target=lambda: traza.agregar("captura", "vision", 100.0, 100.002),
+                            name="captura-fondo")
+    hilo.start()
+    hilo.join()
+    datos = json.loads(open(traza.guardar(), encoding="utf-8").read())
+
+    nombres = {e["tid"]: e["args"]["name"] for e in datos["traceEvents"] if e["name"] == "thread_name"}
+    assert nombres[hilo.ident] == "captura-fondo"
+    assert nombres[threading.current_thread().ident] == threading.current_thread().name
+    tids = {e["name"]: e["tid"] for e in datos["traceEvents"] if e["ph"] == "X"}
+    assert tids["captura"] == hilo.ident
+
+
+def test_tramos_fuera_del_lote_se_ignoran(tmp_path):
+    traza = TraceRecorder(str(tmp_path), reloj=Reloj())
+    traza.agregar("suelto", "", 0.0, 1.0)
+    traza.iniciar("lote-1")
+    tramo = traza.tramo("ahk")
+    traza.guardar()
+    with tramo:  # Se cierra después de guardar: no entra en ningún archivo
+        pass
+    assert traza.guardar() is None
+    datos = json.loads((tmp_path / "lote-1.json").read_text(encoding="utf-8"))
+    assert [e for e in datos["traceEvents"] if e["ph"] == "X"] == []
+
+
+def test_error_al_escribir(tmp_path):
+    bloqueo = tmp_path / "no-es-directorio"
+    bloqueo.write_text("")
+    traza = TraceRecorder(str(bloqueo), reloj=Reloj())
+    traza.iniciar("lote-1")
+    with traza.tramo("captura"):
+        pass
+    assert traza.guardar() is None
+    assert traza.archivos == 0
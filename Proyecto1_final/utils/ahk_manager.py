@@ -1,81 +1,178 @@
 import subprocess
+import sys
+import threading
 import time
-import os
 import logging
 
 logger = logging.getLogger(__name__)
 
-class AHKManager:
-    def __init__(self):
-        self.ahk_process = None
-        self.script_path = "ahk_script.ahk"
-        
-    def crear_script_ahk(self):
-        """Crea automáticamente el script de AutoHotkey"""
-        ahk_script = """
-#Persistent
+# Protocolo Python <-> AutoHotkey por stdin/stdout del proceso hijo, una línea
+# por mensaje con campos separados por tabuladores:
+#
+#   AHK -> Python   READY                              (script listo)
+#   Python -> AHK   <seq>  ESCRIBIR_ARCHIVO  <x>  <y>  <nombre_archivo>
+#   Python -> AHK   <seq>  PING
+#   AHK -> Python   <seq>  ACK                         (comando recibido)
+#   AHK -> Python   <seq>  DONE  <OK|ERROR>  <ms_ejecucion>
+#
+# seq es un entero creciente; Python solo espera hasta recibir el DONE de su
+# seq, sin ficheros intermedios ni sondeo.
+AHK_SCRIPT = """
+#NoEnv
 #SingleInstance force
+#NoTrayIcon
 
 ; Script de AutoHotkey para manejar acciones de UI
+; Canal de comandos con Python por stdin/stdout (ver utils/ahk_manager.py)
+stdin := FileOpen("*", "r", "UTF-8")
+stdout := FileOpen("*", "w", "UTF-8-RAW")
+
+Responder(texto) {
+    global stdout
+    stdout.WriteLine(texto)
+    stdout.Read(0)  ; Vaciar el buffer de salida
+}
+
+Responder("READY")
+
 Loop {
-    ; Esperar comandos de Python
-    FileRead, comando, ahk_command.txt
-    if (ErrorLevel = 0) {
-        FileDelete, ahk_command.txt
-        
-        ; Parsear comando: x,y,filename
-        Array := StrSplit(comando, ",")
-        x_campo := Array[1]
-        y_campo := Array[2]
-        nombre_archivo := Array[3]
-        
+    linea := stdin.ReadLine()
+    linea := RTrim(linea, "`r`n")
+    if (linea = "") {
+        if (stdin.AtEOF)
+            ExitApp
+        Sleep, 10
+        continue
+    }
+
+    ; Parsear comando: seq, accion y argumentos
+    campos := StrSplit(linea, A_Tab)
+    seq := campos[1]
+    accion := campos[2]
+    recibido := A_TickCount
+    Responder(seq . A_Tab . "ACK")
+
+    estado := "OK"
+    if (accion = "ESCRIBIR_ARCHIVO") {
+        x_campo := campos[3]
+        y_campo := campos[4]
+        nombre_archivo := campos[5]
+
         ; Ejecutar acciones
         Click, %x_campo% %y_campo%
         Sleep, 300
-        
+
         ; Limpiar campo
         Send, ^a
         Sleep, 100
         Send, {Delete}
         Sleep, 100
-        
+
         ; Escribir nombre de archivo (método confiable)
         SendInput, %nombre_archivo%
         Sleep, 400
-        
+
         ; Presionar Enter
         Send, {Enter}
         Sleep, 600
-        
-        ; Confirmación para Python
-        FileAppend, done, ahk_done.txt
-        FileDelete, ahk_done.txt
+    } else if (accion = "QUIT") {
+        Responder(seq . A_Tab . "DONE" . A_Tab . "OK" . A_Tab . (A_TickCount - recibido))
+        ExitApp
+    } else if (accion != "PING") {
+        estado := "ERROR"
     }
-    Sleep, 500  ; Revisar cada medio segundo
+
+    ; Confirmación para Python
+    Responder(seq . A_Tab . "DONE" . A_Tab . estado . A_Tab . (A_TickCount - recibido))
 }
 """
+
+class AHKManager:
+    SONDEO = 0.1  # Segundos entre comprobaciones del token mientras se espera el DONE
+
+    def __init__(self, backend="autohotkey", argumentos_stub=None, token=None):
+        self.ahk_process = None
+        self.script_path = "ahk_script.ahk"
+        self.ahk_exe = "AutoHotkey_1.1.37.02/AutoHotkeyU64.exe"
+        self.backend = backend  # "autohotkey" o "stub" (servidor Python equivalente)
+        self.argumentos_stub = list(argumentos_stub or [])  # p. ej. ["--ejecutar"]
+        self.token = token  # CancellationToken opcional: pausa y parada no esperan al DONE
+
+        self.seq = 0
+        self.respuestas = {}
+        self.en_vuelo = set()  # seq de los comandos que aún esperan respuesta
+        self.listo = False
+        self.condition = threading.Condition()
+        self.reader_thread = None
+        self.ultima_respuesta = None
+
+    def crear_script_ahk(self):
+        """Crea automáticamente el script de AutoHotkey"""
         try:
             with open(self.script_path, "w", encoding="utf-8") as f:
-                f.write(ahk_script)
+                f.write(AHK_SCRIPT)
             logger.info("Script de AutoHotkey creado automáticamente")
             return True
         except Exception as e:
             logger.error(f"Error creando script AHK: {e}")
             return False
-            
-    def start_ahk(self):
-        """Inicia AutoHotkey de manera más robusta"""
+
+    def script_actualizado(self):
+        """Indica si el script en disco corresponde al protocolo actual"""
+        try:
+            with open(self.script_path, "r", encoding="utf-8") as f:
+                return f.read() == AHK_SCRIPT
+        except OSError:
+            return False
+
+    def comando_proceso(self):
+        if self.backend == "stub":
+            return [sys.executable, "-m", "utils.ahk_stub"] + self.argumentos_stub
+        return [self.ahk_exe, self.script_path]
+
+    def _leer_respuestas(self, proceso):
+        """Hilo lector: registra cada línea de AHK por seq y tipo de mensaje"""
+        for linea in proceso.stdout:
+            campos = linea.lstrip("\ufeff").rstrip("\r\n").split("\t")
+            with self.condition:
+                if campos[0] == "READY":
+                    self.listo = True
+                elif len(campos) >= 2 and campos[0].isdigit():
+                    # Una respuesta tardía de un comando que ya agotó su timeout se descarta
+                    if int(campos[0]) in self.en_vuelo:
+                        self.respuestas.setdefault(int(campos[0]), {})[campos[1]] = (time.perf_counter(), campos[2:])
+                else:
+                    logger.warning(f"Línea inesperada de AHK: {linea.strip()}")
+                self.condition.notify_all()
+        with self.condition:
+            self.condition.notify_all()
+
+    def start_ahk(self, timeout=5):
+        """Inicia AutoHotkey y espera a que el canal esté listo"""
         if self.ahk_process and self.ahk_process.poll() is None:
             return True  # Ya está en ejecución
-            
+
         try:
-            if not os.path.exists(self.script_path):
+            if self.backend != "stub" and not self.script_actualizado():
                 if not self.crear_script_ahk():
                     return False
-                    
-            self.ahk_process = subprocess.Popen(['AutoHotkey_1.1.37.02/AutoHotkeyU64.exe', self.script_path])
-            time.sleep(2)
-            is_running = self.ahk_process.poll() is None
+
+            self.listo = False
+            self.respuestas = {}
+            self.en_vuelo = set()
+            self.ahk_process = subprocess.Popen(
+                self.comando_proceso(),
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                encoding="utf-8",
+                bufsize=1
+            )
+            self.reader_thread = threading.Thread(target=self._leer_respuestas, args=(self.ahk_process,), daemon=True)
+            self.reader_thread.start()
+
+            with self.condition:
+                self.condition.wait_for(lambda: self.listo or self.ahk_process.poll() is not None, timeout)
+            is_running = self.listo and self.ahk_process.poll() is None
             if is_running:
                 logger.info("AutoHotkey iniciado correctamente")
             else:
@@ -84,7 +181,7 @@ Loop {
         except Exception as e:
             logger.error(f"Error iniciando AutoHotkey: {e}")
             return False
-            
+
     def stop_ahk(self):
         """Detiene AutoHotkey correctamente"""
         if self.ahk_process:
@@ -97,18 +194,91 @@ Loop {
                 logger.warning("AutoHotkey fue forzado a detenerse")
             except Exception as e:
                 logger.error(f"Error deteniendo AutoHotkey: {e}")
-                
+
+    def enviar_comando(self, accion, *argumentos, timeout=15):
+        """
+        Envía un comando a AHK y espera su confirmación
+
+        Args:
+            accion (str): ESCRIBIR_ARCHIVO, PING o QUIT
+            argumentos: Campos del comando (sin tabuladores ni saltos de línea)
+            timeout (float): Segundos máximos de espera del DONE (la pausa no los consume)
+
+        Returns:
+            dict: seq, estado, ack_ms, total_ms y ahk_ms; None si no hubo respuesta
+                  o si el proceso se detuvo mientras tanto
+        """
+        self.ultima_respuesta = None
+        if not self.ahk_process or self.ahk_process.poll() is not None:
+            logger.error("AutoHotkey no está en ejecución")
+            return None
+
+        with self.condition:
+            self.seq += 1
+            seq = self.seq
+            self.en_vuelo.add(seq)
+        campos = [str(seq), accion] + [str(a).replace("\t", " ").replace("\n", " ") for a in argumentos]
+
+        try:
+            enviado = time.perf_counter()
+            self.ahk_process.stdin.write("\t".join(campos) + "\n")
+            self.ahk_process.stdin.flush()
+
+            restante = timeout
+            detenido = False
+            while restante > 0:
+                inicio = time.monotonic()
+                with self.condition:
+                    if self.condition.wait_for(
+                        lambda: "DONE" in self.respuestas.get(seq, {}) or self.ahk_process.poll() is not None,
+                        min(self.SONDEO, restante)
+                    ):
+                        break
+                restante -= time.monotonic() - inicio
+                # En pausa el hilo de trabajo se detiene aquí; el DONE se recoge al reanudar
+                if self.token is not None and not self.token.punto_control():
+                    detenido = True
+                    break
+        finally:
+            with self.condition:
+                mensajes = self.respuestas.pop(seq, {})
+                self.en_vuelo.discard(seq)
+
+        if "DONE" not in mensajes and detenido:
+            logger.info(f"Proceso detenido sin esperar a que AHK complete el comando {seq} ({accion})")
+            return None
+        if "DONE" not in mensajes:
+            logger.error(f"AHK no confirmó el comando {seq} ({accion}) en {timeout} s")
+            return None
+
+        t_done, datos = mensajes["DONE"]
+        t_ack = mensajes["ACK"][0] if "ACK" in mensajes else t_done
+        respuesta = {
+            "seq": seq,
+            "estado": datos[0] if datos else "ERROR",
+            "ack_ms": (t_ack - enviado) * 1000,
+            "total_ms": (t_done - enviado) * 1000,
+            "ahk_ms": float(datos[1]) if len(datos) > 1 else None
+        }
+        self.ultima_respuesta = respuesta
+        return respuesta
+
     def ejecutar_acciones_ahk(self, x_campo, y_campo, nombre_archivo):
-        """Envía comandos a AutoHotkey mediante archivo temporal"""
-        # Crear archivo de comandos para AHK
-        comando = f"{x_campo},{y_campo},{nombre_archivo}"
-        
+        """
+        Envía el comando de escribir el nombre de archivo y espera a que AHK lo complete
+
+        Returns:
+            tuple: (ok, respuesta); respuesta es la de enviar_comando (None si AHK no respondió)
+        """
+        respuesta = None
         try:
-            with open("ahk_command.txt", "w", encoding="utf-8") as f:
-                f.write(comando)
-            
-            logger.info(f"Comando enviado a AHK: {comando}")
-            return True
+            respuesta = self.enviar_comando("ESCRIBIR_ARCHIVO", x_campo, y_campo, nombre_archivo)
+            if respuesta is None or respuesta["estado"] != "OK":
+                return False, respuesta
+
+            logger.info(f"Comando AHK {respuesta['seq']} completado: ack {respuesta['ack_ms']:.0f} ms, "
+                        f"total {respuesta['total_ms']:.0f} ms")
+            return True, respuesta
         except Exception as e:
             logger.error(f"Error enviando comando a AHK: {e}")
-            return False
\ No newline at end of file
+            return False, respuesta
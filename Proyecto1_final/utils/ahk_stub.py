@@ -0,0 +1,65 @@
+"""
+Servidor sustituto de ahk_script.ahk escrito en Python
+
+Habla el mismo protocolo por stdin/stdout que el script de AutoHotkey
+(ver utils/ahk_manager.py), de modo que el canal se puede probar en Linux
+o sin AutoHotkey instalado:
+
+    python -m utils.ahk_stub [--latencia-ms 1500] [--ejecutar]
+
+Con --ejecutar realiza las acciones con pyautogui; si no, solo simula su
+duración.
+"""
+import argparse
+import sys
+import time
+
+def ejecutar_escribir_archivo(x_campo, y_campo, nombre_archivo):
+    import pyautogui
+    pyautogui.click(int(float(x_campo)), int(float(y_campo)))
+    time.sleep(0.3)
+    pyautogui.hotkey('ctrl', 'a')
+    time.sleep(0.1)
+    pyautogui.press('delete')
+    time.sleep(0.1)
+    pyautogui.write(nombre_archivo)
+    time.sleep(0.4)
+    pyautogui.press('enter')
+    time.sleep(0.6)
+
+def responder(texto):
+    sys.stdout.write(texto + "\n")
+    sys.stdout.flush()
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor Python equivalente al script de AutoHotkey")
+    parser.add_argument("--latencia-ms", type=float, default=0, help="Duración simulada de ESCRIBIR_ARCHIVO")
+    parser.add_argument("--ejecutar", action="store_true", help="Realizar las acciones con pyautogui")
+    args = parser.parse_args()
+
+    responder("READY")
+    for linea in sys.stdin:
+        linea = linea.rstrip("\r\n")
+        if not linea:
+            continue
+        campos = linea.split("\t")
+        seq, accion = campos[0], campos[1] if len(campos) > 1 else ""
+        recibido = time.perf_counter()
+        responder(f"{seq}\tACK")
+
+        estado = "OK"
+        if accion == "ESCRIBIR_ARCHIVO" and len(campos) >= 5:
+            if args.ejecutar:
+                ejecutar_escribir_archivo(*campos[2:5])
+            elif args.latencia_ms:
+                time.sleep(args.latencia_ms / 1000)
+        elif accion == "QUIT":
+            responder(f"{seq}\tDONE\tOK\t{(time.perf_counter() - recibido) * 1000:.0f}")
+            break
+        elif accion != "PING":
+            estado = "ERROR"
+
+        responder(f"{seq}\tDONE\t{estado}\t{(time.perf_counter() - recibido) * 1000:.0f}")
+
+if __name__ == "__main__":
+    main()
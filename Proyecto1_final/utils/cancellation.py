@@ -0,0 +1,140 @@
+import threading
+import time
+import logging
+from utils.clock import RealClock
+
+logger = logging.getLogger(__name__)
+
+class CancellationToken:
+    """
+    Estado de ejecución/pausa compartido por todas las esperas del proceso
+
+    Reemplaza los flags is_running/is_paused con su Condition: detener() y
+    pausar() despiertan al instante cualquier esperar() en curso, de modo que el
+    hilo de trabajo se detiene en cuanto termina la captura o el clic actual.
+    También mide la latencia entre la petición de pausa/parada y el momento en
+    que el hilo de trabajo efectivamente se detiene.
+
+    Las esperas usan el reloj indicado: con un VirtualClock no duermen, sino
+    que adelantan el reloj (ejecuciones simuladas).
+    """
+    def __init__(self, reloj=None):
+        self.reloj = reloj or RealClock()
+        self.condition = threading.Condition()
+        self.activo = False
+        self.pausado = False
+        self.pausa_solicitada = None    # Instante de la petición aún no atendida
+        self.parada_solicitada = None
+        self.latencias_pausa = []
+        self.latencias_parada = []
+        self.traza = None  # TraceRecorder opcional (tramos de espera)
+
+    def iniciar(self):
+        with self.condition:
+            self.activo = True
+            self.pausado = False
+            self.pausa_solicitada = None
+            self.parada_solicitada = None
+            self.condition.notify_all()
+
+    def detener(self):
+        with self.condition:
+            if self.activo:
+                self.parada_solicitada = time.perf_counter()
+            self.activo = False
+            self.pausado = False
+            self.condition.notify_all()
+
+    def pausar(self):
+        with self.condition:
+            if self.activo and not self.pausado:
+                self.pausa_solicitada = time.perf_counter()
+            self.pausado = True
+            self.condition.notify_all()
+
+    def reanudar(self):
+        with self.condition:
+            self.pausado = False
+            self.pausa_solicitada = None
+            self.condition.notify_all()
+
+    def _registrar_detencion(self):
+        """El hilo de trabajo llegó a un punto de espera: anota cuánto tardó en reaccionar"""
+        if self.pausado and self.pausa_solicitada is not None:
+            latencia = (time.perf_counter() - self.pausa_solicitada) * 1000
+            self.pausa_solicitada = None
+            self.latencias_pausa.append(latencia)
+            logger.info(f"Pausa efectiva en {latencia:.0f} ms")
+        if not self.activo and self.parada_solicitada is not None:
+            latencia = (time.perf_counter() - self.parada_solicitada) * 1000
+            self.parada_solicitada = None
+            self.latencias_parada.append(latencia)
+            logger.info(f"Detención efectiva en {latencia:.0f} ms")
+
+    def punto_control(self):
+        """
+        Bloquea mientras el proceso esté en pausa
+
+        Returns:
+            bool: True si se puede continuar, False si el proceso se detuvo
+        """
+        with self.condition:
+            self._registrar_detencion()
+            while self.pausado and self.activo:
+                self.condition.wait()
+            self._registrar_detencion()
+            return self.activo
+
+    def esperar(self, segundos):
+        """
+        Duerme hasta 'segundos', volviendo antes si se pide pausa o parada
+
+        Returns:
+            bool: True si el proceso sigue activo (quizá en pausa), False si se detuvo
+        """
+        inicio = self.reloj.ahora()
+        with self.condition:
+            if segundos > 0 and self.reloj.virtual:
+                if self.activo and not self.pausado:
+                    self.reloj.avanzar(segundos)
+            elif segundos > 0:
+                self.condition.wait_for(lambda: self.pausado or not self.activo, segundos)
+            if self.pausado or not self.activo:
+                self._registrar_detencion()
+            activo = self.activo
+        if segundos > 0 and self.traza is not None:
+            self.traza.agregar("esperar", "espera", inicio, self.reloj.ahora(), {"segundos": segundos})
+        return activo
+
+    def dormir(self, segundos):
+        """
+        Duerme 'segundos' de tiempo activo: la pausa detiene la cuenta
+
+        Returns:
+            bool: True si se completó la espera, False si el proceso se detuvo
+        """
+        comienzo = self.reloj.ahora()
+        restante = segundos
+        completada = False
+        while True:
+            if not self.punto_control():
+                break
+            if restante <= 0:
+                completada = True
+                break
+            inicio = self.reloj.ahora()
+            if not self.esperar(restante):
+                break
+            restante -= self.reloj.ahora() - inicio
+        if self.traza is not None:
+            self.traza.agregar("dormir", "espera", comienzo, self.reloj.ahora(), {"segundos": segundos})
+        return completada
+
+    def estadisticas(self):
+        def resumen(latencias):
+            return {
+                "n": len(latencias),
+                "media_ms": sum(latencias) / len(latencias) if latencias else 0.0,
+                "max_ms": max(latencias) if latencias else 0.0
+            }
+        return {"pausa": resumen(self.latencias_pausa), "parada": resumen(self.latencias_parada)}
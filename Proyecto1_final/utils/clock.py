@@ -0,0 +1,67 @@
+import threading
+import time
+
+class RealClock:
+    """Reloj de tiempo real: ahora() es time.monotonic() y las esperas duran lo indicado"""
+    nombre = "real"
+    virtual = False
+
+    def ahora(self):
+        return time.monotonic()
+
+    def avanzar(self, segundos):
+        """Solo tiene efecto en el reloj virtual; el real espera de verdad (CancellationToken)"""
+
+    def estadisticas(self):
+        return {"reloj": self.nombre}
+
+class VirtualClock:
+    """
+    Reloj simulado para ejecuciones contra pantallas grabadas o simuladas
+
+    Las esperas no duermen: avanzar() suma el tiempo al reloj y vuelve al
+    instante. El tiempo de cálculo sí transcurre en tiempo real, de modo que
+    ahora() mide lo que habría durado la ejecución real (cálculo + esperas)
+    mientras que la ejecución simulada solo tarda el cálculo.
+    """
+    nombre = "virtual"
+    virtual = True
+
+    def __init__(self):
+        self.inicio_real = time.monotonic()
+        self.adelanto = 0.0  # Segundos de espera saltados
+        self.esperas = 0
+        self.lock = threading.Lock()
+
+    def ahora(self):
+        with self.lock:
+            return time.monotonic() + self.adelanto
+
+    def avanzar(self, segundos):
+        if segundos <= 0:
+            return
+        with self.lock:
+            self.adelanto += segundos
+            self.esperas += 1
+
+    def estadisticas(self):
+        with self.lock:
+            real = time.monotonic() - self.inicio_real
+            return {
+                "reloj": self.nombre,
+                "tiempo_real_s": real,
+                "tiempo_simulado_s": real + self.adelanto,
+                "espera_saltada_s": self.adelanto,
+                "esperas": self.esperas
+            }
+
+RELOJES = {
+    RealClock.nombre: RealClock,
+    VirtualClock.nombre: VirtualClock
+}
+
+def crear_reloj(tipo="real"):
+    clase = RELOJES.get(tipo)
+    if clase is None:
+        raise ValueError(f"Reloj desconocido: '{tipo}'")
+    return clase()
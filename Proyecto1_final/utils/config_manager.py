@@ -1,5 +1,10 @@
 import json
 import os
+import stat
+import time
+import atexit
+import tempfile
+import threading
 import logging
 
 logger = logging.getLogger(__name__)
@@ -16,10 +21,81 @@ class ConfigManager:
             "max_intentos": 30,
             "username": "admin",
             "password": "123",
-            "formato_texto": "LT"  # Nuevo campo para el formato de texto
+            "formato_texto": "LT",  # Nuevo campo para el formato de texto
+            "capture_backend": "pyautogui",  # pyautogui, mss o archivo
+            "capture_fps": 0,  # Capturas por segundo de un hilo de captura en segundo plano (0 = capturar al sondear)
+            "capture_wait_max": 1.0,  # Segundos sin frame nuevo del hilo de captura tras los que se avisa en el log
+            "ahk_backend": "autohotkey",  # autohotkey o stub (servidor Python de utils/ahk_stub.py)
+            "ahk_stub_args": [],  # Argumentos del stub, p. ej. ["--ejecutar"] para escribir con pyautogui
+            "roi_padding": 40,  # Margen en píxeles alrededor de la última posición encontrada
+            "pyramid_factors": {},  # Plantilla -> factor de reducción (2 o 4) para la búsqueda completa
+            "grayscale_templates": [],  # Plantillas que se buscan en escala de grises
+            "color_verify_templates": ["img/b4.png"],  # Plantillas grises que se confirman en color
+            "color_tolerance": 30,  # Diferencia máxima de color medio en la verificación
+            "match_threads": 4,  # Hilos para localizar varias plantillas sobre un mismo frame
+            "analysis_max_age": 3,  # Segundos durante los que un frame analizado se reutiliza
+            "wait_poll_hz": 5,  # Capturas por segundo mientras se espera un botón
+            "wait_stable_frames": 2,  # Frames consecutivos estables antes de hacer clic
+            "wait_stable_tolerance": 2.0,  # Diferencia media de píxeles tolerada entre frames
+            "wait_timeout": 10,  # Segundos por intento de espera
+            "ahk_timeout": 10,  # Segundos máximos para que AHK cierre la ventana de archivo
+            "transition_timeout": 3,  # Segundos para confirmar la transición tras un clic
+            "transition_change_threshold": 8.0,  # Diferencia media que cuenta como cambio de la zona pulsada
+            "click_retries": 2,  # Reintentos de clic si la transición no ocurre
+            "file_window_attempts": 3,  # Intentos (de wait_timeout segundos) de encontrar la ventana de archivo tras pulsar b4
+            "transition_failure_continue": False,  # Seguir con la secuencia aunque la transición no ocurra tras los reintentos
+            "config_debounce": 2,  # Segundos para agrupar escrituras de config.json (0 = inmediata)
+            "journal_file": "progreso.jsonl",  # Diario de pasos completados para reanudar
+            "journal_fsync_every": 20,  # Registros del diario entre fsync a disco
+            "journal_fsync_interval": 5,  # Segundos máximos sin fsync del diario
+            "metrics_file": "metricas.jsonl",  # Tiempos por paso y por lote (vacío = no escribir)
+            "metrics_prometheus_file": "metricas.prom",  # Textfile de Prometheus (vacío = no exportar)
+            "change_detection": True,  # Reutilizar las coincidencias si la pantalla no cambió
+            "change_tile_size": 32,  # Lado (px) de los tiles del detector de cambios
+            "change_threshold": 8,  # Diferencia por píxel que se considera ruido
+            "change_masks": [],  # Zonas [x, y, ancho, alto] del frame que no cuentan como cambio (relojes...)
+            "incremental_matching": True,  # Recorrelacionar solo los rectángulos cambiados (mapa por plantilla)
+            "incremental_max_area": 0.5,  # Fracción del frame cambiada a partir de la cual se rehace el mapa entero
+            "trace_dir": "",  # Directorio de las trazas Chrome/Perfetto por lote (vacío = no trazar)
+            "resume_from_journal": True,  # Reanudar desde el último paso confirmado
+            "ui_refresh_ms": 100,  # Intervalo de refresco del área de estado
+            "ui_max_lines": 1000,  # Líneas máximas conservadas en el área de estado
+            "event_policies": {  # Política de entrega por tipo de evento (ver utils/event_bus.py)
+                "image_not_found": {"modo": "coalescer", "clave": "image", "intervalo": 0.5}
+            },
+            "record_dir": "",  # Directorio donde grabar las sesiones (vacío = no grabar)
+            "replay_dir": "",  # Sesión grabada que reproduce el backend de captura replay
+            "replay_mode": "tiempo",  # tiempo (según los instantes grabados) o secuencial
+            "replay_speed": 1.0,  # Velocidad de reproducción en modo tiempo
+            "simulate_input": False,  # No enviar clics ni teclas reales (reproducción)
+            "clock": "real",  # real o virtual (las esperas adelantan el reloj sin dormir)
+            "timing_profiles": {  # Perfiles de tiempos para la línea de comandos (cli.py --perfil)
+                "normal": {},
+                "rapido": {"delay_time": 0, "wait_poll_hz": 10, "wait_stable_frames": 1, "transition_timeout": 2},
+                "seguro": {"delay_time": 5, "wait_poll_hz": 4, "wait_stable_frames": 3, "wait_timeout": 20,
+                           "transition_timeout": 5}
+            }
         }
         self.config = self.default_config.copy()
         
+        # Valores que se aplican solo a esta ejecución y nunca se guardan
+        self.temporales = {}
+        
+        # Escritura diferida: set() marca la configuración como pendiente y un
+        # temporizador la guarda pasado el intervalo, agrupando los cambios
+        self.debounce = 0
+        self.dirty = False
+        self.timer = None
+        self._atexit_registrado = False
+        self.lock = threading.RLock()
+        # Serializa instantánea + escritura + rename: un guardado más antiguo nunca
+        # reemplaza a uno más reciente (temporizador frente a save() explícito)
+        self.lock_escritura = threading.Lock()
+        self.flushes = 0
+        self.sets_agrupados = 0
+        self.tiempo_flush = 0.0
+        self.ultimo_flush_ms = 0.0
+        
     def load(self):
         try:
             if os.path.exists(self.config_file):
@@ -31,16 +107,99 @@ class ConfigManager:
             logger.error(f"Error cargando configuración: {e}")
             
     def save(self):
-        try:
-            with open(self.config_file, 'w', encoding='utf-8') as f:
-                json.dump(self.config, f, indent=4)
-            logger.info("Configuración guardada correctamente")
-        except Exception as e:
-            logger.error(f"Error guardando configuración: {e}")
+        """Guarda la configuración de forma atómica (archivo temporal + rename)"""
+        inicio = time.perf_counter()
+        with self.lock_escritura:
+            with self.lock:
+                if self.timer is not None:
+                    self.timer.cancel()
+                    self.timer = None
+                datos = json.dumps(self.config, indent=4)
+                self.dirty = False
+            
+            ruta_tmp = None
+            try:
+                directorio = os.path.dirname(os.path.abspath(self.config_file))
+                fd, ruta_tmp = tempfile.mkstemp(prefix=".config-", suffix=".tmp", dir=directorio)
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    f.write(datos)
+                    f.flush()
+                    os.fsync(f.fileno())
+                # Conservar los permisos del config.json existente (mkstemp crea con 0600)
+                try:
+                    modo = stat.S_IMODE(os.stat(self.config_file).st_mode)
+                except FileNotFoundError:
+                    modo = 0o644
+                os.chmod(ruta_tmp, modo)
+                os.replace(ruta_tmp, self.config_file)
+                
+                self.ultimo_flush_ms = (time.perf_counter() - inicio) * 1000
+                self.tiempo_flush += self.ultimo_flush_ms
+                self.flushes += 1
+                logger.info("Configuración guardada correctamente")
+            except Exception as e:
+                logger.error(f"Error guardando configuración: {e}")
+                with self.lock:
+                    self.dirty = True
+                if ruta_tmp and os.path.exists(ruta_tmp):
+                    os.remove(ruta_tmp)
+    
+    def activar_diferido(self, intervalo):
+        """
+        Agrupa las escrituras de set() y las guarda cada 'intervalo' segundos
+        
+        Lo pendiente también se guarda con flush() (al detener el proceso) y al
+        salir del programa.
+        """
+        self.debounce = intervalo
+        if intervalo > 0 and not self._atexit_registrado:
+            atexit.register(self.flush)
+            self._atexit_registrado = True
+    
+    def flush(self):
+        """Guarda ya los cambios pendientes, si los hay"""
+        if self.dirty:
+            self.save()
+    
+    def _flush_programado(self):
+        with self.lock:
+            self.timer = None
+        self.flush()
+            
+    def aplicar_temporal(self, valores):
+        """Sobrescribe valores solo en memoria (p. ej. un perfil de la línea de comandos)"""
+        self.temporales.update(valores)
             
     def get(self, key, default=None):
+        if key in self.temporales:
+            return self.temporales[key]
         return self.config.get(key, default)
         
     def set(self, key, value):
-        self.config[key] = value
-        self.save()
\ No newline at end of file
+        if key in self.temporales:
+            self.temporales[key] = value
+            return
+        with self.lock:
+            self.config[key] = value
+            if self.debounce <= 0:
+                pendiente_inmediato = True
+            else:
+                pendiente_inmediato = False
+                if self.dirty:
+                    self.sets_agrupados += 1
+                self.dirty = True
+                if self.timer is None:
+                    self.timer = threading.Timer(self.debounce, self._flush_programado)
+                    self.timer.daemon = True
+                    self.timer.start()
+        if pendiente_inmediato:
+            self.save()
+    
+    def estadisticas(self):
+        return {
+            "flushes": self.flushes,
+            "sets_agrupados": self.sets_agrupados,
+            "pendiente": self.dirty,
+            "ultimo_flush_ms": self.ultimo_flush_ms,
+            "tiempo_medio_flush_ms": self.tiempo_flush / self.flushes if self.flushes else 0.0
+        }
\ No newline at end of file
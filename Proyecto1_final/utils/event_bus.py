@@ -0,0 +1,171 @@
+import threading
+import time
+import logging
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+# Política por defecto: cada evento se entrega, en orden
+POLITICA_ENTREGAR = {"modo": "entregar"}
+
+class EventBus:
+    """
+    Bus de eventos asíncrono para los observadores del modelo
+
+    publicar() solo encola el evento y vuelve; un hilo propio lo entrega a los
+    suscriptores (observer.update(evento, datos)), de modo que un observador
+    lento no frena el bucle de captura.
+
+    Cada tipo de evento tiene una política:
+        {"modo": "entregar"}                     Se entregan todos, en orden
+        {"modo": "coalescer", "clave": "image",  Mientras un evento espera en la cola,
+         "intervalo": 0.5}                       uno nuevo con la misma clave lo reemplaza
+                                                 (solo llega el último). Con intervalo,
+                                                 además no se entrega la misma clave más
+                                                 de una vez cada 'intervalo' segundos.
+    Los eventos coalescibles se descartan si la cola supera max_pendientes.
+    """
+    def __init__(self, politicas=None, max_pendientes=1000):
+        self.politicas = politicas or {}
+        self.max_pendientes = max_pendientes
+        self.suscriptores = []
+
+        self.cola = deque()
+        self.pendientes = {}   # (evento, clave) -> entrada en cola o diferida
+        self.diferidos = {}    # (evento, clave) -> instante a partir del cual entregar
+        self.ultima_entrega = {}
+        self.condition = threading.Condition()
+        self.hilo = None
+        self.activo = True
+        self.entregando = False
+        self.traza = None  # TraceRecorder opcional (tramos de entrega a los observadores)
+
+        self.publicados = 0
+        self.entregados = 0
+        self.coalescidos = 0
+        self.descartados = 0
+        self.errores = 0
+
+    def suscribir(self, observer):
+        self.suscriptores.append(observer)
+
+    def politica(self, evento):
+        return self.politicas.get(evento, POLITICA_ENTREGAR)
+
+    def _clave(self, evento, datos, politica):
+        campo = politica.get("clave")
+        if campo and isinstance(datos, dict):
+            return (evento, datos.get(campo))
+        return (evento, None)
+
+    def publicar(self, evento, datos=None):
+        """Encola un evento para sus suscriptores (no bloquea)"""
+        politica = self.politica(evento)
+        with self.condition:
+            if not self.activo:
+                return
+            self.publicados += 1
+
+            if politica.get("modo") == "coalescer":
+                clave = self._clave(evento, datos, politica)
+                entrada = self.pendientes.get(clave)
+                if entrada is not None:
+                    # Aún no entregado: se reemplazan los datos manteniendo su turno
+                    entrada[1] = datos
+                    self.coalescidos += 1
+                    return
+                if len(self.cola) + len(self.diferidos) >= self.max_pendientes:
+                    self.descartados += 1
+                    return
+                entrada = [evento, datos, clave]
+                self.pendientes[clave] = entrada
+            else:
+                entrada = [evento, datos, None]
+
+            self.cola.append(entrada)
+            self._asegurar_hilo()
+            self.condition.notify()
+
+    def _asegurar_hilo(self):
+        if self.hilo is None or not self.hilo.is_alive():
+            self.hilo = threading.Thread(target=self._despachar, name="event-bus", daemon=True)
+            self.hilo.start()
+
+    def _siguiente(self):
+        """Siguiente entrada lista para entregar, o None y los segundos hasta la próxima diferida"""
+        ahora = time.monotonic()
+        for clave, instante in list(self.diferidos.items()):
+            if instante <= ahora:
+                del self.diferidos[clave]
+                self.cola.append(self.pendientes[clave])
+
+        while self.cola:
+            entrada = self.cola.popleft()
+            clave = entrada[2]
+            if clave is not None:
+                intervalo = self.politica(entrada[0]).get("intervalo", 0)
+                ultima = self.ultima_entrega.get(clave)
+                if intervalo and ultima is not None and ahora - ultima < intervalo:
+                    # Demasiado pronto para esta clave: se aplaza (y puede seguir coalesciendo)
+                    self.diferidos[clave] = ultima + intervalo
+                    continue
+                del self.pendientes[clave]
+                self.ultima_entrega[clave] = ahora
+            return entrada, None
+
+        espera = min(self.diferidos.values()) - ahora if self.diferidos else None
+        return None, espera
+
+    def _despachar(self):
+        while True:
+            with self.condition:
+                while True:
+                    entrada, espera = self._siguiente()
+                    if entrada is not None or not self.activo:
+                        break
+                    self.condition.wait(espera)
+                if entrada is None:
+                    self.condition.notify_all()
+                    return
+                self.entregando = True
+
+            evento, datos, _ = entrada
+            inicio = self.traza.reloj() if self.traza is not None else None
+            for observer in list(self.suscriptores):
+                try:
+                    observer.update(evento, datos)
+                except Exception as e:
+                    self.errores += 1
+                    logger.error(f"Error entregando el evento '{evento}': {e}")
+            if inicio is not None:
+                self.traza.agregar(f"evento {evento}", "ui", inicio, self.traza.reloj())
+
+            with self.condition:
+                self.entregando = False
+                self.entregados += 1
+                self.condition.notify_all()
+
+    def esperar_vacia(self, timeout=None):
+        """Espera a que se hayan entregado los eventos encolados (no los diferidos)"""
+        with self.condition:
+            return self.condition.wait_for(lambda: not self.cola and not self.entregando, timeout)
+
+    def cerrar(self, timeout=2):
+        """Entrega lo pendiente y detiene el hilo de despacho"""
+        self.esperar_vacia(timeout)
+        with self.condition:
+            self.activo = False
+            self.condition.notify_all()
+        if self.hilo is not None:
+            self.hilo.join(timeout)
+
+    def estadisticas(self):
+        with self.condition:
+            return {
+                "publicados": self.publicados,
+                "entregados": self.entregados,
+                "coalescidos": self.coalescidos,
+                "descartados": self.descartados,
+                "errores": self.errores,
+                "pendientes": len(self.cola) + len(self.diferidos)
+            }
@@ -0,0 +1,129 @@
+import time
+import logging
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+class FrameChangeDetector:
+    """
+    Detecta qué zonas de la pantalla cambiaron respecto al último frame analizado
+
+    Compara el frame con una copia del frame de referencia (absdiff, máximo
+    por canal) y reduce la diferencia a una rejilla de tiles: un tile cambió
+    si algún píxel difiere más de 'umbral'. Las máscaras de exclusión (relojes,
+    animaciones de carga...) no cuentan como cambio.
+
+    Args:
+        tamano_tile (int): Lado de cada tile en píxeles
+        umbral (int): Diferencia máxima por píxel que se considera ruido (compresión)
+        mascaras (list): Zonas [x, y, ancho, alto] del frame que se ignoran
+    """
+    def __init__(self, tamano_tile=32, umbral=8, mascaras=None):
+        self.tamano_tile = max(1, int(tamano_tile))
+        self.umbral = umbral
+        self.mascaras = [tuple(int(v) for v in m) for m in (mascaras or [])]
+        self.referencia = None
+        self.version = 0  # Aumenta con cada referencia nueva (identifica el frame de los mapas del matcher)
+        self._mascara = None
+        self._indices = None
+
+        self.comparaciones = 0
+        self.sin_cambios = 0
+        self.plantillas_omitidas = 0
+        self.tiempo_total = 0.0
+
+    def _preparar(self, forma):
+        """Índices de la rejilla y máscara para frames de esta forma"""
+        alto, ancho = forma[:2]
+        self._indices = (np.arange(0, alto, self.tamano_tile), np.arange(0, ancho, self.tamano_tile))
+        self._mascara = None
+        if self.mascaras:
+            self._mascara = np.full((alto, ancho), 255, np.uint8)
+            for x, y, ancho_m, alto_m in self.mascaras:
+                self._mascara[max(0, y):max(0, y + alto_m), max(0, x):max(0, x + ancho_m)] = 0
+
+    def fijar_referencia(self, frame, tiles=None):
+        """
+        Actualiza la referencia con la que se compararán los siguientes frames
+
+        Con tiles (resultado de comparar) solo se copian los tiles cambiados: los
+        demás conservan el contenido con el que se calcularon los mapas del
+        matcher, así que los cambios lentos por debajo del umbral se acumulan
+        hasta que el tile cuenta como cambiado.
+        """
+        if self.referencia is None or self.referencia.shape != frame.shape:
+            self.referencia = np.empty_like(frame)
+            self._preparar(frame.shape)
+            tiles = None
+        if tiles is None:
+            np.copyto(self.referencia, frame)
+        else:
+            alto, ancho = frame.shape[:2]
+            cambiados = np.repeat(np.repeat(tiles, self.tamano_tile, axis=0), self.tamano_tile, axis=1)[:alto, :ancho]
+            if frame.ndim == 3:
+                cambiados = cambiados[:, :, None]
+            np.copyto(self.referencia, frame, where=cambiados)
+        self.version += 1
+
+    def olvidar(self):
+        self.referencia = None
+
+    def comparar(self, frame):
+        """
+        Compara el frame con la referencia
+
+        Returns:
+            numpy.ndarray: tiles cambiados (bool, filas x columnas), o None si no
+                           hay referencia comparable (todo se considera cambiado)
+        """
+        if self.referencia is None or self.referencia.shape != frame.shape:
+            return None
+
+        inicio = time.perf_counter()
+        diferencia = cv2.absdiff(frame, self.referencia)
+        if diferencia.ndim == 3:
+            canales = cv2.split(diferencia)
+            diferencia = canales[0]
+            for canal in canales[1:]:
+                diferencia = cv2.max(diferencia, canal)
+        if self._mascara is not None:
+            diferencia = cv2.bitwise_and(diferencia, self._mascara)
+
+        filas, columnas = self._indices
+        tiles = np.maximum.reduceat(np.maximum.reduceat(diferencia, filas, axis=0), columnas, axis=1) > self.umbral
+
+        self.tiempo_total += time.perf_counter() - inicio
+        self.comparaciones += 1
+        if not tiles.any():
+            self.sin_cambios += 1
+        return tiles
+
+    def rectangulos(self, tiles):
+        """
+        Cajas que envuelven cada grupo de tiles cambiados contiguos
+
+        Returns:
+            list: [(x0, y0, x1, y1)] en píxeles del frame (x1, y1 exclusivos)
+        """
+        if tiles is None or not tiles.any():
+            return []
+        alto, ancho = self.referencia.shape[:2]
+        n, _, stats, _ = cv2.connectedComponentsWithStats(tiles.astype(np.uint8), connectivity=8)
+        cajas = []
+        for columna, fila, columnas, filas, _ in stats[1:n]:
+            cajas.append((
+                int(columna) * self.tamano_tile,
+                int(fila) * self.tamano_tile,
+                min(ancho, int(columna + columnas) * self.tamano_tile),
+                min(alto, int(fila + filas) * self.tamano_tile)
+            ))
+        return cajas
+
+    def estadisticas(self):
+        return {
+            "comparaciones": self.comparaciones,
+            "sin_cambios": self.sin_cambios,
+            "plantillas_omitidas": self.plantillas_omitidas,
+            "tiempo_medio_ms": (self.tiempo_total / self.comparaciones * 1000) if self.comparaciones else 0.0
+        }
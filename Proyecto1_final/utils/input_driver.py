@@ -0,0 +1,57 @@
+import contextlib
+import logging
+
+logger = logging.getLogger(__name__)
+
+class InputDriver:
+    """
+    Punto único por el que el bot emite clics y teclas
+
+    pyautogui se importa solo al usarse por primera vez, de modo que el motor
+    puede cargarse sin pantalla. Con simular=True no se envía ninguna entrada
+    real (reproducción de sesiones grabadas); en ambos casos cada acción se
+    anota en el grabador de sesión, si lo hay.
+    """
+    def __init__(self, simular=False):
+        self.simular = simular
+        self.grabador = None
+        self.traza = None  # TraceRecorder opcional (tramos de clic y teclas)
+        self._pyautogui = None
+        self.acciones = 0
+
+    @property
+    def pyautogui(self):
+        if self._pyautogui is None:
+            import pyautogui
+            self._pyautogui = pyautogui
+        return self._pyautogui
+
+    def registrar(self, accion, **datos):
+        """Anota una acción en la sesión grabada (también las que no pasan por pyautogui, como AHK)"""
+        self.acciones += 1
+        if self.grabador is not None:
+            self.grabador.registrar_accion(accion, **datos)
+
+    def _tramo(self, nombre, **argumentos):
+        if self.traza is None:
+            return contextlib.nullcontext()
+        return self.traza.tramo(nombre, "entrada", **argumentos)
+
+    def click(self, x, y, clicks=1, **datos):
+        self.registrar("click", x=int(x), y=int(y), clicks=clicks, **datos)
+        with self._tramo("clic", x=int(x), y=int(y), clicks=clicks):
+            if not self.simular:
+                self.pyautogui.moveTo(x, y)
+                self.pyautogui.click(clicks=clicks)
+
+    def press(self, tecla):
+        self.registrar("tecla", teclas=[tecla])
+        with self._tramo("tecla", teclas=[tecla]):
+            if not self.simular:
+                self.pyautogui.press(tecla)
+
+    def hotkey(self, *teclas):
+        self.registrar("tecla", teclas=list(teclas))
+        with self._tramo("tecla", teclas=list(teclas)):
+            if not self.simular:
+                self.pyautogui.hotkey(*teclas)
@@ -0,0 +1,150 @@
+import json
+import os
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+class CheckpointJournal:
+    """
+    Diario de progreso append-only (JSONL) para reanudar tras un cierre inesperado
+
+    Registra el inicio de cada ejecución, cada paso de la secuencia completado,
+    cada lote completado y el final de la ejecución (completada o detenida por
+    el usuario; en ambos casos no hay nada que reanudar). Cada registro se escribe y
+    se vacía al sistema operativo al momento (sobrevive a la caída del proceso);
+    el fsync a disco se agrupa cada fsync_cada registros o fsync_intervalo
+    segundos para que el coste por paso sea despreciable.
+    """
+    def __init__(self, ruta="progreso.jsonl", fsync_cada=20, fsync_intervalo=5.0):
+        self.ruta = ruta
+        self.fsync_cada = fsync_cada
+        self.fsync_intervalo = fsync_intervalo
+        self.archivo = None
+        self.pendientes_fsync = 0
+        self.ultimo_fsync = time.monotonic()
+
+        self.registros = 0
+        self.fsyncs = 0
+        self.tiempo_escritura = 0.0
+
+    def _leer(self):
+        """Registros válidos del diario (una línea truncada al final se ignora)"""
+        registros = []
+        try:
+            with open(self.ruta, "r", encoding="utf-8") as f:
+                for linea in f:
+                    try:
+                        registros.append(json.loads(linea))
+                    except ValueError:
+                        logger.warning(f"Línea inválida en el diario '{self.ruta}', se ignora")
+        except OSError:
+            pass
+        return registros
+
+    def punto_reanudacion(self, lote_inicial, lote_final, formato=None):
+        """
+        Busca dónde continuar una ejecución interrumpida con el mismo rango de lotes
+
+        Args:
+            formato (str): Formato de texto de los nombres de archivo; con otro formato
+                no se reanuda (se mezclarían nombres de las dos ejecuciones)
+
+        Returns:
+            tuple: (lote, paso) desde el que continuar, o None si no hay nada que reanudar
+        """
+        registros = self._leer()
+        inicio = None
+        for i, registro in enumerate(registros):
+            if registro.get("tipo") == "inicio":
+                inicio = i
+        if inicio is None:
+            return None
+
+        cabecera = registros[inicio]
+        if cabecera.get("lote_inicial") != lote_inicial or cabecera.get("lote_final") != lote_final:
+            return None
+        if formato is not None and cabecera.get("formato") != formato:
+            return None
+
+        punto = (lote_inicial, 0)
+        for registro in registros[inicio + 1:]:
+            tipo = registro.get("tipo")
+            if tipo in ("fin", "detenido"):
+                return None
+            if tipo == "lote":
+                punto = (registro["lote"] + 1, 0)
+            elif tipo == "paso":
+                punto = (registro["lote"], registro["paso"] + 1)
+
+        if punto[0] > lote_final:
+            return None
+        return punto
+
+    def _abrir(self, modo):
+        self.cerrar()
+        self.archivo = open(self.ruta, modo, encoding="utf-8")
+        if modo == "a" and self.archivo.tell() > 0:
+            # Si la última línea quedó truncada por un cierre inesperado, no pegar la siguiente a ella
+            with open(self.ruta, "rb") as f:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    self.archivo.write("\n")
+
+    def _escribir(self, registro):
+        if self.archivo is None:
+            self._abrir("a")
+        inicio = time.perf_counter()
+        registro["t"] = time.time()
+        self.archivo.write(json.dumps(registro) + "\n")
+        self.archivo.flush()
+        self.registros += 1
+        self.pendientes_fsync += 1
+        if self.pendientes_fsync >= self.fsync_cada or time.monotonic() - self.ultimo_fsync >= self.fsync_intervalo:
+            self.sincronizar()
+        self.tiempo_escritura += time.perf_counter() - inicio
+
+    def sincronizar(self):
+        """Fuerza a disco los registros pendientes"""
+        if self.archivo is not None and self.pendientes_fsync:
+            os.fsync(self.archivo.fileno())
+            self.fsyncs += 1
+            self.pendientes_fsync = 0
+        self.ultimo_fsync = time.monotonic()
+
+    def iniciar(self, lote_inicial, lote_final, **datos):
+        """Comienza un diario nuevo (descarta el de la ejecución anterior)"""
+        self._abrir("w")
+        self._escribir(dict(tipo="inicio", lote_inicial=lote_inicial, lote_final=lote_final, **datos))
+        self.sincronizar()
+
+    def reanudar(self, lote, paso):
+        self._escribir({"tipo": "reanudacion", "lote": lote, "paso": paso})
+
+    def registrar_paso(self, lote, paso, imagen):
+        self._escribir({"tipo": "paso", "lote": lote, "paso": paso, "imagen": imagen})
+
+    def registrar_lote(self, lote):
+        self._escribir({"tipo": "lote", "lote": lote})
+
+    def finalizar(self):
+        self._escribir({"tipo": "fin"})
+        self.sincronizar()
+
+    def detener(self, lote):
+        """El usuario detuvo el proceso: la próxima ejecución empieza desde el lote que elija"""
+        self._escribir({"tipo": "detenido", "lote": lote})
+        self.sincronizar()
+
+    def cerrar(self):
+        if self.archivo is not None:
+            self.sincronizar()
+            self.archivo.close()
+            self.archivo = None
+
+    def estadisticas(self):
+        return {
+            "registros": self.registros,
+            "fsyncs": self.fsyncs,
+            "tiempo_medio_ms": self.tiempo_escritura / self.registros * 1000 if self.registros else 0.0
+        }
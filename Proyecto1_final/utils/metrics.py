@@ -0,0 +1,212 @@
+"""
+Métricas de tiempo por paso y por lote
+
+Cada paso de la secuencia y cada lote se anotan como una línea JSON en
+metricas.jsonl y se agregan en histogramas (con los mismos buckets
+acumulativos que Prometheus). Tras cada lote se reescribe metricas.prom en
+formato textfile de Prometheus (node_exporter --collector.textfile).
+"""
+import json
+import math
+import os
+import tempfile
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Límites superiores de los buckets en milisegundos
+BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000, 120000)
+
+# Campos de un paso que se agregan en histogramas
+METRICAS_PASO = ("total_ms", "captura_ms", "match_ms", "aparicion_ms", "transicion_ms", "ahk_ms", "otros_ms")
+METRICAS_LOTE = ("total_ms", "captura_ms", "match_ms", "ahk_ms", "otros_ms")
+
+class Histogram:
+    def __init__(self, limites=BUCKETS_MS):
+        self.limites = limites
+        self.cuentas = [0] * (len(limites) + 1)  # El último es +Inf
+        self.suma = 0.0
+        self.n = 0
+        self.minimo = math.inf
+        self.maximo = 0.0
+
+    def observar(self, valor):
+        self.suma += valor
+        self.n += 1
+        self.minimo = min(self.minimo, valor)
+        self.maximo = max(self.maximo, valor)
+        for i, limite in enumerate(self.limites):
+            if valor <= limite:
+                self.cuentas[i] += 1
+                return
+        self.cuentas[-1] += 1
+
+    def percentil(self, p):
+        """Estimación del percentil p (0-100) por interpolación dentro del bucket"""
+        if not self.n:
+            return 0.0
+        objetivo = p / 100 * self.n
+        acumulado = 0
+        inferior = 0.0
+        for i, cuenta in enumerate(self.cuentas):
+            superior = self.limites[i] if i < len(self.limites) else self.maximo
+            if cuenta and acumulado + cuenta >= objetivo:
+                estimado = inferior + (superior - inferior) * (objetivo - acumulado) / cuenta
+                return min(max(estimado, self.minimo), self.maximo)
+            acumulado += cuenta
+            inferior = superior
+        return self.maximo
+
+    def combinar(self, otro):
+        self.cuentas = [a + b for a, b in zip(self.cuentas, otro.cuentas)]
+        self.suma += otro.suma
+        self.n += otro.n
+        self.minimo = min(self.minimo, otro.minimo)
+        self.maximo = max(self.maximo, otro.maximo)
+
+    def resumen(self):
+        return {
+            "n": self.n,
+            "media": self.suma / self.n if self.n else 0.0,
+            "p50": self.percentil(50),
+            "p95": self.percentil(95),
+            "max": self.maximo
+        }
+
+class MetricsRecorder:
+    """
+    Registro estructurado de tiempos: JSONL + histogramas + textfile Prometheus
+
+    Args:
+        ruta_jsonl (str): Archivo al que se añade una línea por paso y por lote ("" = no escribir)
+        ruta_prometheus (str): Archivo textfile de Prometheus ("" = no exportar)
+    """
+    def __init__(self, ruta_jsonl="metricas.jsonl", ruta_prometheus="metricas.prom"):
+        self.ruta_jsonl = ruta_jsonl
+        self.ruta_prometheus = ruta_prometheus
+        self.archivo = None
+        self.lock = threading.Lock()
+
+        self.histogramas = {}  # (metrica, etiqueta) -> Histogram
+        self.contadores = {
+            "pasos": 0,
+            "pasos_fallidos": 0,
+            "intentos": 0,
+            "reintentos_clic": 0,
+            "lotes_completados": 0,
+            "lotes_fallidos": 0
+        }
+
+    def _escribir(self, registro):
+        if not self.ruta_jsonl:
+            return
+        if self.archivo is None:
+            self.archivo = open(self.ruta_jsonl, "a", encoding="utf-8")
+        self.archivo.write(json.dumps(registro) + "\n")
+
+    def _observar(self, metrica, etiqueta, valor):
+        if valor is None:
+            return
+        clave = (metrica, etiqueta)
+        if clave not in self.histogramas:
+            self.histogramas[clave] = Histogram()
+        self.histogramas[clave].observar(valor)
+
+    def registrar_paso(self, medicion):
+        """
+        Anota un paso: lote, paso, imagen, ok, intentos, mejor_score y los tiempos *_ms
+
+        otros_ms (esperas, clics y demás) se calcula como el total menos captura, match y AHK.
+        """
+        with self.lock:
+            medicion = dict(medicion)
+            medicion["otros_ms"] = max(0.0, medicion.get("total_ms", 0.0) - sum(
+                medicion.get(clave) or 0.0 for clave in ("captura_ms", "match_ms", "ahk_ms")))
+            self._escribir(dict(tipo="paso", t=time.time(), **medicion))
+
+            self.contadores["pasos"] += 1
+            self.contadores["intentos"] += medicion.get("intentos", 0)
+            self.contadores["reintentos_clic"] += medicion.get("reintentos_clic", 0)
+            if not medicion.get("ok"):
+                self.contadores["pasos_fallidos"] += 1
+            for metrica in METRICAS_PASO:
+                self._observar(f"paso_{metrica}", medicion.get("imagen", ""), medicion.get(metrica))
+            return medicion
+
+    def registrar_lote(self, lote, pasos, total_ms, ok):
+        """Anota los totales de un lote a partir de las mediciones de sus pasos"""
+        with self.lock:
+            registro = {"tipo": "lote", "t": time.time(), "lote": lote, "ok": ok, "pasos": len(pasos), "total_ms": total_ms}
+            for metrica in ("captura_ms", "match_ms", "ahk_ms"):
+                registro[metrica] = sum(paso.get(metrica) or 0.0 for paso in pasos)
+            registro["otros_ms"] = max(0.0, total_ms - registro["captura_ms"] - registro["match_ms"] - registro["ahk_ms"])
+            self._escribir(registro)
+            if self.archivo is not None:
+                self.archivo.flush()
+
+            self.contadores["lotes_completados" if ok else "lotes_fallidos"] += 1
+            for metrica in METRICAS_LOTE:
+                self._observar(f"lote_{metrica}", "", registro[metrica])
+        self.exportar_prometheus()
+        return registro
+
+    def exportar_prometheus(self):
+        """Reescribe el textfile de Prometheus de forma atómica"""
+        if not self.ruta_prometheus:
+            return
+        with self.lock:
+            lineas = []
+            for nombre, valor in self.contadores.items():
+                lineas.append(f"# TYPE deteccion_{nombre}_total counter")
+                lineas.append(f"deteccion_{nombre}_total {valor}")
+
+            por_metrica = {}
+            for (metrica, etiqueta), histograma in sorted(self.histogramas.items()):
+                por_metrica.setdefault(metrica, []).append((etiqueta, histograma))
+            for metrica, series in por_metrica.items():
+                nombre = f"deteccion_{metrica[:-3]}_seconds"
+                lineas.append(f"# TYPE {nombre} histogram")
+                for etiqueta, histograma in series:
+                    etiquetas = f'imagen="{etiqueta}",' if etiqueta else ""
+                    acumulado = 0
+                    for limite, cuenta in zip(list(histograma.limites) + [math.inf], histograma.cuentas):
+                        acumulado += cuenta
+                        le = "+Inf" if limite == math.inf else f"{limite / 1000:g}"
+                        lineas.append(f'{nombre}_bucket{{{etiquetas}le="{le}"}} {acumulado}')
+                    sufijo = f"{{{etiquetas[:-1]}}}" if etiquetas else ""
+                    lineas.append(f"{nombre}_sum{sufijo} {histograma.suma / 1000:.6f}")
+                    lineas.append(f"{nombre}_count{sufijo} {histograma.n}")
+            texto = "\n".join(lineas) + "\n"
+
+        ruta_tmp = None
+        try:
+            directorio = os.path.dirname(os.path.abspath(self.ruta_prometheus))
+            fd, ruta_tmp = tempfile.mkstemp(prefix=".metricas-", suffix=".tmp", dir=directorio)
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(texto)
+            # mkstemp crea con 0600: node_exporter suele leer el textfile con otro usuario
+            os.chmod(ruta_tmp, 0o644)
+            os.replace(ruta_tmp, self.ruta_prometheus)
+        except OSError as e:
+            logger.error(f"Error exportando métricas de Prometheus: {e}")
+            if ruta_tmp and os.path.exists(ruta_tmp):
+                os.remove(ruta_tmp)
+
+    def resumen(self):
+        """Contadores y p50/p95 de los tiempos por lote y por tipo de medida (todas las imágenes)"""
+        with self.lock:
+            agregados = {}
+            for (metrica, _), histograma in self.histogramas.items():
+                agregados.setdefault(metrica, Histogram()).combinar(histograma)
+            return {
+                "contadores": dict(self.contadores),
+                "tiempos_ms": {metrica: h.resumen() for metrica, h in sorted(agregados.items())}
+            }
+
+    def cerrar(self):
+        with self.lock:
+            if self.archivo is not None:
+                self.archivo.close()
+                self.archivo = None
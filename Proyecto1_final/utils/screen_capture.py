@@ -0,0 +1,472 @@
+import os
+import time
+import bisect
+import contextlib
+import threading
+import logging
+from collections import OrderedDict
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+class CaptureSession:
+    """
+    Sesión de captura de pantalla con un capturador abierto y buffers reutilizables
+
+    Cada backend escribe el frame directamente en un buffer BGR preasignado.
+    grab() devuelve una vista de solo lectura de ese buffer (sin copia), por lo
+    que el contenido se sobrescribe en la siguiente captura: quien necesite
+    conservar un frame debe copiarlo.
+    """
+    nombre = "base"
+
+    def __init__(self):
+        self.region = (0, 0, 0, 0)  # (left, top, ancho, alto)
+        self.frame_id = 0
+        self.timestamp = None
+        self.capturas = 0
+        self.tiempo_captura = 0.0
+        self._buffer = None
+        self._gris = None
+        self._vista = None
+        self._vista_gris = None
+        self._gris_valido = False
+        self.grabador = None  # SessionRecorder opcional que recibe cada frame
+
+    def _asegurar_buffers(self, alto, ancho):
+        """Reserva los buffers solo si cambió el tamaño de la captura"""
+        if self._buffer is not None and self._buffer.shape[:2] == (alto, ancho):
+            return
+        self._buffer = np.empty((alto, ancho, 3), dtype=np.uint8)
+        self._gris = np.empty((alto, ancho), dtype=np.uint8)
+        self._vista = self._buffer.view()
+        self._vista.flags.writeable = False
+        self._vista_gris = self._gris.view()
+        self._vista_gris.flags.writeable = False
+        logger.info(f"Buffers de captura reservados ({ancho}x{alto}, backend {self.nombre})")
+
+    def _capturar(self):
+        """Escribe el frame actual en self._buffer (implementado por cada backend)"""
+        raise NotImplementedError
+
+    def grab(self):
+        """
+        Captura un frame nuevo
+
+        Returns:
+            numpy.ndarray: vista BGR de solo lectura sobre el buffer interno
+        """
+        inicio = time.perf_counter()
+        self._capturar()
+        self.tiempo_captura += time.perf_counter() - inicio
+        self.capturas += 1
+        self.frame_id += 1
+        self.timestamp = time.time()
+        self._gris_valido = False
+        if self.grabador is not None:
+            self.grabador.registrar_frame(self._buffer, self.frame_id, self.offset)
+        return self._vista
+
+    def frame(self):
+        """Devuelve el último frame capturado sin volver a capturar"""
+        return self._vista
+
+    def gray(self):
+        """Versión en escala de grises del último frame (se calcula una vez por frame)"""
+        if self._buffer is None:
+            return None
+        if not self._gris_valido:
+            cv2.cvtColor(self._buffer, cv2.COLOR_BGR2GRAY, dst=self._gris)
+            self._gris_valido = True
+        return self._vista_gris
+
+    @property
+    def offset(self):
+        """Desplazamiento de la región capturada respecto a la pantalla"""
+        return self.region[0], self.region[1]
+
+    def descartar_anteriores(self):
+        """Los frames capturados antes de este momento ya no sirven (solo en BackgroundCapture)"""
+
+    def close(self):
+        pass
+
+    def estadisticas(self):
+        return {
+            "backend": self.nombre,
+            "capturas": self.capturas,
+            "tiempo_medio_ms": (self.tiempo_captura / self.capturas * 1000) if self.capturas else 0.0
+        }
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+class PyAutoGUICapture(CaptureSession):
+    """Backend basado en pyautogui.screenshot (el comportamiento original)"""
+    nombre = "pyautogui"
+
+    def __init__(self, region=None):
+        super().__init__()
+        import pyautogui
+        self._pyautogui = pyautogui
+        if region is None:
+            # El tamaño de pantalla se consulta una sola vez por sesión
+            ancho, alto = pyautogui.size()
+            region = (0, 0, ancho, alto)
+        self.region = tuple(region)
+
+    def _capturar(self):
+        screenshot = self._pyautogui.screenshot(region=self.region)
+        rgb = np.asarray(screenshot)
+        self._asegurar_buffers(rgb.shape[0], rgb.shape[1])
+        codigo = cv2.COLOR_RGBA2BGR if rgb.shape[2] == 4 else cv2.COLOR_RGB2BGR
+        cv2.cvtColor(rgb, codigo, dst=self._buffer)
+
+class MSSCapture(CaptureSession):
+    """Backend basado en mss: mantiene abierto el contexto de captura nativo"""
+    nombre = "mss"
+
+    def __init__(self, region=None, monitor=1):
+        super().__init__()
+        import mss
+        self._sct = mss.mss()
+        if region is None:
+            m = self._sct.monitors[monitor]
+            region = (m["left"], m["top"], m["width"], m["height"])
+        self.region = tuple(region)
+        self._monitor = {
+            "left": self.region[0],
+            "top": self.region[1],
+            "width": self.region[2],
+            "height": self.region[3]
+        }
+
+    def _capturar(self):
+        shot = self._sct.grab(self._monitor)
+        bgra = np.frombuffer(shot.raw, dtype=np.uint8).reshape(shot.height, shot.width, 4)
+        self._asegurar_buffers(shot.height, shot.width)
+        cv2.cvtColor(bgra, cv2.COLOR_BGRA2BGR, dst=self._buffer)
+
+    def close(self):
+        if self._sct is not None:
+            self._sct.close()
+            self._sct = None
+
+class FileCapture(CaptureSession):
+    """
+    Backend que reproduce imágenes desde disco
+
+    Permite ejecutar el motor sin pantalla (por ejemplo en Linux sin display).
+    Las imágenes se decodifican una sola vez; cada grab() avanza al siguiente
+    frame y, al llegar al final, repite el último (o vuelve al primero si
+    repetir=True).
+    """
+    nombre = "archivo"
+
+    def __init__(self, rutas, region=None, repetir=False):
+        super().__init__()
+        if isinstance(rutas, str):
+            rutas = [rutas]
+        self.frames = []
+        for ruta in rutas:
+            imagen = cv2.imread(ruta, cv2.IMREAD_COLOR)
+            if imagen is None:
+                raise ValueError(f"No se pudo cargar el frame '{ruta}'")
+            self.frames.append(imagen)
+        if not self.frames:
+            raise ValueError("FileCapture necesita al menos una imagen")
+        self.repetir = repetir
+        self.indice = -1
+        alto, ancho = self.frames[0].shape[:2]
+        self.region = tuple(region) if region else (0, 0, ancho, alto)
+
+    def _capturar(self):
+        if self.indice + 1 < len(self.frames):
+            self.indice += 1
+        elif self.repetir:
+            self.indice = 0
+        frame = self.frames[self.indice]
+        self._asegurar_buffers(frame.shape[0], frame.shape[1])
+        np.copyto(self._buffer, frame)
+
+class ReplayCapture(CaptureSession):
+    """
+    Backend que reproduce una sesión grabada con utils/session_recorder.py
+
+    Con modo="tiempo" cada grab() devuelve el frame que estaba en pantalla en
+    ese instante de la grabación, según un reloj simulado: reloj() es la hora
+    actual (por defecto time.monotonic) y velocidad la acelera o frena. Con
+    modo="secuencial" cada grab() avanza un frame grabado, sin tener en cuenta
+    los tiempos. Al terminar la sesión se repite el último frame.
+    """
+    nombre = "replay"
+
+    def __init__(self, directorio, region=None, modo="tiempo", velocidad=1.0, reloj=None, max_cache=32):
+        super().__init__()
+        from utils.session_recorder import leer_sesion
+        self.directorio = directorio
+        self.frames = [r for r in leer_sesion(directorio) if r.get("tipo") == "frame"]
+        if not self.frames:
+            raise ValueError(f"La sesión '{directorio}' no tiene frames")
+        self.tiempos = [r["t"] for r in self.frames]
+        self.modo = modo
+        self.velocidad = velocidad
+        self.reloj = reloj or time.monotonic
+        self.inicio = None
+        self.indice = -1
+        self.cache = OrderedDict()
+        self.max_cache = max_cache
+
+        primero = self.frames[0]
+        x, y = primero.get("offset", (0, 0))
+        self.region = tuple(region) if region else (x, y, primero["ancho"], primero["alto"])
+
+    @property
+    def tiempo_reproduccion(self):
+        """Segundos de sesión reproducidos"""
+        if self.inicio is None:
+            return 0.0
+        return (self.reloj() - self.inicio) * self.velocidad
+
+    @property
+    def terminada(self):
+        return self.indice >= len(self.frames) - 1
+
+    def _decodificar(self, archivo):
+        """Frame decodificado (caché LRU: los frames repetidos no se vuelven a leer)"""
+        imagen = self.cache.get(archivo)
+        if imagen is None:
+            imagen = cv2.imread(os.path.join(self.directorio, archivo), cv2.IMREAD_COLOR)
+            if imagen is None:
+                raise ValueError(f"No se pudo cargar el frame '{archivo}' de la sesión")
+            self.cache[archivo] = imagen
+            if len(self.cache) > self.max_cache:
+                self.cache.popitem(last=False)
+        else:
+            self.cache.move_to_end(archivo)
+        return imagen
+
+    def _capturar(self):
+        if self.modo == "secuencial":
+            self.indice = min(self.indice + 1, len(self.frames) - 1)
+        else:
+            if self.inicio is None:
+                self.inicio = self.reloj()
+            self.indice = max(0, bisect.bisect_right(self.tiempos, self.tiempo_reproduccion) - 1)
+        frame = self._decodificar(self.frames[self.indice]["archivo"])
+        self._asegurar_buffers(frame.shape[0], frame.shape[1])
+        np.copyto(self._buffer, frame)
+
+class LatestFrameSlot:
+    """
+    Último frame publicado por el hilo de captura, con su frame_id e instante
+
+    Doble buffer: el productor copia cada frame en el buffer trasero sin
+    bloquear a nadie y lo intercambia con el delantero al publicarlo. Los
+    consumidores copian el delantero bajo el lock, así que el productor nunca
+    escribe en un buffer que se está leyendo. Varios consumidores pueden leer
+    el mismo frame, cada uno en su propio buffer.
+    """
+    def __init__(self):
+        self.condicion = threading.Condition()
+        self._buffers = [None, None]
+        self._delantero = 0
+        self.frame_id = 0
+        self.timestamp = None  # Instante en que empezó la captura del frame publicado
+        self.cerrado = False
+
+    def publicar(self, frame, timestamp):
+        trasero = 1 - self._delantero
+        buffer = self._buffers[trasero]
+        if buffer is None or buffer.shape != frame.shape:
+            buffer = self._buffers[trasero] = np.empty_like(frame)
+        np.copyto(buffer, frame)
+        with self.condicion:
+            self._delantero = trasero
+            self.frame_id += 1
+            self.timestamp = timestamp
+            self.condicion.notify_all()
+
+    def leer(self, destino_para=None, posterior_a=0, desde=None, timeout=None):
+        """
+        Copia el último frame si es más nuevo que posterior_a, esperando a que llegue
+
+        Args:
+            destino_para (callable): forma -> array donde copiar el frame (None = array nuevo)
+            posterior_a (int): frame_id ya consumido; solo vale uno mayor
+            desde (float): Solo vale un frame cuya captura empezó en este instante o después
+            timeout (float): Segundos máximos de espera (None = sin límite)
+
+        Returns:
+            tuple: (frame, frame_id, timestamp); frame es None si no llegó a tiempo
+                   (o antes de cerrarse el slot) un frame que cumpla las condiciones
+        """
+        def valido():
+            return self.frame_id > posterior_a and (desde is None or self.timestamp >= desde)
+
+        with self.condicion:
+            self.condicion.wait_for(lambda: self.cerrado or valido(), timeout)
+            if not valido():
+                return None, self.frame_id, self.timestamp
+            frente = self._buffers[self._delantero]
+            destino = destino_para(frente.shape) if destino_para is not None else np.empty_like(frente)
+            np.copyto(destino, frente)
+            return destino, self.frame_id, self.timestamp
+
+    def cerrar(self):
+        with self.condicion:
+            self.cerrado = True
+            self.condicion.notify_all()
+
+class BackgroundCapture(CaptureSession):
+    """
+    Captura en un hilo productor y entrega a los consumidores el último frame
+
+    El hilo abre la sesión real con fabrica() (mss no es compartible entre
+    hilos) y captura a fps frames por segundo en un LatestFrameSlot. grab()
+    no captura: copia el frame más reciente que aún no se consumió, de modo
+    que la captura se solapa con el matching del frame anterior. Tras un clic,
+    descartar_anteriores() hace que grab() espere a un frame posterior; nunca
+    se entrega un frame anterior, por lenta que sea la captura.
+
+    Args:
+        fabrica (callable): Crea la CaptureSession del backend configurado
+        fps (float): Capturas por segundo del hilo productor
+        reloj (callable): Instante actual (timestamp de cada frame)
+        espera_maxima (float): Segundos sin frame nuevo tras los que grab() avisa en el log
+        activo (callable): Indica si grab() debe seguir esperando (p. ej. el proceso no se detuvo)
+    """
+    nombre = "hilo"
+    SONDEO = 0.1  # Segundos entre comprobaciones de activo() mientras se espera un frame
+
+    def __init__(self, fabrica, fps=15, reloj=None, espera_maxima=1.0, activo=None):
+        super().__init__()
+        self.slot = LatestFrameSlot()
+        self.periodo = 1.0 / fps
+        self.reloj = reloj or time.monotonic
+        self.espera_maxima = espera_maxima
+        self.activo = activo or (lambda: True)
+        self.traza = None  # TraceRecorder opcional (tramos de captura del hilo productor)
+        self.fuente = None
+        self.descartar_hasta = None
+        self.esperas_largas = 0  # grab() que esperaron más de espera_maxima
+        self._error = None
+        self._parar = threading.Event()
+        self._lista = threading.Event()
+
+        self._hilo = threading.Thread(target=self._producir, args=(fabrica,), name="captura", daemon=True)
+        self._hilo.start()
+        self._lista.wait()
+        if self.fuente is None:
+            # Solo los errores al abrir la sesión; los de la captura los lanza grab()
+            raise self._error
+        self.nombre = f"{self.fuente.nombre}+hilo"
+        self.region = self.fuente.region
+
+    def _tramo(self):
+        if self.traza is None:
+            return contextlib.nullcontext()
+        return self.traza.tramo("captura_hilo", "captura")
+
+    def _producir(self, fabrica):
+        try:
+            self.fuente = fabrica()
+        except Exception as e:
+            self._error = e
+            return
+        finally:
+            self._lista.set()
+
+        try:
+            while not self._parar.is_set():
+                inicio = time.perf_counter()
+                instante = self.reloj()
+                with self._tramo():
+                    frame = self.fuente.grab()
+                self.slot.publicar(frame, instante)
+                self._parar.wait(max(0.0, self.periodo - (time.perf_counter() - inicio)))
+        except Exception as e:
+            logger.error(f"Error en el hilo de captura: {e}")
+            self._error = e
+        finally:
+            self.slot.cerrar()
+            self.fuente.close()
+
+    def _destino(self, forma):
+        self._asegurar_buffers(forma[0], forma[1])
+        return self._buffer
+
+    def grab(self):
+        """
+        Devuelve el último frame del hilo productor que aún no se consumió
+
+        Espera mientras activo() lo permita a un frame nuevo capturado después
+        de descartar_anteriores(), avisando en el log cada espera_maxima segundos.
+
+        Returns:
+            numpy.ndarray: vista BGR de solo lectura sobre el buffer del consumidor,
+                           o None si se dejó de esperar (proceso detenido o sesión cerrada)
+
+        Raises:
+            RuntimeError: si el hilo de captura terminó por un error
+        """
+        inicio = time.perf_counter()
+        aviso = inicio + self.espera_maxima
+        avisado = False
+        while True:
+            frame, frame_id, instante = self.slot.leer(self._destino, self.frame_id, self.descartar_hasta,
+                                                       self.SONDEO)
+            if frame is not None:
+                break
+            if self._error is not None:
+                raise RuntimeError(f"El hilo de captura se detuvo: {self._error}")
+            if self.slot.cerrado or not self.activo():
+                return None
+            if time.perf_counter() >= aviso:
+                if not avisado:
+                    self.esperas_largas += 1
+                    avisado = True
+                logger.warning(f"El hilo de captura no entrega un frame nuevo desde hace "
+                               f"{time.perf_counter() - inicio:.1f} s")
+                aviso += self.espera_maxima
+        self.tiempo_captura += time.perf_counter() - inicio
+        self.capturas += 1
+        self.frame_id = frame_id
+        self.timestamp = instante
+        self._gris_valido = False
+        if self.grabador is not None:
+            self.grabador.registrar_frame(self._buffer, self.frame_id, self.offset)
+        return self._vista
+
+    def descartar_anteriores(self):
+        self.descartar_hasta = self.reloj()
+
+    def close(self):
+        self._parar.set()
+        self._hilo.join(timeout=5)
+
+    def estadisticas(self):
+        stats = super().estadisticas()
+        stats["producidos"] = self.slot.frame_id
+        stats["esperas_largas"] = self.esperas_largas
+        stats["captura_media_ms"] = self.fuente.estadisticas()["tiempo_medio_ms"]
+        return stats
+
+CAPTURE_BACKENDS = {
+    PyAutoGUICapture.nombre: PyAutoGUICapture,
+    MSSCapture.nombre: MSSCapture,
+    FileCapture.nombre: FileCapture,
+    ReplayCapture.nombre: ReplayCapture
+}
+
+def crear_capture_session(backend="pyautogui", **opciones):
+    """Crea una sesión de captura del backend indicado"""
+    clase = CAPTURE_BACKENDS.get(backend)
+    if clase is None:
+        raise ValueError(f"Backend de captura desconocido: '{backend}'")
+    return clase(**opciones)
@@ -0,0 +1,184 @@
+"""
+Grabación de sesiones para reproducirlas sin la aplicación real
+
+Una sesión es un directorio con:
+    sesion.jsonl        Un registro por línea: "sesion" (cabecera), "frame",
+                        "matches" y "accion", cada uno con su instante t en
+                        segundos desde el inicio de la grabación
+    frames/<hash>.png   Cada frame distinto una sola vez (PNG sin pérdida)
+
+La reproducción la hace el backend de captura "replay" (utils/screen_capture.py).
+
+Crear una sesión a partir de capturas sueltas (p. ej. image.png, image1.png):
+    python -m utils.session_recorder --salida sesiones/semilla ../image.png ../image1.png
+"""
+import argparse
+import hashlib
+import json
+import os
+import queue
+import threading
+import time
+import logging
+import cv2
+
+logger = logging.getLogger(__name__)
+
+ARCHIVO_SESION = "sesion.jsonl"
+DIRECTORIO_FRAMES = "frames"
+
+class SessionRecorder:
+    """
+    Graba frames, coincidencias y acciones de una ejecución
+
+    registrar_frame() solo copia el frame y lo encola: el hash, la
+    deduplicación y la compresión PNG se hacen en un hilo aparte para no
+    frenar la búsqueda. Si la cola se llena, el frame se descarta (y se cuenta).
+    """
+    def __init__(self, directorio, compresion_png=3, max_cola=64, reloj=time.monotonic):
+        self.directorio = directorio
+        self.compresion_png = compresion_png
+        self.reloj = reloj
+        self.inicio = reloj()
+        os.makedirs(os.path.join(directorio, DIRECTORIO_FRAMES), exist_ok=True)
+
+        self.archivo = open(os.path.join(directorio, ARCHIVO_SESION), "w", encoding="utf-8")
+        self.lock = threading.Lock()
+        self.cola = queue.Queue(max_cola)
+        self.guardados = set(os.listdir(os.path.join(directorio, DIRECTORIO_FRAMES)))
+
+        self.frames = 0
+        self.duplicados = 0
+        self.descartados = 0
+        self.bytes_escritos = 0
+
+        self.hilo = threading.Thread(target=self._procesar_frames, name="session-recorder", daemon=True)
+        self.hilo.start()
+
+    def tiempo(self):
+        return self.reloj() - self.inicio
+
+    def _escribir(self, registro):
+        with self.lock:
+            if self.archivo is not None:
+                self.archivo.write(json.dumps(registro) + "\n")
+
+    def registrar_sesion(self, **datos):
+        """Cabecera de la sesión (región capturada, backend, plantillas...)"""
+        self._escribir(dict(tipo="sesion", t=self.tiempo(), **datos))
+
+    def registrar_frame(self, frame, frame_id, offset=(0, 0)):
+        try:
+            self.cola.put_nowait((self.tiempo(), frame_id, tuple(offset), frame.copy()))
+        except queue.Full:
+            self.descartados += 1
+
+    def registrar_matches(self, frame_id, resultados):
+        """Resultados de detect_all para un frame: ruta -> score, loc, tamaño y modo"""
+        self._escribir({
+            "tipo": "matches",
+            "t": self.tiempo(),
+            "frame_id": frame_id,
+            "resultados": {
+                ruta: {
+                    "score": round(float(r.score), 4),
+                    "loc": [int(r.loc[0]), int(r.loc[1])],
+                    "ancho": r.ancho,
+                    "alto": r.alto,
+                    "modo": r.modo
+                } for ruta, r in resultados.items()
+            }
+        })
+
+    def registrar_accion(self, accion, **datos):
+        """Entrada emitida por el bot (clic, tecla, comando AHK...)"""
+        self._escribir(dict(tipo="accion", t=self.tiempo(), accion=accion, **datos))
+
+    def _procesar_frames(self):
+        while True:
+            elemento = self.cola.get()
+            if elemento is None:
+                return
+            t, frame_id, offset, frame = elemento
+            digest = hashlib.blake2b(frame.tobytes(), digest_size=16).hexdigest()
+            nombre = f"{digest}.png"
+            if nombre in self.guardados:
+                self.duplicados += 1
+            else:
+                ruta = os.path.join(self.directorio, DIRECTORIO_FRAMES, nombre)
+                cv2.imwrite(ruta, frame, [cv2.IMWRITE_PNG_COMPRESSION, self.compresion_png])
+                self.guardados.add(nombre)
+                self.bytes_escritos += os.path.getsize(ruta)
+            self.frames += 1
+            self._escribir({
+                "tipo": "frame",
+                "t": t,
+                "frame_id": frame_id,
+                "offset": list(offset),
+                "alto": frame.shape[0],
+                "ancho": frame.shape[1],
+                "archivo": f"{DIRECTORIO_FRAMES}/{nombre}"
+            })
+
+    def cerrar(self):
+        """Termina de escribir los frames encolados y cierra la sesión"""
+        if self.hilo.is_alive():
+            self.cola.put(None)
+            self.hilo.join()
+        with self.lock:
+            if self.archivo is not None:
+                self.archivo.close()
+                self.archivo = None
+        stats = self.estadisticas()
+        logger.info(f"Sesión grabada en '{self.directorio}': {stats['frames']} frames, "
+                    f"{stats['unicos']} distintos, {stats['descartados']} descartados, "
+                    f"{stats['bytes_escritos'] / 1024:.0f} KiB")
+
+    def estadisticas(self):
+        return {
+            "frames": self.frames,
+            "unicos": len(self.guardados),
+            "duplicados": self.duplicados,
+            "descartados": self.descartados,
+            "bytes_escritos": self.bytes_escritos
+        }
+
+def leer_sesion(directorio):
+    """Registros de una sesión grabada, en orden"""
+    registros = []
+    with open(os.path.join(directorio, ARCHIVO_SESION), "r", encoding="utf-8") as f:
+        for linea in f:
+            try:
+                registros.append(json.loads(linea))
+            except ValueError:
+                logger.warning(f"Línea inválida en la sesión '{directorio}', se ignora")
+    return registros
+
+def sesion_desde_imagenes(rutas, directorio, intervalo=1.0):
+    """Crea una sesión con una captura cada 'intervalo' segundos a partir de imágenes sueltas"""
+    instante = [0.0]
+    grabador = SessionRecorder(directorio, reloj=lambda: instante[0])
+    grabador.registrar_sesion(origen="imagenes", rutas=list(rutas))
+    for frame_id, ruta in enumerate(rutas, 1):
+        imagen = cv2.imread(ruta, cv2.IMREAD_COLOR)
+        if imagen is None:
+            raise ValueError(f"No se pudo cargar la imagen '{ruta}'")
+        grabador.registrar_frame(imagen, frame_id)
+        # El hilo escribe el frame con el instante en que se encoló
+        instante[0] += intervalo
+    grabador.cerrar()
+    return grabador.estadisticas()
+
+def main():
+    parser = argparse.ArgumentParser(description="Crea una sesión reproducible a partir de capturas de pantalla")
+    parser.add_argument("imagenes", nargs="+", help="Capturas en el orden en que deben reproducirse")
+    parser.add_argument("--salida", required=True, help="Directorio de la sesión")
+    parser.add_argument("--intervalo", type=float, default=1.0, help="Segundos entre capturas")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    stats = sesion_desde_imagenes(args.imagenes, args.salida, args.intervalo)
+    print(json.dumps(stats, indent=2))
+
+if __name__ == "__main__":
+    main()
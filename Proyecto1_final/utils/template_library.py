@@ -0,0 +1,119 @@
+import os
+import threading
+import logging
+import cv2
+
+logger = logging.getLogger(__name__)
+
+class Template:
+    """Plantilla decodificada y preprocesada, lista para cv2.matchTemplate"""
+    def __init__(self, ruta, imagen, mtime):
+        self.ruta = ruta
+        self.mtime = mtime
+        # Espacio de color de trabajo: BGR (el mismo que la captura de pantalla)
+        self.imagen = imagen
+        self.gris = cv2.cvtColor(imagen, cv2.COLOR_BGR2GRAY)
+        self.alto, self.ancho = imagen.shape[:2]
+
+        # Estadísticas de la plantilla (una plantilla plana no sirve para TM_CCOEFF_NORMED)
+        media, desviacion = cv2.meanStdDev(imagen)
+        self.media = tuple(float(v) for v in media.flatten())
+        self.desviacion = tuple(float(v) for v in desviacion.flatten())
+        self.es_plana = max(self.desviacion) < 1.0
+        self._escaladas = {}
+
+    @property
+    def size(self):
+        return self.ancho, self.alto
+
+    def escalada(self, factor, gris=False):
+        """Versión reducida 1/factor de la plantilla (para búsqueda piramidal), cacheada"""
+        clave = (factor, gris)
+        if clave not in self._escaladas:
+            ancho = max(1, round(self.ancho / factor))
+            alto = max(1, round(self.alto / factor))
+            origen = self.gris if gris else self.imagen
+            self._escaladas[clave] = cv2.resize(origen, (ancho, alto), interpolation=cv2.INTER_AREA)
+        return self._escaladas[clave]
+
+class TemplateLibrary:
+    def __init__(self, rutas=None):
+        self.templates = {}
+        self.hits = 0
+        self.misses = 0
+        self.recargas = 0
+        self.lock = threading.Lock()
+
+        if rutas:
+            self.precargar(rutas)
+
+    def precargar(self, rutas):
+        """Carga de una sola vez todas las plantillas indicadas"""
+        for ruta in dict.fromkeys(rutas):
+            if self.get(ruta) is None:
+                logger.warning(f"No se pudo precargar la plantilla '{ruta}'")
+
+    def _cargar(self, ruta, mtime):
+        imagen = cv2.imread(ruta, cv2.IMREAD_COLOR)
+        if imagen is None:
+            return None
+        template = Template(ruta, imagen, mtime)
+        if template.es_plana:
+            logger.warning(f"La plantilla '{ruta}' no tiene variación de color; la confianza no será fiable")
+        return template
+
+    def get(self, ruta):
+        """
+        Devuelve la plantilla cacheada para la ruta indicada
+
+        La entrada se invalida si el archivo cambió en disco (mtime distinto),
+        de modo que reemplazar una imagen en img/ se aplica sin reiniciar.
+
+        Returns:
+            Template: plantilla preprocesada, o None si no se pudo cargar
+        """
+        try:
+            mtime = os.stat(ruta).st_mtime_ns
+        except OSError:
+            mtime = None
+
+        with self.lock:
+            template = self.templates.get(ruta)
+            if template is not None and template.mtime == mtime:
+                self.hits += 1
+                return template
+
+            self.misses += 1
+            if mtime is None:
+                self.templates.pop(ruta, None)
+                return None
+
+            if template is not None:
+                self.recargas += 1
+                logger.info(f"Plantilla '{ruta}' modificada en disco, recargando")
+
+            template = self._cargar(ruta, mtime)
+            if template is None:
+                self.templates.pop(ruta, None)
+            else:
+                self.templates[ruta] = template
+            return template
+
+    def invalidar(self, ruta=None):
+        """Descarta una plantilla (o todas) para forzar su recarga"""
+        with self.lock:
+            if ruta is None:
+                self.templates.clear()
+            else:
+                self.templates.pop(ruta, None)
+
+    def estadisticas(self):
+        with self.lock:
+            total = self.hits + self.misses
+            return {
+                "plantillas": len(self.templates),
+                "hits": self.hits,
+                "misses": self.misses,
+                "recargas": self.recargas,
+                "hit_rate": self.hits / total if total else 0.0
+            }
@@ -0,0 +1,134 @@
+"""
+Línea de tiempo de cada lote en formato Chrome trace-event
+
+Con trace_dir configurado se escribe un archivo lote-<n>.json por lote que se
+abre en chrome://tracing o https://ui.perfetto.dev. Cada tramo (captura,
+match, espera, clic, AHK, entrega a la interfaz...) es un evento "X" con su
+hilo; los tramos de un mismo hilo se anidan por tiempo bajo run_sequence y
+handle_b4_special_behavior.
+"""
+import contextlib
+import json
+import os
+import tempfile
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Contexto vacío que se devuelve cuando no se está trazando (reutilizable)
+_SIN_TRAZA = contextlib.nullcontext()
+
+class _Tramo:
+    def __init__(self, traza, nombre, categoria, argumentos):
+        self.traza = traza
+        self.nombre = nombre
+        self.categoria = categoria
+        self.argumentos = argumentos
+
+    def __enter__(self):
+        self.inicio = self.traza.reloj()
+        return self
+
+    def __exit__(self, *excepcion):
+        self.traza.agregar(self.nombre, self.categoria, self.inicio, self.traza.reloj(), self.argumentos)
+        return False
+
+class TraceRecorder:
+    """
+    Registro de tramos por lote
+
+    Args:
+        directorio (str): Directorio de los archivos de traza ("" = no trazar)
+        reloj (callable): Función que devuelve el instante actual en segundos
+    """
+    def __init__(self, directorio="", reloj=time.monotonic):
+        self.directorio = directorio
+        self.reloj = reloj
+        self.pid = os.getpid()
+        self.lock = threading.Lock()
+        self.eventos = None  # None mientras no hay un lote en curso
+        self.nombre = None
+        self.origen = 0.0
+        self.hilos = {}
+        self.argumentos = {}
+        self.archivos = 0
+
+    @property
+    def activo(self):
+        return self.eventos is not None
+
+    def iniciar(self, nombre, **argumentos):
+        """Empieza la traza de un lote (descarta la anterior si no se guardó)"""
+        if not self.directorio:
+            return
+        with self.lock:
+            self.nombre = nombre
+            self.eventos = []
+            self.hilos = {}
+            self.origen = self.reloj()
+            self.argumentos = argumentos
+
+    def tramo(self, nombre, categoria="", **argumentos):
+        """Context manager que anota un tramo; sin traza activa no hace nada"""
+        if self.eventos is None:
+            return _SIN_TRAZA
+        return _Tramo(self, nombre, categoria, argumentos)
+
+    def agregar(self, nombre, categoria, inicio, fin, argumentos=None):
+        """Anota un tramo ya medido (instantes del mismo reloj)"""
+        hilo = threading.current_thread()
+        with self.lock:
+            if self.eventos is None:
+                return
+            self.hilos.setdefault(hilo.ident, hilo.name)
+            evento = {
+                "name": nombre,
+                "cat": categoria,
+                "ph": "X",
+                "ts": (inicio - self.origen) * 1e6,
+                "dur": max(0.0, fin - inicio) * 1e6,
+                "pid": self.pid,
+                "tid": hilo.ident
+            }
+            if argumentos:
+                evento["args"] = argumentos
+            self.eventos.append(evento)
+
+    def guardar(self):
+        """
+        Escribe la traza del lote en curso y la cierra
+
+        Returns:
+            str: Ruta del archivo escrito, None si no había traza
+        """
+        with self.lock:
+            if self.eventos is None:
+                return None
+            eventos, self.eventos = self.eventos, None
+            metadatos = [{"name": "process_name", "ph": "M", "pid": self.pid, "args": {"name": "DeteccionBotones"}}]
+            metadatos += [{"name": "thread_name", "ph": "M", "pid": self.pid, "tid": tid, "args": {"name": nombre}}
+                          for tid, nombre in self.hilos.items()]
+            datos = {
+                "traceEvents": metadatos + sorted(eventos, key=lambda e: e["ts"]),
+                "displayTimeUnit": "ms",
+                "otherData": dict(self.argumentos, traza=self.nombre)
+            }
+
+        ruta = os.path.join(self.directorio, f"{self.nombre}.json")
+        ruta_tmp = None
+        try:
+            os.makedirs(self.directorio, exist_ok=True)
+            fd, ruta_tmp = tempfile.mkstemp(prefix=".traza-", suffix=".tmp", dir=self.directorio)
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(datos, f)
+            os.replace(ruta_tmp, ruta)
+        except OSError as e:
+            logger.error(f"Error guardando la traza '{ruta}': {e}")
+            if ruta_tmp and os.path.exists(ruta_tmp):
+                os.remove(ruta_tmp)
+            return None
+        self.archivos += 1
+        logger.info(f"Traza del lote guardada en '{ruta}' ({len(eventos)} tramos)")
+        return ruta
@@ -1,6 +1,8 @@
 import tkinter as tk
 from tkinter import ttk, scrolledtext
+import tkinter.messagebox as messagebox
 import time
+import queue
 import logging
 
 logger = logging.getLogger(__name__)
@@ -16,7 +18,16 @@ class ImageSearchView(ttk.Frame):
         self.lote_final_var = tk.IntVar(value=self.controller.model.lote_final)
         self.delay_time_var = tk.IntVar(value=self.controller.model.delay_time)
         
+        # Cola de mensajes y llamadas desde el hilo de trabajo; solo el hilo de
+        # Tk toca los widgets, vaciándola por lotes cada intervalo_ui ms
+        config = self.controller.model.config_manager
+        self.ui_queue = queue.Queue()
+        self.intervalo_ui = config.get("ui_refresh_ms", 100)
+        self.max_lineas = config.get("ui_max_lines", 1000)
+        self.linea_transitoria = False
+        
         self.create_widgets()
+        self.after(self.intervalo_ui, self._procesar_cola)
     
     def create_widgets(self):
         # Botón de configuración (reemplaza la casilla de distrito)
@@ -85,16 +96,79 @@ class ImageSearchView(ttk.Frame):
         self.columnconfigure(1, weight=1)
         status_frame.columnconfigure(0, weight=1)
     
-    def log_message(self, message):
-        """Añade un mensaje al área de estado"""
-        self.status_text.insert(tk.END, f"{time.strftime('%H:%M:%S')} - {message}\n")
+    def log_message(self, message, transitorio=False):
+        """
+        Añade un mensaje al área de estado (seguro desde cualquier hilo)
+        
+        Args:
+            message (str): Texto a mostrar
+            transitorio (bool): El mensaje se reemplaza con el siguiente (p. ej. una cuenta atrás)
+        """
+        self.ui_queue.put(("mensaje", f"{time.strftime('%H:%M:%S')} - {message}", transitorio))
+        if not transitorio:
+            # Solo encola el registro: el archivo lo escribe el hilo del QueueListener (main.py)
+            logger.info(message)
+    
+    def ejecutar_en_ui(self, funcion, *args):
+        """Programa una llamada para el hilo de Tk (seguro desde cualquier hilo)"""
+        self.ui_queue.put(("llamada", funcion, args))
+    
+    def _procesar_cola(self):
+        """Vacía la cola de UI: inserta los mensajes acumulados de una vez y ejecuta las llamadas"""
+        traza = self.controller.model.traza
+        inicio = traza.reloj()
+        procesados = 0
+        lineas = []
+        transitorio = False
+        try:
+            while True:
+                tipo, dato, extra = self.ui_queue.get_nowait()
+                procesados += 1
+                if tipo == "mensaje":
+                    # Una línea transitoria pendiente se descarta al llegar otra
+                    if transitorio:
+                        lineas.pop()
+                    lineas.append(dato)
+                    transitorio = extra
+                else:
+                    self._insertar_lineas(lineas, transitorio)
+                    lineas, transitorio = [], False
+                    try:
+                        dato(*extra)
+                    except Exception as e:
+                        logger.error(f"Error actualizando la interfaz: {e}")
+        except queue.Empty:
+            pass
+        
+        self._insertar_lineas(lineas, transitorio)
+        if procesados:
+            traza.agregar("cola_ui", "ui", inicio, traza.reloj(), {"elementos": procesados})
+        self.after(self.intervalo_ui, self._procesar_cola)
+    
+    def _insertar_lineas(self, lineas, transitorio):
+        if not lineas:
+            return
+        
+        # Quitar la línea transitoria anterior antes de añadir nuevas
+        if self.linea_transitoria:
+            self.status_text.delete("end-2l", "end-1l")
+        self.status_text.insert(tk.END, "\n".join(lineas) + "\n")
+        self.linea_transitoria = transitorio
+        
+        # Limitar el número de líneas para que memoria y redibujado no crezcan
+        total = int(self.status_text.index("end-1c").split(".")[0]) - 1
+        if total > self.max_lineas:
+            self.status_text.delete("1.0", f"{total - self.max_lineas + 1}.0")
         self.status_text.see(tk.END)
-        logger.info(message)
         
-        # Actualizar el formato actual si el mensaje contiene información del formato
-        if "Formato de texto actualizado" in message or "Usando Formato" in message:
+        # Actualizar el formato actual si algún mensaje contiene información del formato
+        if any("Formato de texto actualizado" in linea or "Usando Formato" in linea for linea in lineas):
             self.fromato_actual_var.set(f"Formato actual: {self.controller.model.formato_texto}")
     
+    def proceso_completado(self):
+        """Aviso de fin de proceso (seguro desde cualquier hilo)"""
+        self.ejecutar_en_ui(messagebox.showinfo, "Proceso Completado", "El proceso ha terminado exitosamente.")
+    
     def update_button_states(self, is_running, is_paused):
         """Actualiza el estado de los botones según el estado actual"""
         if is_running: